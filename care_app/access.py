@@ -0,0 +1,116 @@
+"""
+Per-user access resolution.
+
+Everything the permission checks need about a user - their role, the elders
+they are guardian of and the elders they are actively assigned to - is
+loaded once into an ``AccessScope``, cached per user, and invalidated by the
+signal handlers when assignments, guardians or roles change. Permission
+checks then become set membership tests with no queries.
+
+Invalidation only reaches other workers through a shared cache. With a
+per-process cache (the ``locmem://`` default) a scope is kept for just
+``LOCAL_ACCESS_SCOPE_TIMEOUT`` seconds, so a revoked assignment or role stops
+granting access in every worker almost at once.
+"""
+
+from .caching import get_cache, is_shared_cache, make_key
+from .models import ElderAssignment, ElderProfile, UserProfile
+
+STAFF_USER_TYPES = ['ADMIN', 'DOCTOR', 'NURSE', 'CAREGIVER']
+ACCESS_SCOPE_TIMEOUT = 3600
+LOCAL_ACCESS_SCOPE_TIMEOUT = 5
+
+
+class AccessScope:
+    def __init__(self, user_id, user_type, guardian_elder_ids, assigned_elder_ids):
+        self.user_id = user_id
+        self.user_type = user_type
+        self.guardian_elder_ids = frozenset(guardian_elder_ids)
+        self.assigned_elder_ids = frozenset(assigned_elder_ids)
+
+    @property
+    def is_admin(self):
+        return self.user_type == 'ADMIN'
+
+    @property
+    def is_staff_member(self):
+        return self.user_type in STAFF_USER_TYPES
+
+    @property
+    def sees_all_elders(self):
+        """Staff roles may list every elder; guardians only their own."""
+        return self.is_staff_member
+
+    @property
+    def accessible_elder_ids(self):
+        """Ids of listable elders, or ``None`` when every elder is listable."""
+        if self.sees_all_elders:
+            return None
+        return self.guardian_elder_ids | self.assigned_elder_ids
+
+    def can_list(self, elder_id):
+        """Whether the elder shows up in the user's lists at all."""
+        elder_ids = self.accessible_elder_ids
+        return elder_ids is None or int(elder_id) in elder_ids
+
+    def is_guardian_of(self, elder_id):
+        return int(elder_id) in self.guardian_elder_ids
+
+    def can_access(self, elder_id):
+        """Admins, the guardian, and actively assigned staff."""
+        elder_id = int(elder_id)
+        if self.is_admin or elder_id in self.guardian_elder_ids:
+            return True
+        return self.is_staff_member and elder_id in self.assigned_elder_ids
+
+    def can_edit(self, elder_id):
+        """Admins and the guardian."""
+        return self.is_admin or self.is_guardian_of(elder_id)
+
+
+def _scope_key(user_id):
+    return make_key('access', 'scope', user_id)
+
+
+def _load_scope(user):
+    user_type = UserProfile.objects.filter(user_id=user.pk).values_list('user_type', flat=True).first()
+    guardian_elder_ids = ElderProfile.objects.filter(guardian_id=user.pk).values_list('pk', flat=True)
+    assigned_elder_ids = ElderAssignment.objects.filter(
+        user_id=user.pk, is_active=True
+    ).values_list('elder_id', flat=True)
+    return AccessScope(user.pk, user_type, guardian_elder_ids, assigned_elder_ids)
+
+
+def get_access_scope(user):
+    """Return the cached ``AccessScope`` for ``user``; memoized on the user object."""
+    scope = getattr(user, '_access_scope', None)
+    if scope is None:
+        cache = get_cache()
+        key = _scope_key(user.pk)
+        scope = cache.get(key)
+        if scope is None:
+            scope = _load_scope(user)
+            timeout = ACCESS_SCOPE_TIMEOUT if is_shared_cache() else LOCAL_ACCESS_SCOPE_TIMEOUT
+            cache.set(key, scope, timeout)
+        user._access_scope = scope
+    return scope
+
+
+def invalidate_access_scope(*user_ids):
+    get_cache().delete_many([_scope_key(user_id) for user_id in user_ids if user_id])
+
+
+def accessible_elders(user):
+    """Elders ``user`` may list."""
+    elder_ids = get_access_scope(user).accessible_elder_ids
+    if elder_ids is None:
+        return ElderProfile.objects.all()
+    return ElderProfile.objects.filter(pk__in=elder_ids)
+
+
+def filter_by_access(queryset, user, elder_field='elder'):
+    """Restrict ``queryset`` to rows belonging to elders ``user`` may list."""
+    elder_ids = get_access_scope(user).accessible_elder_ids
+    if elder_ids is None:
+        return queryset
+    return queryset.filter(**{f'{elder_field}__in': elder_ids})
@@ -173,10 +173,10 @@ class IncidentReportAdmin(admin.ModelAdmin):
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ['notification_type', 'elder', 'message_preview', 'priority', 'is_read', 'created_at']
-    list_filter = ['notification_type', 'priority', 'is_read', 'created_at']
+    list_display = ['notification_type', 'elder', 'message_preview', 'priority', 'created_at', 'expires_at']
+    list_filter = ['notification_type', 'priority', 'created_at']
     search_fields = ['message', 'elder__full_name']
-    list_editable = ['is_read', 'priority']
+    list_editable = ['priority']
     readonly_fields = ['created_at']
     date_hierarchy = 'created_at'
     
@@ -0,0 +1,292 @@
+"""
+Vitals anomaly detection.
+
+Every reading is scored two ways, one metric at a time:
+
+- against absolute clinical limits (``CLINICAL_LIMITS``), e.g. SpO2 below
+  90 or systolic pressure above 180;
+- against the elder's own baseline: the mean and standard deviation of
+  their previous ``BASELINE_WINDOW`` readings. A value ``Z_THRESHOLD``
+  deviations away is flagged once at least ``MIN_BASELINE`` earlier values
+  exist. ``MIN_STD`` keeps a very steady history from turning noise into
+  alerts.
+
+Scoring works on NumPy arrays of readings sorted by elder and time. Rolling
+sums come from cumulative sums, so a whole facility's history is scored in a
+handful of array operations per chunk of elders (``backtest``). New
+readings are scored the same way against a ``BASELINE_LOOKBACK`` of history
+(``check_new_readings``), which the ingestion endpoint and the VitalsLog
+signal handler call.
+
+Alerts become ``VITALS`` notifications keyed by ``dedup_key`` (elder, metric
+and direction): a key that already alerted within ``DEDUP_WINDOW`` is not
+notified again, so a run of low SpO2 readings raises one alert, not one per
+reading.
+"""
+import logging
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+import numpy as np
+from django.utils import timezone
+
+from .models import ElderProfile, Notification, VitalsLog
+from .notifications import create_notifications
+from .vitals_rollups import VITALS_METRICS
+
+logger = logging.getLogger(__name__)
+
+# metric -> (low, high); None leaves that side unchecked
+CLINICAL_LIMITS = {
+    'blood_pressure_systolic': (90, 180),
+    'blood_pressure_diastolic': (50, 110),
+    'heart_rate': (45, 120),
+    'temperature': (95.0, 100.4),
+    'oxygen_saturation': (90, None),
+    'blood_sugar': (70, 250),
+}
+MIN_STD = {
+    'blood_pressure_systolic': 6.0,
+    'blood_pressure_diastolic': 4.0,
+    'heart_rate': 5.0,
+    'temperature': 0.4,
+    'weight': 1.0,
+    'oxygen_saturation': 1.5,
+    'blood_sugar': 12.0,
+}
+METRIC_LABELS = {
+    'blood_pressure_systolic': 'systolic BP',
+    'blood_pressure_diastolic': 'diastolic BP',
+    'heart_rate': 'heart rate',
+    'temperature': 'temperature',
+    'weight': 'weight',
+    'oxygen_saturation': 'SpO2',
+    'blood_sugar': 'blood sugar',
+}
+
+BASELINE_WINDOW = 20
+MIN_BASELINE = 5
+Z_THRESHOLD = 3.5
+BASELINE_LOOKBACK = timedelta(days=30)
+DEDUP_WINDOW = timedelta(hours=6)
+BACKTEST_ELDER_CHUNK = 500
+
+_LIMITS = np.array([CLINICAL_LIMITS.get(metric, (None, None)) for metric in VITALS_METRICS], dtype=float)
+_LOW, _HIGH = _LIMITS[:, 0], _LIMITS[:, 1]
+_MIN_STD = np.array([MIN_STD[metric] for metric in VITALS_METRICS])
+
+Anomaly = namedtuple('Anomaly', 'reading_id elder_id recorded_at metric value kind direction score')
+
+
+class ReadingArrays:
+    """Readings as parallel arrays, sorted by elder then ``recorded_at``."""
+
+    def __init__(self, rows):
+        ids, elder_ids, self.recorded_at, values = [], [], [], []
+        for row in rows:
+            ids.append(row[0])
+            elder_ids.append(row[1])
+            self.recorded_at.append(row[2])
+            values.append([np.nan if value is None else float(value) for value in row[3:]])
+        self.ids = np.array(ids, dtype=np.int64)
+        self.elder_ids = np.array(elder_ids, dtype=np.int64)
+        self.values = np.array(values, dtype=float).reshape(len(ids), len(VITALS_METRICS))
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def load_readings(readings):
+    """``ReadingArrays`` for a ``VitalsLog`` queryset."""
+    rows = readings.order_by('elder_id', 'recorded_at', 'pk').values_list(
+        'pk', 'elder_id', 'recorded_at', *VITALS_METRICS
+    )
+    return ReadingArrays(rows.iterator(chunk_size=5000))
+
+
+def _group_starts(elder_ids):
+    """For each row, the index of the first row of its elder's block."""
+    first = np.r_[True, elder_ids[1:] != elder_ids[:-1]]
+    return np.flatnonzero(first)[np.cumsum(first) - 1]
+
+
+def rolling_baseline(arrays, window=BASELINE_WINDOW):
+    """
+    Mean, standard deviation and count of each elder's previous ``window``
+    values of every metric, per row. Returns three ``(n, metrics)`` arrays.
+    """
+    values = arrays.values
+    valid = ~np.isnan(values)
+    # Centre each column first so the cumulative sums keep their precision
+    filled = np.where(valid, values, 0.0)
+    offset = filled.sum(axis=0) / np.maximum(valid.sum(axis=0), 1)
+    centred = np.where(valid, values - offset, 0.0)
+
+    zero = np.zeros((1, values.shape[1]))
+    sums = np.vstack([zero, np.cumsum(centred, axis=0)])
+    squares = np.vstack([zero, np.cumsum(centred ** 2, axis=0)])
+    counts = np.vstack([zero, np.cumsum(valid, axis=0)])
+
+    rows = np.arange(len(arrays))
+    lo = np.maximum(_group_starts(arrays.elder_ids), rows - window)
+    count = counts[rows] - counts[lo]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (sums[rows] - sums[lo]) / count
+        variance = (squares[rows] - squares[lo]) / count - mean ** 2
+    return mean + offset, np.sqrt(np.clip(variance, 0, None)), count
+
+
+def score(arrays):
+    """Every anomaly in ``arrays``, as a list of ``Anomaly``."""
+    if not len(arrays):
+        return []
+    values = arrays.values
+    mean, std, count = rolling_baseline(arrays)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = (values - mean) / np.maximum(std, _MIN_STD)
+        low = values < _LOW
+        high = values > _HIGH
+        baseline = (count >= MIN_BASELINE) & (np.abs(z) >= Z_THRESHOLD)
+    flagged = low | high | baseline
+
+    anomalies = []
+    for row, column in zip(*np.nonzero(flagged)):
+        clinical = low[row, column] or high[row, column]
+        if clinical:
+            direction = 'LOW' if low[row, column] else 'HIGH'
+        else:
+            direction = 'LOW' if z[row, column] < 0 else 'HIGH'
+        anomalies.append(Anomaly(
+            reading_id=int(arrays.ids[row]),
+            elder_id=int(arrays.elder_ids[row]),
+            recorded_at=arrays.recorded_at[row],
+            metric=VITALS_METRICS[column],
+            value=float(values[row, column]),
+            kind='CLINICAL' if clinical else 'BASELINE',
+            direction=direction,
+            score=None if np.isnan(z[row, column]) else round(float(z[row, column]), 2),
+        ))
+    return anomalies
+
+
+def dedup_key(anomaly):
+    return f'vitals:{anomaly.elder_id}:{anomaly.metric}:{anomaly.direction}'
+
+
+def _message(anomaly, elder_names):
+    label = METRIC_LABELS[anomaly.metric]
+    value = f'{anomaly.value:g}'
+    when = timezone.localtime(anomaly.recorded_at).strftime('%b %d, %Y at %I:%M %p')
+    name = elder_names.get(anomaly.elder_id, f'resident #{anomaly.elder_id}')
+    if anomaly.kind == 'CLINICAL':
+        return f'Abnormal {label} for {name}: {value} recorded {when}.'
+    return f'Unusual {label} for {name}: {value} recorded {when} ({anomaly.score:+g} SD from their baseline).'
+
+
+def notify(anomalies, now=None):
+    """
+    Create one ``VITALS`` notification per dedup key not alerted within
+    ``DEDUP_WINDOW``. Clinical breaches are HIGH priority, baseline
+    deviations MEDIUM. Returns the notifications created.
+    """
+    now = now or timezone.now()
+    # Per key, the most recent clinical breach, else the most recent deviation
+    latest = {}
+    for anomaly in anomalies:
+        key = dedup_key(anomaly)
+        current = latest.get(key)
+        if current is None or (anomaly.kind == 'CLINICAL', anomaly.recorded_at) > (
+            current.kind == 'CLINICAL', current.recorded_at
+        ):
+            latest[key] = anomaly
+    if not latest:
+        return []
+
+    recent = set(Notification.objects.filter(
+        dedup_key__in=list(latest), created_at__gte=now - DEDUP_WINDOW
+    ).values_list('dedup_key', flat=True))
+    fresh = [anomaly for key, anomaly in latest.items() if key not in recent]
+    elder_names = dict(ElderProfile.objects.filter(
+        pk__in={anomaly.elder_id for anomaly in fresh}
+    ).values_list('pk', 'full_name'))
+    return create_notifications(
+        Notification(
+            elder_id=anomaly.elder_id,
+            notification_type='VITALS',
+            message=_message(anomaly, elder_names),
+            priority='HIGH' if anomaly.kind == 'CLINICAL' else 'MEDIUM',
+            created_at=now,
+            dedup_key=dedup_key(anomaly),
+        )
+        for anomaly in fresh
+    )
+
+
+def check_new_readings(elder_ids, since, until=None):
+    """
+    Score ``elder_ids``' readings recorded in ``[since, until]`` against
+    their recent history and notify about the anomalies. Returns the
+    anomalies found.
+    """
+    readings = VitalsLog.objects.filter(elder_id__in=list(elder_ids), recorded_at__gte=since - BASELINE_LOOKBACK)
+    if until is not None:
+        readings = readings.filter(recorded_at__lte=until)
+    anomalies = [anomaly for anomaly in score(load_readings(readings)) if anomaly.recorded_at >= since]
+    notify(anomalies)
+    return anomalies
+
+
+class BacktestResult:
+    def __init__(self):
+        self.readings = 0
+        self.elders = 0
+        self.anomalies = 0
+        self.by_metric = {}
+        self.notified = 0
+        self.duration = 0.0
+
+    def add(self, anomalies):
+        self.anomalies += len(anomalies)
+        for anomaly in anomalies:
+            key = f'{anomaly.metric}:{anomaly.kind}'
+            self.by_metric[key] = self.by_metric.get(key, 0) + 1
+
+    def as_dict(self):
+        return {
+            'readings': self.readings,
+            'elders': self.elders,
+            'anomalies': self.anomalies,
+            'by_metric': dict(sorted(self.by_metric.items())),
+            'notified': self.notified,
+            'duration': round(self.duration, 3),
+        }
+
+
+def backtest(elder_ids=None, since=None, until=None, notify_anomalies=False, chunk_size=BACKTEST_ELDER_CHUNK):
+    """
+    Re-score the vitals history of ``elder_ids`` (default: every elder),
+    ``chunk_size`` elders at a time. With ``notify_anomalies`` the
+    anomalies are also sent, subject to de-duplication. Returns a
+    ``BacktestResult``.
+    """
+    result = BacktestResult()
+    started = time.monotonic()
+    if elder_ids is None:
+        elder_ids = list(ElderProfile.objects.order_by('pk').values_list('pk', flat=True))
+    for offset in range(0, len(elder_ids), chunk_size):
+        readings = VitalsLog.objects.filter(elder_id__in=elder_ids[offset:offset + chunk_size])
+        if since is not None:
+            readings = readings.filter(recorded_at__gte=since)
+        if until is not None:
+            readings = readings.filter(recorded_at__lt=until)
+        arrays = load_readings(readings)
+        anomalies = score(arrays)
+        result.readings += len(arrays)
+        result.add(anomalies)
+        if notify_anomalies:
+            result.notified += len(notify(anomalies))
+    result.elders = len(elder_ids)
+    result.duration = time.monotonic() - started
+    logger.info('Vitals anomaly backtest: %s', result.as_dict())
+    return result
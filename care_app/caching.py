@@ -0,0 +1,92 @@
+"""
+Helpers for versioned cache keys.
+
+A version counter is a small integer stored in the cache under its own key.
+Cached values embed the counter in their key, so bumping the counter
+invalidates every value built on top of it without having to find and delete
+them individually.
+
+Everything care_app caches goes through ``get_cache()``, which returns the
+cache named by the ``CARE_CACHE_ALIAS`` setting; tests can point it at a
+separate cache with ``override_settings``.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def get_cache_alias():
+    return getattr(settings, 'CARE_CACHE_ALIAS', 'default')
+
+
+def get_cache():
+    """The cache care_app stores derived data in."""
+    return caches[get_cache_alias()]
+
+
+def is_shared_cache():
+    """
+    Whether every worker process sees the same cache. A per-process cache
+    only hears about invalidations made in its own process.
+    """
+    return not isinstance(get_cache(), (LocMemCache, DummyCache))
+
+
+def make_key(*parts):
+    """Join key parts into a single ``care:``-prefixed cache key."""
+    return 'care:' + ':'.join(str(part) for part in parts)
+
+
+def _version_key(name):
+    return make_key('version', name)
+
+
+def _initial_version():
+    # Seed with a timestamp rather than 1 so a counter evicted from the cache
+    # never comes back at a value that older entries were stored under.
+    return int(time.time() * 1000)
+
+
+def get_version(name):
+    """Return the current version counter for ``name``, creating it if needed."""
+    cache = get_cache()
+    key = _version_key(name)
+    version = cache.get(key)
+    if version is None:
+        version = _initial_version()
+        cache.add(key, version, None)
+        version = cache.get(key, version)
+    return version
+
+
+def bump_version(name):
+    """Invalidate everything cached under ``name``."""
+    cache = get_cache()
+    key = _version_key(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _initial_version()
+        cache.set(key, version, None)
+        return version
+
+
+def get_versions(*names):
+    """``get_version`` for several counters with one cache round trip."""
+    keys = {name: _version_key(name) for name in names}
+    found = get_cache().get_many(keys.values())
+    versions = {}
+    for name, key in keys.items():
+        versions[name] = found[key] if key in found else get_version(name)
+    return versions
+
+
+def reset_versions(*names):
+    """
+    Invalidate many counters at once by dropping them; each is reseeded from
+    the clock on its next read. Cheaper than ``bump_version`` in a loop.
+    """
+    get_cache().delete_many([_version_key(name) for name in names])
@@ -0,0 +1,285 @@
+"""
+Care task maintenance: overdue sweeps, recurring task generation and the
+per-caregiver work queue.
+
+``sweep_overdue_tasks`` moves open tasks whose due date has passed to
+``OVERDUE`` and notifies about the HIGH and URGENT ones. It works in batches
+driven by the ``(status, due_date)`` index: each batch selects the ids it is
+about to flip, updates them with one ``UPDATE`` per prior status (kept in
+``overdue_from`` so a reopened task returns to it) stamped with the batch's
+``overdue_at``, and bulk-creates notifications for the rows carrying that
+stamp in the same transaction. A task is therefore reported overdue exactly
+once even with several sweepers running (rows are claimed with ``SKIP
+LOCKED`` where the database supports it). Only tasks a sweep flagged are
+reopened when their due date moves back; a task marked OVERDUE by hand
+stays that way.
+
+``generate_recurring_tasks`` materializes the occurrences of recurring
+template tasks over a rolling horizon. Each occurrence is keyed by
+``(recurrence_parent, occurrence_date)``, so reruns and concurrent runs
+never duplicate one.
+"""
+import calendar
+import logging
+import time
+from datetime import datetime, timedelta
+from datetime import time as dt_time
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .caching import get_cache, make_key
+from .dashboard import invalidate_dashboards
+from .fragments import invalidate_elder_section
+from .models import CareTask, Notification, SearchDocument
+from .notifications import create_notifications
+from .search import build_document
+
+logger = logging.getLogger(__name__)
+
+SWEEP_BATCH_SIZE = 5000
+SWEEP_STATUSES = ['PENDING', 'IN_PROGRESS']
+NOTIFY_PRIORITIES = ['HIGH', 'URGENT']
+LAST_SWEEP_KEY = make_key('sweeps', 'overdue_tasks')
+
+WORK_QUEUE_STATUSES = ['PENDING', 'IN_PROGRESS', 'OVERDUE']
+WORK_QUEUE_SIZE = 20
+
+RECURRENCE_HORIZON_DAYS = 7
+RECURRENCE_CHUNK_SIZE = 500
+RECURRING_TASK_TYPES = ['DAILY', 'WEEKLY', 'MONTHLY']
+DEFAULT_OCCURRENCE_TIME = dt_time(9, 0)
+
+
+class SweepResult:
+    def __init__(self):
+        self.scanned = 0
+        self.updated = 0
+        self.notified = 0
+        self.reopened = 0
+        self.batches = 0
+        self.duration = 0.0
+        self.elder_ids = set()
+
+    def as_dict(self):
+        return {
+            'scanned': self.scanned,
+            'updated': self.updated,
+            'notified': self.notified,
+            'reopened': self.reopened,
+            'batches': self.batches,
+            'duration': round(self.duration, 3),
+        }
+
+
+def _overdue_message(title, due_date):
+    when = timezone.localtime(due_date).strftime('%b %d, %Y at %I:%M %p')
+    return f'Task overdue: {title or "Untitled task"} was due {when}'
+
+
+def _sweep_batch(now, batch_size, result):
+    candidates = CareTask.objects.filter(status__in=SWEEP_STATUSES, due_date__lt=now, is_recurring=False)
+    if connection.features.has_select_for_update_skip_locked:
+        candidates = candidates.select_for_update(skip_locked=True)
+    batch = list(candidates.values_list('pk', 'elder_id', 'priority', 'title', 'due_date')[:batch_size])
+    result.scanned += len(batch)
+    if not batch:
+        return 0
+
+    # Another sweeper may have flipped some of these since they were read
+    # (SQLite has no SKIP LOCKED), so stamp the rows this batch flips and
+    # notify about those alone
+    claimed_at = timezone.now()
+    ids = [row[0] for row in batch]
+    updated = 0
+    for status in SWEEP_STATUSES:
+        updated += CareTask.objects.filter(pk__in=ids, status=status).update(
+            status='OVERDUE', overdue_from=status, overdue_at=claimed_at
+        )
+    flipped = set(CareTask.objects.filter(pk__in=ids, overdue_at=claimed_at).values_list('pk', flat=True))
+    notifications = create_notifications(
+        Notification(
+            elder_id=elder_id,
+            notification_type='TASK',
+            message=_overdue_message(title, due_date),
+            priority='HIGH',
+        )
+        for pk, elder_id, priority, title, due_date in batch
+        if pk in flipped and priority in NOTIFY_PRIORITIES
+    )
+    elder_ids = {row[1] for row in batch}
+    invalidate_elder_section('tasks', *elder_ids)
+    result.elder_ids |= elder_ids
+    result.updated += updated
+    result.notified += len(notifications)
+    result.batches += 1
+    return len(batch)
+
+
+def sweep_overdue_tasks(now=None, batch_size=SWEEP_BATCH_SIZE):
+    """Flip past-due open tasks to OVERDUE. Returns a ``SweepResult``."""
+    now = now or timezone.now()
+    result = SweepResult()
+    started = time.monotonic()
+
+    while True:
+        with transaction.atomic():
+            claimed = _sweep_batch(now, batch_size, result)
+        if claimed < batch_size:
+            break
+
+    # Tasks whose due date was pushed back are no longer overdue; they go
+    # back to the status the sweep took them from. Tasks marked OVERDUE by
+    # hand carry no overdue_from and are left alone
+    reopened = CareTask.objects.filter(status='OVERDUE', due_date__gte=now, overdue_from__in=SWEEP_STATUSES)
+    reopened_elder_ids = set(reopened.values_list('elder_id', flat=True))
+    invalidate_elder_section('tasks', *reopened_elder_ids)
+    result.elder_ids |= reopened_elder_ids
+    for status in SWEEP_STATUSES:
+        result.reopened += reopened.filter(overdue_from=status).update(
+            status=status, overdue_from='', overdue_at=None
+        )
+
+    if result.updated or result.reopened:
+        invalidate_dashboards(*result.elder_ids)
+    result.duration = time.monotonic() - started
+    metrics = result.as_dict()
+    get_cache().set(LAST_SWEEP_KEY, dict(metrics, finished_at=timezone.now()), None)
+    logger.info('Overdue task sweep: %s', metrics)
+    return result
+
+
+def last_sweep_metrics():
+    """Metrics of the most recent sweep, or ``None`` if none has run."""
+    return get_cache().get(LAST_SWEEP_KEY)
+
+
+def _recurs_on(task_type, anchor, day):
+    if task_type == 'DAILY':
+        return True
+    if task_type == 'WEEKLY':
+        return (day - anchor).days % 7 == 0
+    # MONTHLY: the anchor's day of month, clamped to short months
+    return day.day == min(anchor.day, calendar.monthrange(day.year, day.month)[1])
+
+
+def occurrence_dates(template, start, end):
+    """
+    Local dates in ``[start, end)`` on which ``template`` recurs.
+
+    Weekly and monthly templates recur relative to their due date (or
+    creation time). One with neither has no fixed weekday or day of month,
+    so it yields nothing rather than recurring on every run's start day.
+    """
+    anchor_at = template.due_date or template.created_at
+    if anchor_at is None and template.task_type != 'DAILY':
+        return
+    anchor = timezone.localtime(anchor_at).date() if anchor_at else start
+    day = max(start, anchor)
+    while day < end:
+        if _recurs_on(template.task_type, anchor, day):
+            yield day
+        day += timedelta(days=1)
+
+
+def _build_occurrence(template, day, now):
+    at = timezone.localtime(template.due_date).time() if template.due_date else DEFAULT_OCCURRENCE_TIME
+    return CareTask(
+        elder_id=template.elder_id,
+        title=template.title,
+        description=template.description,
+        task_type=template.task_type,
+        frequency=template.frequency,
+        assigned_to_id=template.assigned_to_id,
+        priority=template.priority,
+        priority_rank=template.priority_rank,
+        due_date=timezone.make_aware(datetime.combine(day, at)),
+        created_at=now,
+        recurrence_parent_id=template.pk,
+        occurrence_date=day,
+    )
+
+
+def _generate_chunk(templates, start, end, now):
+    existing = set(CareTask.objects.filter(
+        recurrence_parent_id__in=[template.pk for template in templates],
+        occurrence_date__gte=start,
+        occurrence_date__lt=end,
+    ).values_list('recurrence_parent_id', 'occurrence_date'))
+    occurrences = [
+        _build_occurrence(template, day, now)
+        for template in templates
+        for day in occurrence_dates(template, start, end)
+        if (template.pk, day) not in existing
+    ]
+    if not occurrences:
+        return 0
+    with transaction.atomic():
+        # ignore_conflicts covers a concurrent run inserting the same occurrence
+        CareTask.objects.bulk_create(occurrences, batch_size=RECURRENCE_CHUNK_SIZE, ignore_conflicts=True)
+        # bulk_create skips the signal handlers, so index the new rows here
+        # and count only the rows this run inserted
+        inserted = list(CareTask.objects.filter(
+            recurrence_parent_id__in=[template.pk for template in templates],
+            occurrence_date__gte=start,
+            occurrence_date__lt=end,
+            created_at=now,
+        ).only('pk', 'elder_id', 'title', 'description'))
+        SearchDocument.objects.bulk_create(
+            [build_document('tasks', task) for task in inserted],
+            batch_size=RECURRENCE_CHUNK_SIZE,
+            ignore_conflicts=True,
+        )
+    if inserted:
+        elder_ids = {task.elder_id for task in inserted}
+        invalidate_elder_section('tasks', *elder_ids)
+        invalidate_dashboards(*elder_ids)
+    return len(inserted)
+
+
+def generate_recurring_tasks(horizon_days=RECURRENCE_HORIZON_DAYS, today=None, chunk_size=RECURRENCE_CHUNK_SIZE):
+    """
+    Create the missing occurrences of every recurring template due from
+    ``today`` through the next ``horizon_days`` days. Returns the number of
+    occurrences created.
+    """
+    now = timezone.now()
+    start = today or timezone.localdate()
+    end = start + timedelta(days=horizon_days)
+    templates = CareTask.objects.filter(
+        is_recurring=True,
+        task_type__in=RECURRING_TASK_TYPES,
+        recurrence_parent__isnull=True,
+    ).exclude(status='CANCELLED').order_by('pk')
+
+    created = 0
+    chunk = []
+    for template in templates.iterator(chunk_size=chunk_size):
+        chunk.append(template)
+        if len(chunk) >= chunk_size:
+            created += _generate_chunk(chunk, start, end, now)
+            chunk = []
+    if chunk:
+        created += _generate_chunk(chunk, start, end, now)
+    logger.info('Generated %d recurring task occurrence(s) through %s', created, end)
+    return created
+
+
+def work_queue(user, limit=WORK_QUEUE_SIZE):
+    """
+    The next ``limit`` open tasks assigned to ``user``, most urgent first,
+    then earliest due.
+
+    The ids are read in ``task_queue_idx`` order, so the scan stops after
+    ``limit`` matching entries without touching the table; only the
+    returned tasks are then loaded. Tasks without a due date follow the
+    database's NULL ordering (first on SQLite and MySQL, last on
+    PostgreSQL).
+    """
+    task_ids = list(CareTask.objects.filter(
+        assigned_to=user,
+        status__in=WORK_QUEUE_STATUSES,
+        is_recurring=False,
+    ).order_by('-priority_rank', 'due_date').values_list('pk', flat=True)[:limit])
+    tasks = CareTask.objects.select_related('elder').in_bulk(task_ids)
+    return [tasks[pk] for pk in task_ids]
@@ -0,0 +1,18 @@
+from .access import get_access_scope
+from .notifications import get_notification_summary
+
+
+def notification_summary(request):
+    """Expose the cached unread count and preview to every template."""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'notification_summary': get_notification_summary(user)}
+
+
+def access_scope(request):
+    """Expose the cached role and elder sets so templates need not load the profile."""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'access_scope': get_access_scope(user)}
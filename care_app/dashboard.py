@@ -0,0 +1,95 @@
+"""
+Dashboard snapshots.
+
+Everything the dashboard shows for a user is computed once into a plain
+snapshot and cached. The snapshot depends only on which elders the user may
+list, so users with the same scope share one: every staff member shares the
+facility-wide snapshot, and a guardian shares theirs with anyone who sees
+the same elders. Notifications are read per user, so the view takes them
+from the notification summary instead.
+
+Snapshots live for ``DASHBOARD_TIMEOUT`` seconds and are keyed by version
+counters, so a change shows up on the next request rather than after the
+timeout. Each elder has a counter, bumped by the signal handlers and bulk
+writers when something of theirs changes; a scoped snapshot's key embeds
+the counters of its elders, so a write only evicts the snapshots that show
+that elder. The facility-wide snapshot covers every elder and is keyed by
+the ``dashboard`` counter, which every invalidation bumps.
+
+Only ids, names and counts are cached for the "vitals due" list, which can
+cover every elder in the facility.
+"""
+import hashlib
+
+from django.utils import timezone
+
+from .access import accessible_elders, filter_by_access, get_access_scope
+from .caching import bump_version, get_cache, get_version, get_versions, make_key, reset_versions
+from .mar import todays_dose_slots
+from .models import Appointment, CareTask, IncidentReport
+
+DASHBOARD_VERSION = 'dashboard'
+DASHBOARD_RESET_VERSION = 'dashboard:reset'
+DASHBOARD_TIMEOUT = 60
+VITALS_DUE_PREVIEW_SIZE = 10
+
+
+def elder_version(elder_id):
+    """Name of ``elder_id``'s dashboard version counter."""
+    return f'dashboard:elder:{elder_id}'
+
+
+def build_dashboard_snapshot(user):
+    elders = accessible_elders(user)
+    vitals_due = elders.vitals_due(days=7).order_by('full_name', 'pk')
+    return {
+        'total_elders': elders.count(),
+        'upcoming_appointments': list(filter_by_access(Appointment.objects.filter(
+            appointment_date__gte=timezone.now(),
+            status__in=['SCHEDULED', 'CONFIRMED']
+        ), user).select_related('elder').order_by('appointment_date')[:5]),
+        'pending_tasks': list(filter_by_access(
+            CareTask.objects.filter(status__in=['PENDING', 'OVERDUE'], is_recurring=False), user
+        ).select_related('elder', 'assigned_to').order_by('-priority_rank', 'due_date')[:10]),
+        'recent_incidents': list(filter_by_access(
+            IncidentReport.objects.filter(is_resolved=False), user
+        ).select_related('elder').order_by('-incident_date')[:5]),
+        'today_doses': todays_dose_slots(user),
+        'vitals_due': list(vitals_due.values('id', 'full_name')[:VITALS_DUE_PREVIEW_SIZE]),
+        'vitals_due_count': vitals_due.count(),
+    }
+
+
+def _snapshot_key(scope):
+    elder_ids = scope.accessible_elder_ids
+    if elder_ids is None:
+        return make_key('dashboard', 'all', get_version(DASHBOARD_VERSION))
+    names = [DASHBOARD_RESET_VERSION] + [elder_version(elder_id) for elder_id in sorted(elder_ids)]
+    versions = get_versions(*names)
+    digest = hashlib.sha1(
+        ','.join(f'{name}={versions[name]}' for name in names).encode()
+    ).hexdigest()
+    return make_key('dashboard', 'scope', digest)
+
+
+def get_dashboard_snapshot(user):
+    """Return the cached snapshot for ``user``, building it on a miss."""
+    cache = get_cache()
+    key = _snapshot_key(get_access_scope(user))
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_dashboard_snapshot(user)
+        cache.set(key, snapshot, DASHBOARD_TIMEOUT)
+    return snapshot
+
+
+def invalidate_dashboards(*elder_ids):
+    """
+    Drop the snapshots that show any of ``elder_ids`` (and the
+    facility-wide one); with no ids, drop every snapshot.
+    """
+    bump_version(DASHBOARD_VERSION)
+    if not elder_ids:
+        bump_version(DASHBOARD_RESET_VERSION)
+    else:
+        reset_versions(*{elder_version(elder_id) for elder_id in elder_ids})
@@ -2,18 +2,20 @@ from functools import wraps
 from django.shortcuts import redirect
 from django.contrib import messages
 from django.http import Http404
-from .models import UserProfile, ElderProfile
+from .access import get_access_scope
+from .models import ElderProfile
+
+def _require_elder(scope, elder_id):
+    """Raise 404 for unknown elders and for elders outside the user's lists."""
+    if not scope.can_list(elder_id) or not ElderProfile.objects.filter(pk=elder_id).exists():
+        raise Http404("Elder not found.")
 
 def admin_required(view_func):
     """Decorator to require admin access"""
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
-        try:
-            user_profile = request.user.profile
-            if user_profile and user_profile.user_type == 'ADMIN':
-                return view_func(request, *args, **kwargs)
-        except UserProfile.DoesNotExist:
-            pass
+        if get_access_scope(request.user).user_type == 'ADMIN':
+            return view_func(request, *args, **kwargs)
         
         messages.error(request, "Administrator access required.")
         return redirect('dashboard')
@@ -23,12 +25,8 @@ def caregiver_required(view_func):
     """Decorator to require caregiver access"""
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
-        try:
-            user_profile = request.user.profile
-            if user_profile and user_profile.user_type in ['ADMIN', 'CAREGIVER', 'NURSE', 'DOCTOR']:
-                return view_func(request, *args, **kwargs)
-        except UserProfile.DoesNotExist:
-            pass
+        if get_access_scope(request.user).user_type in ['ADMIN', 'CAREGIVER', 'NURSE', 'DOCTOR']:
+            return view_func(request, *args, **kwargs)
         
         messages.error(request, "Caregiver access required.")
         return redirect('dashboard')
@@ -38,12 +36,8 @@ def medical_staff_required(view_func):
     """Decorator to require medical staff access (nurse/doctor)"""
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
-        try:
-            user_profile = request.user.profile
-            if user_profile and user_profile.user_type in ['ADMIN', 'NURSE', 'DOCTOR']:
-                return view_func(request, *args, **kwargs)
-        except UserProfile.DoesNotExist:
-            pass
+        if get_access_scope(request.user).user_type in ['ADMIN', 'NURSE', 'DOCTOR']:
+            return view_func(request, *args, **kwargs)
         
         messages.error(request, "Medical staff access required.")
         return redirect('dashboard')
@@ -61,27 +55,13 @@ def elder_access_required(view_func):
             messages.error(request, "Elder ID required.")
             return redirect('elder_list')
         
-        try:
-            elder = ElderProfile.objects.get(pk=elder_id)
-        except ElderProfile.DoesNotExist:
-            raise Http404("Elder not found.")
+        scope = get_access_scope(request.user)
+        _require_elder(scope, elder_id)
         
-        # Check if user has access to this elder
-        try:
-            user_profile = request.user.profile
-            if user_profile and user_profile.user_type == 'ADMIN':
-                # Admin can access all elders
-                return view_func(request, *args, **kwargs)
-            elif user_profile and user_profile.user_type in ['CAREGIVER', 'NURSE', 'DOCTOR']:
-                # Medical staff can access elders they're assigned to
-                if elder.guardian == request.user or request.user.assigned_elders.filter(pk=elder.pk).exists():
-                    return view_func(request, *args, **kwargs)
-            elif elder.guardian == request.user:
-                # Guardian can access their own elders
-                return view_func(request, *args, **kwargs)
-        except UserProfile.DoesNotExist:
-            if elder.guardian == request.user:
-                return view_func(request, *args, **kwargs)
+        # Admins see everyone, guardians their own elders, staff their active
+        # assignments
+        if scope.can_access(elder_id):
+            return view_func(request, *args, **kwargs)
         
         messages.error(request, "You don't have permission to access this elder's information.")
         return redirect('elder_list')
@@ -99,24 +79,13 @@ def can_edit_elder(view_func):
             messages.error(request, "Elder ID required.")
             return redirect('elder_list')
         
-        try:
-            elder = ElderProfile.objects.get(pk=elder_id)
-        except ElderProfile.DoesNotExist:
-            raise Http404("Elder not found.")
+        scope = get_access_scope(request.user)
+        _require_elder(scope, elder_id)
         
-        # Check if user can edit this elder
-        try:
-            user_profile = request.user.profile
-            if user_profile and user_profile.user_type == 'ADMIN':
-                # Admin can edit all elders
-                return view_func(request, *args, **kwargs)
-            elif elder.guardian == request.user:
-                # Guardian can edit their own elders
-                return view_func(request, *args, **kwargs)
-        except UserProfile.DoesNotExist:
-            if elder.guardian == request.user:
-                return view_func(request, *args, **kwargs)
+        # Admins can edit all elders, guardians their own
+        if scope.can_edit(elder_id):
+            return view_func(request, *args, **kwargs)
         
         messages.error(request, "You don't have permission to edit this elder's profile.")
-        return redirect('elder_detail', elder_id=elder.pk)
+        return redirect('elder_detail', elder_id=elder_id)
     return _wrapped_view
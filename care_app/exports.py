@@ -0,0 +1,174 @@
+"""
+Streaming CSV / NDJSON exports.
+
+Rows are read in keyset-paged chunks of ``EXPORT_CHUNK_SIZE`` - each query
+seeks past the ``(date, pk)`` of the previous chunk's last row along a
+``(date, id)`` index, so every chunk costs the same - and encoded
+one at a time into a ``StreamingHttpResponse``, so an export never holds more
+than one chunk in memory however many rows it covers. (A single
+``.iterator()`` query would not do: MySQL drivers buffer the whole result
+client-side.) Rows are restricted with the same access rules as the list
+views.
+"""
+import csv
+import json
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+
+from .access import filter_by_access
+from .models import Appointment, IncidentReport, MedicationLog, VitalsLog
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_LINES_PER_WRITE = 500
+
+# kind -> (model, path to the elder FK, date field, [(column, lookup)])
+EXPORTS = {
+    'vitals': (VitalsLog, 'elder', 'recorded_at', [
+        ('id', 'pk'),
+        ('elder_id', 'elder_id'),
+        ('elder', 'elder__full_name'),
+        ('recorded_at', 'recorded_at'),
+        ('blood_pressure_systolic', 'blood_pressure_systolic'),
+        ('blood_pressure_diastolic', 'blood_pressure_diastolic'),
+        ('heart_rate', 'heart_rate'),
+        ('temperature', 'temperature'),
+        ('weight', 'weight'),
+        ('oxygen_saturation', 'oxygen_saturation'),
+        ('blood_sugar', 'blood_sugar'),
+        ('notes', 'notes'),
+        ('logged_by', 'logged_by__username'),
+    ]),
+    'medication-logs': (MedicationLog, 'schedule__elder', 'taken_at', [
+        ('id', 'pk'),
+        ('elder_id', 'schedule__elder_id'),
+        ('elder', 'schedule__elder__full_name'),
+        ('schedule_id', 'schedule_id'),
+        ('medication', 'schedule__medication__name'),
+        ('dosage', 'schedule__dosage'),
+        ('taken_at', 'taken_at'),
+        ('was_skipped', 'was_skipped'),
+        ('skip_reason', 'skip_reason'),
+        ('notes', 'notes'),
+        ('taken_by', 'taken_by__username'),
+    ]),
+    'incidents': (IncidentReport, 'elder', 'incident_date', [
+        ('id', 'pk'),
+        ('elder_id', 'elder_id'),
+        ('elder', 'elder__full_name'),
+        ('incident_type', 'incident_type'),
+        ('severity', 'severity'),
+        ('incident_date', 'incident_date'),
+        ('report_date', 'report_date'),
+        ('location', 'location'),
+        ('description', 'description'),
+        ('actions_taken', 'actions_taken'),
+        ('follow_up_required', 'follow_up_required'),
+        ('is_resolved', 'is_resolved'),
+        ('resolved_date', 'resolved_date'),
+        ('reported_by', 'reported_by__username'),
+    ]),
+    'appointments': (Appointment, 'elder', 'appointment_date', [
+        ('id', 'pk'),
+        ('elder_id', 'elder_id'),
+        ('elder', 'elder__full_name'),
+        ('title', 'title'),
+        ('appointment_type', 'appointment_type'),
+        ('appointment_date', 'appointment_date'),
+        ('duration', 'duration'),
+        ('status', 'status'),
+        ('doctor_name', 'doctor_name'),
+        ('location', 'location'),
+        ('notes', 'notes'),
+    ]),
+}
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def export_rows(kind, user, elder_id=None, since=None, until=None):
+    """Return ``(columns, row iterator)`` for one export, scoped to ``user``."""
+    model, elder_field, date_field, columns = EXPORTS[kind]
+    queryset = filter_by_access(model.objects.all(), user, elder_field=elder_field)
+    if elder_id is not None:
+        queryset = queryset.filter(**{f'{elder_field}_id': elder_id})
+    if since is not None:
+        queryset = queryset.filter(**{f'{date_field}__gte': since})
+    if until is not None:
+        queryset = queryset.filter(**{f'{date_field}__lt': until})
+
+    rows = queryset.order_by(date_field, 'pk').values_list(date_field, 'pk', *[lookup for _, lookup in columns])
+    return [name for name, _ in columns], _keyset_chunks(rows, date_field, EXPORT_CHUNK_SIZE)
+
+
+def _keyset_chunks(rows, date_field, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield ``rows`` (ordered by date and pk, both selected first) one bounded query at a time."""
+    seek = None
+    while True:
+        chunk = list((rows.filter(seek) if seek is not None else rows)[:chunk_size])
+        for row in chunk:
+            yield row[2:]
+        if len(chunk) < chunk_size:
+            return
+        last_date, last_pk = chunk[-1][:2]
+        # date >= last AND (date > last OR pk > last_pk): the leading range lets the index seek
+        seek = Q(**{f'{date_field}__gte': last_date}) & (
+            Q(**{f'{date_field}__gt': last_date}) | Q(pk__gt=last_pk)
+        )
+
+
+def _cell(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat()
+    return value
+
+
+class _Echo:
+    """File-like object whose ``write`` hands the encoded line straight back."""
+
+    def write(self, value):
+        return value
+
+
+def _batched(lines, size=EXPORT_LINES_PER_WRITE):
+    """Join lines into fewer, larger writes; one socket write per row is slow."""
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def _csv_lines(columns, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([_cell(value) for value in row])
+
+
+def _ndjson_lines(columns, rows):
+    for row in rows:
+        record = dict(zip(columns, (_cell(value) for value in row)))
+        yield json.dumps(record, cls=DjangoJSONEncoder) + '\n'
+
+
+def stream_csv(columns, rows):
+    return _batched(_csv_lines(columns, rows))
+
+
+def stream_ndjson(columns, rows):
+    return _batched(_ndjson_lines(columns, rows))
+
+
+STREAMERS = {
+    'csv': stream_csv,
+    'ndjson': stream_ndjson,
+}
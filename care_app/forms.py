@@ -6,6 +6,29 @@ from .models import (
     Appointment, CareTask, EmergencyContact, VitalsLog, 
     IncidentReport, Notification, UserProfile
 )
+from .access import get_access_scope
+
+class ElderChoiceMixin:
+    """Limit the ``elder`` field to elders the current user may attach records to."""
+
+    def __init__(self, *args, **kwargs):
+        self.user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+        if self.user:
+            scope = get_access_scope(self.user)
+            if scope.sees_all_elders:
+                self.fields['elder'].queryset = ElderProfile.objects.all()
+            else:
+                self.fields['elder'].queryset = ElderProfile.objects.filter(pk__in=scope.guardian_elder_ids)
+
+    def clean_elder(self):
+        elder = self.cleaned_data.get('elder')
+        if not self.user or not elder:
+            return elder
+        scope = get_access_scope(self.user)
+        if not scope.sees_all_elders and not scope.is_guardian_of(elder.pk):
+            raise ValidationError("Guardians can only select their own elders.")
+        return elder
 
 class ElderForm(forms.ModelForm):
     class Meta:
@@ -29,20 +52,11 @@ class ElderForm(forms.ModelForm):
         
         # Restrict guardian selection based on user permissions
         if self.user:
-            try:
-                user_profile = self.user.profile
-                if user_profile and user_profile.user_type == 'ADMIN':
-                    # Admin can assign to any user
-                    self.fields['guardian'].queryset = User.objects.all().order_by('username')
-                else:
-                    # Non-admin users can only assign to themselves
-                    self.fields['guardian'].queryset = User.objects.filter(id=self.user.id)
-                    self.fields['guardian'].initial = self.user
-                    self.fields['guardian'].widget.attrs['readonly'] = 'readonly'
-                    self.fields['guardian'].widget.attrs['class'] = 'form-control bg-light'
-                    self.fields['guardian'].help_text = 'You can only add elders for yourself.'
-            except UserProfile.DoesNotExist:
-                # No profile means not admin - restrict to self only
+            if get_access_scope(self.user).is_admin:
+                # Admin can assign to any user
+                self.fields['guardian'].queryset = User.objects.all().order_by('username')
+            else:
+                # Non-admin users can only assign to themselves
                 self.fields['guardian'].queryset = User.objects.filter(id=self.user.id)
                 self.fields['guardian'].initial = self.user
                 self.fields['guardian'].widget.attrs['readonly'] = 'readonly'
@@ -53,17 +67,10 @@ class ElderForm(forms.ModelForm):
         """Validate guardian selection based on user permissions"""
         guardian = self.cleaned_data.get('guardian')
         
-        if self.user:
-            try:
-                user_profile = self.user.profile
-                if not user_profile or user_profile.user_type != 'ADMIN':
-                    # Non-admin users can only assign to themselves
-                    if guardian != self.user:
-                        raise forms.ValidationError("You can only add elders for yourself.")
-            except UserProfile.DoesNotExist:
-                # No profile means not admin
-                if guardian != self.user:
-                    raise forms.ValidationError("You can only add elders for yourself.")
+        if self.user and not get_access_scope(self.user).is_admin:
+            # Non-admin users can only assign to themselves
+            if guardian != self.user:
+                raise forms.ValidationError("You can only add elders for yourself.")
         
         return guardian
 
@@ -72,7 +79,7 @@ class MedicationForm(forms.ModelForm):
         model = Medication
         fields = ['name', 'description', 'medication_type', 'strength', 'manufacturer']
 
-class MedicationScheduleForm(forms.ModelForm):
+class MedicationScheduleForm(ElderChoiceMixin, forms.ModelForm):
     class Meta:
         model = MedicationSchedule
         fields = [
@@ -88,33 +95,6 @@ class MedicationScheduleForm(forms.ModelForm):
             'instructions': forms.Textarea(attrs={'rows': 3}),
         }
 
-    def __init__(self, *args, **kwargs):
-        self.user = kwargs.pop('user', None)
-        super().__init__(*args, **kwargs)
-        if self.user:
-            try:
-                up = self.user.profile
-                if up and up.user_type in ['ADMIN', 'DOCTOR', 'NURSE', 'CAREGIVER']:
-                    self.fields['elder'].queryset = ElderProfile.objects.all()
-                else:
-                    self.fields['elder'].queryset = ElderProfile.objects.filter(guardian=self.user)
-            except UserProfile.DoesNotExist:
-                self.fields['elder'].queryset = ElderProfile.objects.filter(guardian=self.user)
-
-    def clean_elder(self):
-        elder = self.cleaned_data.get('elder')
-        if not self.user or not elder:
-            return elder
-        try:
-            up = self.user.profile
-            if not up or up.user_type not in ['ADMIN', 'DOCTOR', 'NURSE', 'CAREGIVER']:
-                if elder.guardian_id != self.user.id:
-                    raise ValidationError("Guardians can only select their own elders.")
-        except UserProfile.DoesNotExist:
-            if elder.guardian_id != self.user.id:
-                raise ValidationError("Guardians can only select their own elders.")
-        return elder
-
 class MedicationLogForm(forms.ModelForm):
     class Meta:
         model = MedicationLog
@@ -124,7 +104,7 @@ class MedicationLogForm(forms.ModelForm):
             'skip_reason': forms.Textarea(attrs={'rows': 3}),
         }
 
-class AppointmentForm(forms.ModelForm):
+class AppointmentForm(ElderChoiceMixin, forms.ModelForm):
     class Meta:
         model = Appointment
         fields = [
@@ -139,39 +119,12 @@ class AppointmentForm(forms.ModelForm):
             'notes': forms.Textarea(attrs={'rows': 3}),
         }
 
-    def __init__(self, *args, **kwargs):
-        self.user = kwargs.pop('user', None)
-        super().__init__(*args, **kwargs)
-        if self.user:
-            try:
-                up = self.user.profile
-                if up and up.user_type in ['ADMIN', 'DOCTOR', 'NURSE', 'CAREGIVER']:
-                    self.fields['elder'].queryset = ElderProfile.objects.all()
-                else:
-                    self.fields['elder'].queryset = ElderProfile.objects.filter(guardian=self.user)
-            except UserProfile.DoesNotExist:
-                self.fields['elder'].queryset = ElderProfile.objects.filter(guardian=self.user)
-
-    def clean_elder(self):
-        elder = self.cleaned_data.get('elder')
-        if not self.user or not elder:
-            return elder
-        try:
-            up = self.user.profile
-            if not up or up.user_type not in ['ADMIN', 'DOCTOR', 'NURSE', 'CAREGIVER']:
-                if elder.guardian_id != self.user.id:
-                    raise ValidationError("Guardians can only select their own elders.")
-        except UserProfile.DoesNotExist:
-            if elder.guardian_id != self.user.id:
-                raise ValidationError("Guardians can only select their own elders.")
-        return elder
-
-class CareTaskForm(forms.ModelForm):
+class CareTaskForm(ElderChoiceMixin, forms.ModelForm):
     class Meta:
         model = CareTask
         fields = [
             'elder', 'title', 'description', 'task_type', 'frequency',
-            'assigned_to', 'priority', 'due_date', 'notes'
+            'is_recurring', 'assigned_to', 'priority', 'due_date', 'notes'
         ]
         widgets = {
             'description': forms.Textarea(attrs={'rows': 3}),
@@ -182,33 +135,6 @@ class CareTaskForm(forms.ModelForm):
             'notes': forms.Textarea(attrs={'rows': 3}),
         }
 
-    def __init__(self, *args, **kwargs):
-        self.user = kwargs.pop('user', None)
-        super().__init__(*args, **kwargs)
-        if self.user:
-            try:
-                up = self.user.profile
-                if up and up.user_type in ['ADMIN', 'DOCTOR', 'NURSE', 'CAREGIVER']:
-                    self.fields['elder'].queryset = ElderProfile.objects.all()
-                else:
-                    self.fields['elder'].queryset = ElderProfile.objects.filter(guardian=self.user)
-            except UserProfile.DoesNotExist:
-                self.fields['elder'].queryset = ElderProfile.objects.filter(guardian=self.user)
-
-    def clean_elder(self):
-        elder = self.cleaned_data.get('elder')
-        if not self.user or not elder:
-            return elder
-        try:
-            up = self.user.profile
-            if not up or up.user_type not in ['ADMIN', 'DOCTOR', 'NURSE', 'CAREGIVER']:
-                if elder.guardian_id != self.user.id:
-                    raise ValidationError("Guardians can only select their own elders.")
-        except UserProfile.DoesNotExist:
-            if elder.guardian_id != self.user.id:
-                raise ValidationError("Guardians can only select their own elders.")
-        return elder
-
 class EmergencyContactForm(forms.ModelForm):
     class Meta:
         model = EmergencyContact
@@ -230,7 +156,7 @@ class VitalsLogForm(forms.ModelForm):
             'notes': forms.Textarea(attrs={'rows': 3}),
         }
 
-class IncidentReportForm(forms.ModelForm):
+class IncidentReportForm(ElderChoiceMixin, forms.ModelForm):
     class Meta:
         model = IncidentReport
         fields = [
@@ -250,33 +176,6 @@ class IncidentReportForm(forms.ModelForm):
             'follow_up_notes': forms.Textarea(attrs={'rows': 3}),
         }
 
-    def __init__(self, *args, **kwargs):
-        self.user = kwargs.pop('user', None)
-        super().__init__(*args, **kwargs)
-        if self.user:
-            try:
-                up = self.user.profile
-                if up and up.user_type in ['ADMIN', 'DOCTOR', 'NURSE', 'CAREGIVER']:
-                    self.fields['elder'].queryset = ElderProfile.objects.all()
-                else:
-                    self.fields['elder'].queryset = ElderProfile.objects.filter(guardian=self.user)
-            except UserProfile.DoesNotExist:
-                self.fields['elder'].queryset = ElderProfile.objects.filter(guardian=self.user)
-
-    def clean_elder(self):
-        elder = self.cleaned_data.get('elder')
-        if not self.user or not elder:
-            return elder
-        try:
-            up = self.user.profile
-            if not up or up.user_type not in ['ADMIN', 'DOCTOR', 'NURSE', 'CAREGIVER']:
-                if elder.guardian_id != self.user.id:
-                    raise ValidationError("Guardians can only select their own elders.")
-        except UserProfile.DoesNotExist:
-            if elder.guardian_id != self.user.id:
-                raise ValidationError("Guardians can only select their own elders.")
-        return elder
-
 class NotificationForm(forms.ModelForm):
     class Meta:
         model = Notification
@@ -311,35 +210,19 @@ class UserProfileForm(forms.ModelForm):
             self.fields['email'].initial = self.instance.user.email
         
         # Make user_type read-only for non-admin users
-        if self.user:
-            try:
-                user_profile = self.user.profile
-                if not user_profile or user_profile.user_type != 'ADMIN':
-                    # Non-admin users cannot change their role
-                    self.fields['user_type'].widget.attrs['readonly'] = 'readonly'
-                    self.fields['user_type'].widget.attrs['class'] = 'form-control bg-light'
-                    self.fields['user_type'].help_text = 'Only administrators can change user roles.'
-            except UserProfile.DoesNotExist:
-                # No profile means not admin
-                self.fields['user_type'].widget.attrs['readonly'] = 'readonly'
-                self.fields['user_type'].widget.attrs['class'] = 'form-control bg-light'
-                self.fields['user_type'].help_text = 'Only administrators can change user roles.'
+        if self.user and not get_access_scope(self.user).is_admin:
+            self.fields['user_type'].widget.attrs['readonly'] = 'readonly'
+            self.fields['user_type'].widget.attrs['class'] = 'form-control bg-light'
+            self.fields['user_type'].help_text = 'Only administrators can change user roles.'
     
     def clean_user_type(self):
         """Prevent non-admin users from changing user_type"""
         user_type = self.cleaned_data.get('user_type')
         
-        if self.user:
-            try:
-                user_profile = self.user.profile
-                if not user_profile or user_profile.user_type != 'ADMIN':
-                    # Non-admin users cannot change their role
-                    if self.instance and self.instance.user_type != user_type:
-                        raise forms.ValidationError("Only administrators can change user roles.")
-            except UserProfile.DoesNotExist:
-                # No profile means not admin
-                if self.instance and self.instance.user_type != user_type:
-                    raise forms.ValidationError("Only administrators can change user roles.")
+        if self.user and not get_access_scope(self.user).is_admin:
+            # Non-admin users cannot change their role
+            if self.instance and self.instance.user_type != user_type:
+                raise forms.ValidationError("Only administrators can change user roles.")
         
         return user_type
     
@@ -0,0 +1,28 @@
+"""
+Versioned fragment caching for the elder detail page.
+
+Each section of ``elder_detail.html`` is wrapped in ``{% cache %}`` and keyed
+by the elder id plus a version counter for that (elder, section) pair. The
+signal handlers reset the counter when a row behind the section changes, so
+an unchanged section renders straight from the cache without running its
+query, and an edit only recomputes the section it touched.
+"""
+from .caching import get_versions, reset_versions
+
+ELDER_SECTIONS = ['contacts', 'medications', 'appointments', 'tasks', 'vitals', 'incidents']
+ELDER_SECTION_TIMEOUT = 3600
+
+
+def _section_version_name(elder_id, section):
+    return f'elder:{elder_id}:{section}'
+
+
+def elder_section_versions(elder_id):
+    """``{section: version}`` for every section of one elder's page."""
+    names = {section: _section_version_name(elder_id, section) for section in ELDER_SECTIONS}
+    versions = get_versions(*names.values())
+    return {section: versions[name] for section, name in names.items()}
+
+
+def invalidate_elder_section(section, *elder_ids):
+    reset_versions(*[_section_version_name(elder_id, section) for elder_id in elder_ids if elder_id])
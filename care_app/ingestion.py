@@ -0,0 +1,276 @@
+"""
+Batch vitals ingestion for bedside monitors and gateway boxes.
+
+Readings arrive as a JSON array, NDJSON or CSV. They are validated a chunk
+at a time, one column per pass, against the same ranges as
+``QuickVitalsForm`` and written with ``bulk_create`` in one transaction per
+chunk. Bad rows are reported individually and never abort the batch.
+Once the batch is in, its readings are scored for anomalies together.
+
+Readings are accepted for the elders the user can access (admins, the
+guardian and actively assigned staff), as for ``elder_access_required``.
+"""
+import csv
+import json
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .access import get_access_scope
+from .anomalies import check_new_readings
+from .dashboard import invalidate_dashboards
+from .forms import QuickVitalsForm
+from .fragments import invalidate_elder_section
+from .models import ElderProfile, VitalsLog
+from .vitals_rollups import VITALS_METRICS, day_bounds, refresh_rollups
+
+INGEST_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+CLOCK_SKEW = timedelta(minutes=5)
+
+
+def _field_rules():
+    rules = {}
+    for name in VITALS_METRICS:
+        field = QuickVitalsForm.base_fields[name]
+        decimal_places = getattr(field, 'decimal_places', None)
+        rules[name] = (field.min_value, field.max_value, decimal_places)
+    return rules
+
+
+# metric -> (min, max, decimal places or None for integers)
+VITALS_RULES = _field_rules()
+
+
+class IngestResult:
+    def __init__(self):
+        self.received = 0
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        self.elder_ids = set()
+        self.first_recorded_at = None
+        self.last_recorded_at = None
+
+    def add_error(self, row_number, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'errors': errors})
+
+    def record_created(self, readings):
+        self.created += len(readings)
+        self.elder_ids.update(reading.elder_id for reading in readings)
+        times = [reading.recorded_at for reading in readings]
+        if self.first_recorded_at is not None:
+            times += [self.first_recorded_at, self.last_recorded_at]
+        self.first_recorded_at, self.last_recorded_at = min(times), max(times)
+
+    def as_dict(self):
+        return {
+            'received': self.received,
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+def _parse_number(raw, decimal_places):
+    """Parse ``raw`` like the form field would; raises ``ValueError`` with its message."""
+    try:
+        value = Decimal(str(raw).strip())
+    except InvalidOperation:
+        raise ValueError('Enter a number.')
+    if not value.is_finite():
+        raise ValueError('Enter a number.')
+    if decimal_places is None:
+        if value != value.to_integral_value():
+            raise ValueError('Enter a whole number.')
+        return int(value)
+    if value.as_tuple().exponent < -decimal_places:
+        raise ValueError(
+            f'Ensure that there are no more than {decimal_places} decimal place{"s" if decimal_places != 1 else ""}.'
+        )
+    return value
+
+
+def _parse_elder_id(raw):
+    """An integer id; booleans and fractional numbers are not ids."""
+    if isinstance(raw, bool) or (isinstance(raw, float) and not raw.is_integer()):
+        raise ValueError(raw)
+    return int(raw)
+
+
+def _validate_column(rows, errors, name, now):
+    """Validate and coerce one column across the whole chunk."""
+    if name == 'elder':
+        for index, row in enumerate(rows):
+            raw = row.get('elder', row.get('elder_id'))
+            try:
+                row['elder'] = _parse_elder_id(raw)
+            except (TypeError, ValueError, OverflowError):
+                errors[index]['elder'] = 'A valid elder id is required.'
+        return
+
+    if name == 'recorded_at':
+        for index, row in enumerate(rows):
+            raw = row.get('recorded_at')
+            if raw in (None, ''):
+                row['recorded_at'] = now
+                continue
+            try:
+                value = parse_datetime(str(raw)) if not hasattr(raw, 'tzinfo') else raw
+            except ValueError:
+                # Well formed but impossible, e.g. month 13
+                value = None
+            if value is None:
+                errors[index]['recorded_at'] = 'Enter a valid ISO 8601 date/time.'
+                continue
+            if timezone.is_naive(value):
+                value = timezone.make_aware(value)
+            if value > now + CLOCK_SKEW:
+                errors[index]['recorded_at'] = 'Reading is in the future.'
+                continue
+            row['recorded_at'] = value
+        return
+
+    min_value, max_value, decimal_places = VITALS_RULES[name]
+    for index, row in enumerate(rows):
+        raw = row.get(name)
+        if raw in (None, ''):
+            row[name] = None
+            continue
+        try:
+            value = _parse_number(raw, decimal_places)
+            if min_value is not None and value < min_value:
+                raise ValueError(f'Ensure this value is greater than or equal to {min_value}.')
+            if max_value is not None and value > max_value:
+                raise ValueError(f'Ensure this value is less than or equal to {max_value}.')
+        except (ValueError, OverflowError, InvalidOperation) as error:
+            errors[index][name] = str(error) if isinstance(error, ValueError) else 'Enter a number.'
+            continue
+        row[name] = value
+
+
+def _ingest_chunk(chunk, row_numbers, scope, user, result):
+    now = timezone.now()
+    errors = [{} for _ in chunk]
+    for name in ['elder', 'recorded_at'] + VITALS_METRICS:
+        _validate_column(chunk, errors, name, now)
+
+    # One existence query per chunk; access itself is an in-memory check
+    requested = {row['elder'] for row, row_errors in zip(chunk, errors) if 'elder' not in row_errors}
+    existing = set(ElderProfile.objects.filter(pk__in=requested).values_list('pk', flat=True))
+
+    readings = []
+    for offset, (row, row_errors) in enumerate(zip(chunk, errors)):
+        if 'elder' not in row_errors:
+            if row['elder'] not in existing:
+                row_errors['elder'] = 'Elder not found.'
+            elif not scope.can_access(row['elder']):
+                row_errors['elder'] = "You don't have access to this elder."
+        if not row_errors and all(row[name] is None for name in VITALS_METRICS):
+            row_errors['__all__'] = 'At least one vital sign is required.'
+        if row_errors:
+            result.add_error(row_numbers[offset], row_errors)
+            continue
+        readings.append(VitalsLog(
+            elder_id=row['elder'],
+            recorded_at=row['recorded_at'],
+            notes=str(row.get('notes') or ''),
+            logged_by=user,
+            **{name: row[name] for name in VITALS_METRICS},
+        ))
+
+    if readings:
+        with transaction.atomic():
+            VitalsLog.objects.bulk_create(readings)
+        result.record_created(readings)
+    return readings
+
+
+def ingest_vitals(rows, user, chunk_size=INGEST_CHUNK_SIZE):
+    """
+    Ingest an iterable of reading dicts on behalf of ``user``.
+
+    A body that stops parsing part way (bad encoding, broken CSV) raises
+    ``ValueError`` while nothing has been written. Once a chunk has been
+    committed the unreadable remainder is reported as one failed row
+    instead, and the readings already written are still refreshed and
+    scored.
+    """
+    scope = get_access_scope(user)
+    result = IngestResult()
+    chunk, row_numbers = [], []
+    rows = iter(rows)
+    while True:
+        try:
+            row = next(rows)
+        except StopIteration:
+            break
+        except (ValueError, csv.Error) as error:
+            if not result.created:
+                raise ValueError(str(error)) from error
+            result.received += 1
+            result.add_error(result.received, {'__all__': f'Could not read the rest of the body: {error}'})
+            break
+        result.received += 1
+        if not isinstance(row, dict):
+            result.add_error(result.received, {'__all__': 'Each reading must be an object.'})
+            continue
+        chunk.append(dict(row))
+        row_numbers.append(result.received)
+        if len(chunk) >= chunk_size:
+            _ingest_chunk(chunk, row_numbers, scope, user, result)
+            chunk, row_numbers = [], []
+    if chunk:
+        _ingest_chunk(chunk, row_numbers, scope, user, result)
+
+    if result.created:
+        start, end = day_bounds(result.first_recorded_at, result.last_recorded_at)
+        refresh_rollups(result.elder_ids, start, end)
+        check_new_readings(result.elder_ids, result.first_recorded_at, result.last_recorded_at)
+        invalidate_elder_section('vitals', *result.elder_ids)
+        invalidate_dashboards(*result.elder_ids)
+    return result
+
+
+def iter_json(request):
+    payload = json.loads(request.body)
+    if isinstance(payload, dict):
+        payload = payload.get('readings', [])
+    if not isinstance(payload, list):
+        raise ValueError('Expected a JSON array of readings.')
+    return iter(payload)
+
+
+def _iter_lines(request):
+    for line in request:
+        yield line.decode('utf-8')
+
+
+def iter_ndjson(request):
+    """Stream one reading per line without buffering the whole body."""
+    for line in _iter_lines(request):
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+
+
+def iter_csv(request):
+    """Stream CSV rows; the header names the columns."""
+    return csv.DictReader(_iter_lines(request))
+
+
+PARSERS = {
+    'application/json': iter_json,
+    'application/x-ndjson': iter_ndjson,
+    'application/jsonlines': iter_ndjson,
+    'text/csv': iter_csv,
+}
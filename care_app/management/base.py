@@ -0,0 +1,48 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+
+class LoopCommand(BaseCommand):
+    """
+    A command that does one pass of work, or with ``--loop`` runs as a
+    long-lived worker repeating it every ``--interval`` seconds. SIGTERM and
+    SIGINT let the pass in progress finish, then stop the worker.
+
+    Subclasses implement ``run_once`` and set ``default_interval``.
+    """
+    default_interval = 60
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running, repeating every --interval seconds.')
+        parser.add_argument(
+            '--interval', type=float, default=self.default_interval,
+            help=f'Seconds between runs with --loop (default {self.default_interval:g}).',
+        )
+
+    def run_once(self, **options):
+        raise NotImplementedError('subclasses of LoopCommand must provide a run_once() method')
+
+    def handle(self, *args, **options):
+        self._stopping = False
+        if options['loop']:
+            signal.signal(signal.SIGTERM, self._stop)
+            signal.signal(signal.SIGINT, self._stop)
+
+        while True:
+            # Drop connections the database may have timed out while we slept
+            close_old_connections()
+            self.run_once(**options)
+            if not options['loop'] or self._stopping:
+                break
+            deadline = time.monotonic() + options['interval']
+            while not self._stopping and time.monotonic() < deadline:
+                time.sleep(min(1, options['interval']))
+            if self._stopping:
+                break
+
+    def _stop(self, signum, frame):
+        # Finish the current pass, then exit
+        self._stopping = True
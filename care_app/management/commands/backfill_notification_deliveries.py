@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from care_app.models import Notification
+from care_app.notifications import NOTIFICATION_BATCH_SIZE, deliver_notifications
+
+
+class Command(BaseCommand):
+    help = 'Deliver notifications to their recipients; notifications already delivered are skipped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--after', type=int, default=0, help='Only notifications with a higher id.')
+        parser.add_argument('--chunk-size', type=int, default=NOTIFICATION_BATCH_SIZE,
+                            help='Notifications per delivery batch.')
+
+    def handle(self, *args, **options):
+        written = 0
+        last_pk = options['after']
+        while True:
+            chunk = list(
+                Notification.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'elder')[:options['chunk_size']]
+            )
+            if not chunk:
+                break
+            written += deliver_notifications(chunk)
+            last_pk = chunk[-1].pk
+            self.stdout.write(f'  through notification {last_pk}')
+
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} deliveries.'))
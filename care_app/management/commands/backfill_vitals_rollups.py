@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from care_app.models import ElderProfile, VitalsLog
+from care_app.vitals_rollups import day_bounds, refresh_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild hourly and daily vitals rollups from the raw VitalsLog table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--elder', type=int, action='append', help='Only this elder (may be repeated).')
+        parser.add_argument('--days', type=int, help='Only the last N days (default: full history).')
+        parser.add_argument('--chunk-size', type=int, default=200, help='Elders per refresh transaction.')
+
+    def handle(self, *args, **options):
+        elder_ids = options['elder'] or list(ElderProfile.objects.order_by('pk').values_list('pk', flat=True))
+
+        if options['days']:
+            start, end = day_bounds(timezone.now() - timedelta(days=options['days']), timezone.now())
+        else:
+            span = VitalsLog.objects.filter(elder_id__in=elder_ids).aggregate(
+                first=Min('recorded_at'), last=Max('recorded_at')
+            )
+            if span['first'] is None:
+                self.stdout.write('No vitals to roll up.')
+                return
+            start, end = day_bounds(span['first'], span['last'])
+
+        written = 0
+        chunk_size = options['chunk_size']
+        for offset in range(0, len(elder_ids), chunk_size):
+            chunk = elder_ids[offset:offset + chunk_size]
+            written += refresh_rollups(chunk, start, end)
+            self.stdout.write(f'  {min(offset + chunk_size, len(elder_ids))}/{len(elder_ids)} elders')
+
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} rollup rows.'))
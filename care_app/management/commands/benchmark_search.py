@@ -0,0 +1,67 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from care_app.models import Appointment, CareTask, ElderProfile, MedicationSchedule
+from care_app.search import SEARCH_CATEGORIES, get_search_backend, hydrate
+
+
+def original_search(query, category, limit):
+    """
+    The multi-table ``icontains`` search the view ran before the index,
+    for an administrator. It had no limit: every match was loaded.
+    """
+    elders = ElderProfile.objects.all()
+    if category == 'elders':
+        results = elders.filter(
+            Q(full_name__icontains=query) | Q(medical_conditions__icontains=query) | Q(address__icontains=query)
+        )
+    elif category == 'medications':
+        results = MedicationSchedule.objects.filter(elder__in=elders).filter(
+            Q(medication__name__icontains=query) | Q(medication__description__icontains=query)
+        )
+    elif category == 'tasks':
+        results = CareTask.objects.filter(elder__in=elders).filter(
+            Q(title__icontains=query) | Q(description__icontains=query)
+        )
+    else:
+        results = Appointment.objects.filter(elder__in=elders).filter(
+            Q(title__icontains=query) | Q(notes__icontains=query)
+        )
+    return list(results)
+
+
+def indexed_search(query, category, limit):
+    return hydrate(category, get_search_backend().search(query, category, limit=limit))
+
+
+class Command(BaseCommand):
+    help = 'Compare search latency of the configured backend against the original icontains search.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('queries', nargs='+', help='Search strings to time.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--limit', type=int, default=10)
+
+    def _time(self, search, query, repeat, limit):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for category in SEARCH_CATEGORIES:
+                search(query, category, limit)
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings), max(timings)
+
+    def handle(self, *args, **options):
+        searches = [
+            (type(get_search_backend()).__name__, indexed_search),
+            ('original icontains', original_search),
+        ]
+        for query in options['queries']:
+            for label, search in searches:
+                median, worst = self._time(search, query, options['repeat'], options['limit'])
+                self.stdout.write(
+                    f'{query!r:24} {label:28} median {median:8.2f} ms   max {worst:8.2f} ms'
+                )
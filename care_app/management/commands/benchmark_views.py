@@ -0,0 +1,217 @@
+import json
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from care_app.caching import get_cache
+from care_app.metrics import RequestTimer
+from care_app.models import ElderAssignment, ElderProfile
+from care_app.synthetic import FacilitySpec, generate_facility
+
+BENCHMARK_DIR = Path(settings.BASE_DIR) / 'benchmarks'
+
+# Generated facility per dataset size
+SIZES = {
+    'small': dict(elders=50, staff=15, days=30),
+    'medium': dict(elders=500, staff=60, days=90),
+    'large': dict(elders=2000, staff=150, days=120),
+}
+
+ROLES = ['ADMIN', 'NURSE', 'GUARDIAN']
+
+# view -> URL given the elder the signed-in user can open
+VIEWS = {
+    'dashboard': lambda elder_id: reverse('dashboard'),
+    'elder_list': lambda elder_id: reverse('elder_list'),
+    'elder_detail': lambda elder_id: reverse('elder_detail', args=[elder_id]),
+    'vitals_list': lambda elder_id: reverse('vitals_list'),
+    'search': lambda elder_id: reverse('search') + '?query=walk',
+    'notification_list': lambda elder_id: reverse('notification_list'),
+    'appointment_list': lambda elder_id: reverse('appointment_list'),
+    'care_task_list': lambda elder_id: reverse('care_task_list'),
+}
+
+PREFIX = 'bench'
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the main views for each role against generated datasets in a separate test database, '
+        'and compare p50/p95 latency, query counts and peak memory with a saved baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', action='append', choices=list(SIZES), help='Dataset size (may be repeated; default small).')
+        parser.add_argument('--role', action='append', choices=ROLES, help='Role to sign in as (may be repeated; default all).')
+        parser.add_argument('--view', action='append', choices=list(VIEWS), help='View to time (may be repeated; default all).')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed requests per view.')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per view first.')
+        parser.add_argument('--output', default=str(BENCHMARK_DIR / 'views-latest.json'))
+        parser.add_argument('--baseline', default=str(BENCHMARK_DIR / 'views-baseline.json'))
+        parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline.')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed relative increase in p95 latency and peak memory.')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the generated databases for the next run.')
+
+    def handle(self, *args, **options):
+        sizes = options['size'] or ['small']
+        roles = options['role'] or ROLES
+        views = options['view'] or list(VIEWS)
+
+        results = {}
+        # DEBUG off, as in production; it would also log every query
+        setup_test_environment(debug=False)
+        try:
+            for size in sizes:
+                results.update(self._run_size(size, roles, views, options))
+        finally:
+            teardown_test_environment()
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'repeat': options['repeat'],
+            'results': results,
+        }
+        output = Path(options['output'])
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2, sort_keys=True))
+        self.stdout.write(f'Results written to {output}.')
+
+        baseline_path = Path(options['baseline'])
+        if options['save_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(report, indent=2, sort_keys=True))
+            self.stdout.write(self.style.SUCCESS(f'Baseline saved to {baseline_path}.'))
+            return
+        if not baseline_path.exists():
+            self.stdout.write('No baseline to compare with; run again with --save-baseline to store one.')
+            return
+
+        baseline = json.loads(baseline_path.read_text())['results']
+        regressions = self._compare(results, baseline, options['tolerance'])
+        if regressions:
+            for line in regressions:
+                self.stdout.write(self.style.ERROR(f'  {line}'))
+            raise CommandError(f'{len(regressions)} regression(s) against {baseline_path}.')
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {baseline_path}.'))
+
+    def _run_size(self, size, roles, views, options):
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        previous_test_name = test_settings.get('NAME')
+        if connection.vendor == 'sqlite':
+            BENCHMARK_DIR.mkdir(parents=True, exist_ok=True)
+            test_settings['NAME'] = str(BENCHMARK_DIR / f'test_{size}.sqlite3')
+        else:
+            test_settings['NAME'] = f'test_benchmark_{size}'
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            if not User.objects.filter(username__startswith=f'{PREFIX}_').exists():
+                self.stdout.write(f'Generating the {size} dataset...')
+                generate_facility(FacilitySpec(prefix=PREFIX, **SIZES[size]))
+                call_command('rebuild_search_index', stdout=self.stdout)
+                call_command('backfill_vitals_rollups', stdout=self.stdout)
+                call_command('backfill_notification_deliveries', stdout=self.stdout)
+
+            results = {}
+            for role in roles:
+                user, elder_id = self._sign_in_target(role)
+                client = Client()
+                client.force_login(user)
+                # Settle the fresh session so its first save is not counted against a view
+                client.get(reverse('dashboard'))
+                for view in views:
+                    key = f'{size}/{role}/{view}'
+                    results[key] = self._measure(client, VIEWS[view](elder_id), options)
+                    if 'status' in results[key]:
+                        self.stdout.write(f'{key:40} skipped, responded {results[key]["status"]}')
+                        continue
+                    self.stdout.write(
+                        f'{key:40} p50 {results[key]["p50_ms"]:8.2f} ms  p95 {results[key]["p95_ms"]:8.2f} ms  '
+                        f'{results[key]["queries"]:3} queries (cold {results[key]["cold_queries"]:3})  '
+                        f'{results[key]["peak_kib"]:8.0f} KiB'
+                    )
+            return results
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            test_settings['NAME'] = previous_test_name
+
+    def _sign_in_target(self, role):
+        """The first generated user with ``role`` and an elder they may open."""
+        if role == 'GUARDIAN':
+            elder = ElderProfile.objects.filter(guardian__username__startswith=f'{PREFIX}_guardian_').order_by('pk').first()
+            return elder.guardian, elder.pk
+        if role == 'NURSE':
+            assignment = ElderAssignment.objects.filter(
+                role='NURSE', user__profile__user_type='NURSE', is_active=True
+            ).select_related('user').order_by('user_id', 'elder_id').first()
+            return assignment.user, assignment.elder_id
+        user = User.objects.filter(username__startswith=f'{PREFIX}_admin_').order_by('pk').first()
+        return user, ElderProfile.objects.order_by('pk').values_list('pk', flat=True).first()
+
+    def _measure(self, client, url, options):
+        """Time ``url``; views the role may not open come back as ``{'status': code}``."""
+        get_cache().clear()
+        cold = RequestTimer()
+        with connection.execute_wrapper(cold):
+            response = client.get(url)
+        if response.status_code != 200:
+            return {'url': url, 'status': response.status_code}
+        for _ in range(options['warmup']):
+            client.get(url)
+
+        timings, queries = [], []
+        for _ in range(options['repeat']):
+            captured = RequestTimer()
+            with connection.execute_wrapper(captured):
+                started = time.perf_counter()
+                client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(captured.queries)
+
+        tracemalloc.start()
+        client.get(url)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return {
+            'url': url,
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(_percentile(timings, 0.95), 3),
+            'queries': max(queries),
+            'cold_queries': cold.queries,
+            'peak_kib': round(peak / 1024, 1),
+        }
+
+    def _compare(self, results, baseline, tolerance):
+        regressions = []
+        for key, current in sorted(results.items()):
+            previous = baseline.get(key)
+            if previous is None or 'status' in current or 'status' in previous:
+                continue
+            for metric in ['queries', 'cold_queries']:
+                if current[metric] > previous[metric]:
+                    regressions.append(f'{key}: {metric} {previous[metric]} -> {current[metric]}')
+            # Sub-millisecond swings are noise, whatever the ratio
+            if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance) and current['p95_ms'] - previous['p95_ms'] > 1:
+                regressions.append(f'{key}: p95 {previous["p95_ms"]:.2f} ms -> {current["p95_ms"]:.2f} ms')
+            if current['peak_kib'] > previous['peak_kib'] * (1 + tolerance):
+                regressions.append(f'{key}: peak memory {previous["peak_kib"]:.0f} KiB -> {current["peak_kib"]:.0f} KiB')
+        return regressions
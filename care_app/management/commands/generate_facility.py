@@ -0,0 +1,79 @@
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from django.utils import timezone
+
+from care_app.dashboard import invalidate_dashboards
+from care_app.notifications import invalidate_notification_summaries
+from care_app.synthetic import GENERATE_CHUNK_SIZE, HISTORY, FacilitySpec, generate_facility
+
+
+class Command(BaseCommand):
+    help = 'Generate a seeded synthetic facility (staff, elders and their history) for sizing and benchmarks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--elders', type=int, default=200)
+        parser.add_argument('--staff', type=int, default=40)
+        parser.add_argument('--days', type=int, default=180, help='Days of history up to --as-of.')
+        parser.add_argument('--future-days', type=int, default=60, help='Days of scheduled appointments and tasks.')
+        parser.add_argument('--vitals-per-day', type=float, default=4.0)
+        parser.add_argument('--medications-per-elder', type=float, default=4.0)
+        parser.add_argument('--appointments-per-month', type=float, default=1.5)
+        parser.add_argument('--tasks-per-week', type=float, default=3.0)
+        parser.add_argument('--incidents-per-year', type=float, default=4.0)
+        parser.add_argument('--notifications-per-week', type=float, default=2.0)
+        parser.add_argument('--seed', type=int, default=370)
+        parser.add_argument('--as-of', help='ISO date/time the history runs up to (default: this hour).')
+        parser.add_argument('--prefix', default='sim', help='Username prefix for generated users.')
+        parser.add_argument('--password', default='care-demo', help='Password of every generated user.')
+        parser.add_argument('--workers', type=int, help='Row-building processes (default: CPU count, 0: none).')
+        parser.add_argument('--chunk-size', type=int, default=GENERATE_CHUNK_SIZE, help='Rows per transaction.')
+        parser.add_argument('--only', action='append', choices=list(HISTORY),
+                            help='Only generate this kind of history (may be repeated).')
+        parser.add_argument('--skip-derived', action='store_true',
+                            help='Do not rebuild search documents, vitals rollups and notification deliveries afterwards.')
+
+    def handle(self, *args, **options):
+        as_of = None
+        if options['as_of']:
+            as_of = parse_datetime(options['as_of'])
+            if as_of is None:
+                raise CommandError('--as-of must be an ISO 8601 date/time.')
+            if timezone.is_naive(as_of):
+                as_of = timezone.make_aware(as_of)
+        if options['elders'] < 1 or options['staff'] < 1 or options['days'] < 1:
+            raise CommandError('--elders, --staff and --days must be at least 1.')
+        if User.objects.filter(username__startswith=f"{options['prefix']}_").exists():
+            raise CommandError(f"Users prefixed {options['prefix']!r} already exist; pick another --prefix.")
+
+        spec = FacilitySpec(
+            elders=options['elders'], staff=options['staff'], days=options['days'],
+            future_days=options['future_days'], vitals_per_day=options['vitals_per_day'],
+            medications_per_elder=options['medications_per_elder'],
+            appointments_per_month=options['appointments_per_month'],
+            tasks_per_week=options['tasks_per_week'], incidents_per_year=options['incidents_per_year'],
+            notifications_per_week=options['notifications_per_week'], seed=options['seed'], as_of=as_of,
+            prefix=options['prefix'], password=options['password'],
+        )
+
+        def progress(kind, rows):
+            self.stdout.write(f'  {kind}: {rows} rows', ending='\r')
+
+        result = generate_facility(
+            spec, workers=options['workers'], chunk_size=options['chunk_size'],
+            kinds=options['only'], progress=progress if options['verbosity'] > 1 else None,
+        )
+        for kind, rows in result.rows.items():
+            self.stdout.write(f'  {kind:22} {rows:>12,}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {result.total_rows:,} rows in {result.duration:.1f}s ({result.rows_per_second:,.0f} rows/s).'
+        ))
+
+        if not options['skip_derived']:
+            call_command('rebuild_search_index', stdout=self.stdout)
+            call_command('backfill_vitals_rollups', stdout=self.stdout)
+            call_command('backfill_notification_deliveries', stdout=self.stdout)
+        invalidate_dashboards()
+        invalidate_notification_summaries()
+        self.stdout.write(f"Sign in as {spec.prefix}_admin_00001 with password {spec.password!r}.")
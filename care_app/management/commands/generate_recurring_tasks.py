@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from care_app.care_tasks import RECURRENCE_CHUNK_SIZE, RECURRENCE_HORIZON_DAYS, generate_recurring_tasks
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming occurrences of recurring DAILY/WEEKLY/MONTHLY care tasks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=RECURRENCE_HORIZON_DAYS, help='Horizon in days (default 7).')
+        parser.add_argument('--chunk-size', type=int, default=RECURRENCE_CHUNK_SIZE, help='Templates per batch.')
+
+    def handle(self, *args, **options):
+        created = generate_recurring_tasks(horizon_days=options['days'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Created {created} task occurrence(s).'))
@@ -0,0 +1,22 @@
+from care_app.management.base import LoopCommand
+from care_app.retention import PURGE_BATCH_SIZE, purge_notifications
+
+
+class Command(LoopCommand):
+    help = (
+        'Delete expired notifications and old ones their retention policy no longer keeps, '
+        'in small batches. Use --loop to run as a long-lived worker.'
+    )
+    default_interval = 3600
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH_SIZE, help='Notifications per transaction.')
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to sleep between batches.')
+        super().add_arguments(parser)
+
+    def run_once(self, **options):
+        result = purge_notifications(batch_size=options['batch_size'], pause=options['pause'])
+        self.stdout.write(
+            'Deleted {deleted} notification(s): {expired} expired, {read} read, {old} past retention; '
+            'archived {archived} in {batches} batch(es), {duration}s.'.format(**result.as_dict())
+        )
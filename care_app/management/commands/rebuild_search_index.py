@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from care_app.search import SEARCH_CATEGORIES, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search documents from the source tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--category', action='append', choices=list(SEARCH_CATEGORIES),
+            help='Only rebuild this category (may be repeated).',
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        total = rebuild_index(options['category'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} search documents.'))
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from care_app.management.base import LoopCommand
+from care_app.reminders import REMINDER_BATCH_SIZE, send_appointment_reminders
+
+
+class Command(LoopCommand):
+    help = (
+        'Create notifications for appointments starting within the lead time and '
+        'mark them reminded. Use --loop to run as a long-lived worker.'
+    )
+    default_interval = 60
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lead-time', type=float, default=24, help='Hours ahead to remind (default 24).')
+        parser.add_argument('--batch-size', type=int, default=REMINDER_BATCH_SIZE, help='Appointments per transaction.')
+        super().add_arguments(parser)
+
+    def run_once(self, **options):
+        sent = send_appointment_reminders(
+            lead_time=timedelta(hours=options['lead_time']), batch_size=options['batch_size']
+        )
+        if sent or options['verbosity'] > 1:
+            self.stdout.write(f'Sent {sent} appointment reminder(s).')
+
+    def handle(self, *args, **options):
+        super().handle(*args, **options)
+        self.stdout.write(self.style.SUCCESS('Reminder worker stopped.' if options['loop'] else 'Done.'))
@@ -0,0 +1,18 @@
+from care_app.care_tasks import SWEEP_BATCH_SIZE, sweep_overdue_tasks
+from care_app.management.base import LoopCommand
+
+
+class Command(LoopCommand):
+    help = 'Mark past-due care tasks OVERDUE and notify about HIGH/URGENT ones.'
+    default_interval = 300
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH_SIZE, help='Tasks per transaction.')
+        super().add_arguments(parser)
+
+    def run_once(self, **options):
+        result = sweep_overdue_tasks(batch_size=options['batch_size'])
+        self.stdout.write(
+            'Scanned {scanned}, marked {updated} overdue, sent {notified} notification(s), '
+            'reopened {reopened} in {duration}s.'.format(**result.as_dict())
+        )
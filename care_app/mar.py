@@ -0,0 +1,158 @@
+"""
+Medication administration record (MAR): schedules expanded into dose slots.
+
+``dose_slots`` turns every active ``MedicationSchedule`` in scope into the
+concrete doses due inside a time window, then matches them against the
+``MedicationLog`` rows recorded around those times to mark each dose given,
+skipped, missed, due or upcoming. The work is two queries - schedules with
+their elder and medication, and the logs in the window - plus in-memory
+matching, however many elders the window covers.
+"""
+from bisect import bisect_left
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .access import filter_by_access
+from .models import MedicationLog, MedicationSchedule
+
+# Times used when a schedule's frequency needs more times than it has set
+DEFAULT_DOSE_TIMES = {
+    'DAILY': [time(8, 0)],
+    'TWICE_DAILY': [time(8, 0), time(20, 0)],
+    'THRICE_DAILY': [time(8, 0), time(14, 0), time(20, 0)],
+    'WEEKLY': [time(8, 0)],
+}
+
+# A log counts towards a dose taken this long before or after its slot
+EARLY_WINDOW = timedelta(hours=2)
+LATE_WINDOW = timedelta(hours=2)
+
+
+class DoseSlot:
+    GIVEN = 'GIVEN'
+    SKIPPED = 'SKIPPED'
+    MISSED = 'MISSED'
+    DUE = 'DUE'
+    UPCOMING = 'UPCOMING'
+
+    def __init__(self, schedule, due_at):
+        self.schedule = schedule
+        self.due_at = due_at
+        self.log_id = None
+        self.taken_at = None
+        self.status = None
+
+    @property
+    def elder(self):
+        return self.schedule.elder
+
+    @property
+    def medication(self):
+        return self.schedule.medication
+
+    def __repr__(self):
+        return f'<DoseSlot schedule={self.schedule.pk} due_at={self.due_at:%Y-%m-%d %H:%M} {self.status}>'
+
+
+def dose_times(schedule):
+    """The local times of day ``schedule`` is taken, defaults filling gaps."""
+    defaults = DEFAULT_DOSE_TIMES.get(schedule.frequency)
+    set_times = [t for t in (schedule.time_1, schedule.time_2, schedule.time_3) if t]
+    if defaults is None:
+        # CUSTOM uses whatever times were entered; AS_NEEDED has no slots
+        return sorted(set_times) if schedule.frequency == 'CUSTOM' else []
+    times = set_times[:len(defaults)]
+    return sorted(times + defaults[len(times):])
+
+
+def _expand(schedule, first_day, last_day):
+    """Yield the aware due datetimes of ``schedule`` on local days in ``[first_day, last_day]``."""
+    first_day = max(first_day, schedule.start_date)
+    if schedule.end_date:
+        last_day = min(last_day, schedule.end_date)
+    times = dose_times(schedule)
+    day = first_day
+    step = timedelta(days=1)
+    if schedule.frequency == 'WEEKLY':
+        day += timedelta(days=(schedule.start_date.weekday() - day.weekday()) % 7)
+        step = timedelta(days=7)
+    while day <= last_day:
+        for dose_time in times:
+            yield timezone.make_aware(datetime.combine(day, dose_time))
+        day += step
+
+
+def _match_logs(slots, logs, now):
+    """Assign each slot the earliest unused log inside its window, then set statuses."""
+    taken = [log[1] for log in logs]
+    used = set()
+    for slot in slots:
+        index = bisect_left(taken, slot.due_at - EARLY_WINDOW)
+        while index < len(logs) and taken[index] <= slot.due_at + LATE_WINDOW:
+            if index not in used:
+                used.add(index)
+                slot.log_id, slot.taken_at, was_skipped = logs[index]
+                slot.status = DoseSlot.SKIPPED if was_skipped else DoseSlot.GIVEN
+                break
+            index += 1
+        if slot.status is None:
+            if now > slot.due_at + LATE_WINDOW:
+                slot.status = DoseSlot.MISSED
+            elif now >= slot.due_at - EARLY_WINDOW:
+                slot.status = DoseSlot.DUE
+            else:
+                slot.status = DoseSlot.UPCOMING
+
+
+def dose_slots(user, start, end, elder_id=None, now=None):
+    """
+    Return the ``DoseSlot``s due in ``[start, end)`` for elders ``user`` may
+    list, ordered by due time.
+    """
+    now = now or timezone.now()
+    first_day = timezone.localtime(start).date()
+    last_day = timezone.localtime(end - timedelta(microseconds=1)).date()
+
+    schedules = filter_by_access(MedicationSchedule.objects.filter(
+        is_active=True, start_date__lte=last_day
+    ), user).filter(
+        Q(end_date__isnull=True) | Q(end_date__gte=first_day)
+    ).exclude(frequency='AS_NEEDED').select_related('elder', 'medication')
+    if elder_id is not None:
+        schedules = schedules.filter(elder_id=elder_id)
+
+    slots_by_schedule = {}
+    for schedule in schedules:
+        slots = [
+            DoseSlot(schedule, due_at)
+            for due_at in _expand(schedule, first_day, last_day)
+            if start <= due_at < end
+        ]
+        if slots:
+            slots_by_schedule[schedule.pk] = slots
+
+    logs_by_schedule = {}
+    # A subquery, not the schedule ids: facility-wide runs cover thousands
+    logs = MedicationLog.objects.filter(
+        schedule_id__in=schedules.values('pk'),
+        taken_at__gte=start - EARLY_WINDOW,
+        taken_at__lte=end + LATE_WINDOW,
+    ).order_by('taken_at').values_list('schedule_id', 'pk', 'taken_at', 'was_skipped')
+    if slots_by_schedule:
+        for schedule_id, log_id, taken_at, was_skipped in logs:
+            logs_by_schedule.setdefault(schedule_id, []).append((log_id, taken_at, was_skipped))
+
+    all_slots = []
+    for schedule_id, slots in slots_by_schedule.items():
+        _match_logs(slots, logs_by_schedule.get(schedule_id, []), now)
+        all_slots.extend(slots)
+    all_slots.sort(key=lambda slot: (slot.due_at, slot.elder.full_name, slot.schedule.pk))
+    return all_slots
+
+
+def todays_dose_slots(user, elder_id=None, now=None):
+    now = now or timezone.now()
+    start = timezone.make_aware(datetime.combine(timezone.localtime(now).date(), time.min))
+    return dose_slots(user, start, start + timedelta(days=1), elder_id=elder_id, now=now)
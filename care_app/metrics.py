@@ -0,0 +1,215 @@
+"""
+Per-view request metrics and query budgets.
+
+``RequestMetricsMiddleware`` gives every request a ``RequestTimer`` that
+counts its SQL queries and times them, the outermost template render and the
+whole request, then records the totals here keyed by the resolved URL name.
+Totals live in process memory, so with several workers each reports its own
+share; ``render_metrics`` formats them in the Prometheus text format for the
+``metrics`` view.
+
+``QUERY_BUDGETS`` maps URL names to the most queries a request may run.
+Going over logs a warning, or raises ``QueryBudgetExceeded`` when
+``QUERY_BUDGET_STRICT`` is set so that tests fail.
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+from .care_tasks import last_sweep_metrics
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds, in seconds, of the request latency histogram buckets
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+UNRESOLVED_VIEW = 'unresolved'
+
+# last_sweep_metrics() key -> help text, exported as care_overdue_sweep_<key>
+SWEEP_GAUGES = [
+    ('scanned', 'Tasks scanned by the last overdue sweep.'),
+    ('updated', 'Tasks marked overdue by the last overdue sweep.'),
+    ('notified', 'Notifications sent by the last overdue sweep.'),
+    ('reopened', 'Overdue tasks reopened by the last overdue sweep.'),
+    ('batches', 'Batches run by the last overdue sweep.'),
+]
+
+_current_timer = ContextVar('request_timer', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.total_time = None
+        self._template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """``connection.execute_wrapper`` hook counting and timing each query."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_time += time.perf_counter() - started
+
+    def stop(self):
+        self.total_time = time.perf_counter() - self.started
+
+    def server_timing(self):
+        return ', '.join([
+            f'sql;dur={self.sql_time * 1000:.1f};desc="{self.queries} queries"',
+            f'template;dur={self.template_time * 1000:.1f}',
+            f'total;dur={self.total_time * 1000:.1f}',
+        ])
+
+
+def activate(timer):
+    return _current_timer.set(timer)
+
+
+def deactivate(token):
+    _current_timer.reset(token)
+
+
+def _timed_render(render):
+    @wraps(render)
+    def timed_render(template, context):
+        timer = _current_timer.get()
+        # Only the outermost render is timed; includes nest inside it
+        if timer is None or timer._template_depth:
+            return render(template, context)
+        timer._template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(template, context)
+        finally:
+            timer._template_depth -= 1
+            timer.template_time += time.perf_counter() - started
+    timed_render.timed = True
+    return timed_render
+
+
+def instrument_templates():
+    """Time ``Template.render`` for requests that have an active timer."""
+    from django.template.base import Template
+
+    if not getattr(Template.render, 'timed', False):
+        Template.render = _timed_render(Template.render)
+
+
+class ViewStats:
+    def __init__(self):
+        self.requests = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.queries = 0
+        self.max_queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.budget_exceeded = 0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+    def add(self, timer, over_budget):
+        self.requests += 1
+        self.total_time += timer.total_time
+        self.max_time = max(self.max_time, timer.total_time)
+        self.queries += timer.queries
+        self.max_queries = max(self.max_queries, timer.queries)
+        self.sql_time += timer.sql_time
+        self.template_time += timer.template_time
+        self.budget_exceeded += over_budget
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if timer.total_time <= bound:
+                self.buckets[index] += 1
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def record(view_name, timer, over_budget=False):
+    with _stats_lock:
+        stats = _stats.get(view_name)
+        if stats is None:
+            stats = _stats[view_name] = ViewStats()
+        stats.add(timer, over_budget)
+
+
+def observe(view_name, timer):
+    """Record one finished request, then hold it to the view's query budget."""
+    budget = getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+    over_budget = budget is not None and timer.queries > budget
+    record(view_name, timer, over_budget)
+    if over_budget:
+        message = f'{view_name} ran {timer.queries} queries, over its budget of {budget}.'
+        if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+def view_stats():
+    """A copy of the per-view totals, ``{view name: dict}``."""
+    with _stats_lock:
+        return {name: dict(vars(stats), buckets=list(stats.buckets)) for name, stats in _stats.items()}
+
+
+def reset_metrics():
+    with _stats_lock:
+        _stats.clear()
+
+
+def _series(lines, name, kind, help_text, samples):
+    """Append one metric family; ``samples`` are ``(suffix, labels, value)``."""
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {kind}')
+    for suffix, labels, value in samples:
+        label_text = ','.join(f'{label}="{label_value}"' for label, label_value in labels.items())
+        lines.append(f'{name}{suffix}{{{label_text}}} {value}' if label_text else f'{name}{suffix} {value}')
+
+
+def render_metrics():
+    """Every metric in the Prometheus text exposition format."""
+    stats = sorted(view_stats().items())
+    lines = []
+
+    latency = []
+    for view, values in stats:
+        for bound, count in zip(LATENCY_BUCKETS, values['buckets']):
+            latency.append(('_bucket', {'view': view, 'le': bound}, count))
+        latency.append(('_bucket', {'view': view, 'le': '+Inf'}, values['requests']))
+        latency.append(('_sum', {'view': view}, round(values['total_time'], 6)))
+        latency.append(('_count', {'view': view}, values['requests']))
+    _series(lines, 'care_request_duration_seconds', 'histogram', 'Request latency per view.', latency)
+
+    per_view = [
+        ('care_request_duration_seconds_max', 'gauge', 'Slowest request per view.', 'max_time'),
+        ('care_request_queries_total', 'counter', 'SQL queries run per view.', 'queries'),
+        ('care_request_queries_max', 'gauge', 'Most SQL queries run by one request per view.', 'max_queries'),
+        ('care_request_sql_seconds_total', 'counter', 'Time spent in SQL per view.', 'sql_time'),
+        ('care_request_template_seconds_total', 'counter', 'Time spent rendering templates per view.', 'template_time'),
+        ('care_query_budget_exceeded_total', 'counter', 'Requests over the view query budget.', 'budget_exceeded'),
+    ]
+    for name, kind, help_text, key in per_view:
+        samples = [('', {'view': view}, round(values[key], 6)) for view, values in stats]
+        _series(lines, name, kind, help_text, samples)
+
+    sweep = last_sweep_metrics()
+    if sweep:
+        for key, help_text in SWEEP_GAUGES:
+            _series(lines, f'care_overdue_sweep_{key}', 'gauge', help_text, [('', {}, sweep[key])])
+        _series(lines, 'care_overdue_sweep_duration_seconds', 'gauge',
+                'Duration of the last overdue sweep.', [('', {}, sweep['duration'])])
+        _series(lines, 'care_overdue_sweep_finished_timestamp_seconds', 'gauge',
+                'When the last overdue sweep finished.', [('', {}, sweep['finished_at'].timestamp())])
+    return '\n'.join(lines) + '\n'
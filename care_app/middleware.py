@@ -0,0 +1,67 @@
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .metrics import (
+    UNRESOLVED_VIEW, RequestTimer, activate, deactivate, instrument_templates, observe,
+)
+
+SESSION_REFRESHED_KEY = '_session_refreshed_at'
+
+
+class RequestMetricsMiddleware:
+    """
+    Count and time each request's SQL, template rendering and total latency.
+
+    The numbers are sent back in a ``Server-Timing`` header, recorded per URL
+    name for the ``metrics`` view and checked against ``QUERY_BUDGETS``.
+    Belongs first in ``MIDDLEWARE`` so the total covers the whole stack.
+    Queries run while a streaming response is iterated are not counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrument_templates()
+
+    def __call__(self, request):
+        timer = RequestTimer()
+        token = activate(timer)
+        try:
+            with connection.execute_wrapper(timer):
+                response = self.get_response(request)
+        finally:
+            deactivate(token)
+        timer.stop()
+
+        match = getattr(request, 'resolver_match', None)
+        observe(match.view_name if match else UNRESOLVED_VIEW, timer)
+        response['Server-Timing'] = timer.server_timing()
+        return response
+
+
+class SlidingSessionMiddleware:
+    """
+    Slide the session expiry forward without saving it on every request.
+
+    Replaces ``SESSION_SAVE_EVERY_REQUEST``: the session is only marked
+    modified - and so re-saved with a fresh ``SESSION_COOKIE_AGE`` - once
+    ``SESSION_REFRESH_INTERVAL`` seconds have passed since it was last saved.
+    An idle session therefore still expires between ``SESSION_COOKIE_AGE -
+    SESSION_REFRESH_INTERVAL`` and ``SESSION_COOKIE_AGE`` seconds after the
+    last request. Must sit after ``SessionMiddleware``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.interval = getattr(settings, 'SESSION_REFRESH_INTERVAL', 300)
+
+    def __call__(self, request):
+        session = getattr(request, 'session', None)
+        # Anonymous visitors without a session cookie never get one from here
+        if session is not None and session.session_key:
+            now = int(time.time())
+            refreshed_at = session.get(SESSION_REFRESHED_KEY)
+            if refreshed_at is None or now - refreshed_at >= self.interval:
+                session[SESSION_REFRESHED_KEY] = now
+        return self.get_response(request)
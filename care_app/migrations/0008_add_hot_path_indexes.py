@@ -0,0 +1,57 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0007_elderassignment_elderprofile_assigned_staff'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['status', 'appointment_date'], name='appt_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['elder', '-appointment_date'], name='appt_elder_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='caretask',
+            index=models.Index(fields=['elder', 'status', 'priority', 'due_date'], name='task_elder_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='caretask',
+            index=models.Index(fields=['status', 'due_date'], name='task_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='elderprofile',
+            index=models.Index(fields=['full_name', 'id'], name='elder_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incidentreport',
+            index=models.Index(fields=['is_resolved', '-incident_date'], name='incident_resolved_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incidentreport',
+            index=models.Index(fields=['elder', '-incident_date'], name='incident_elder_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['is_read', '-created_at'], name='notif_read_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['elder', 'is_read', '-created_at'], name='notif_elder_read_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vitalslog',
+            index=models.Index(fields=['elder', '-recorded_at'], name='vitals_elder_recorded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vitalslog',
+            index=models.Index(fields=['-recorded_at'], name='vitals_recorded_idx'),
+        ),
+    ]
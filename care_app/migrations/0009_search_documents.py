@@ -0,0 +1,128 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE care_app_searchdocument_fts USING fts5(
+        title, body,
+        content='care_app_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER care_app_searchdocument_ai AFTER INSERT ON care_app_searchdocument BEGIN
+        INSERT INTO care_app_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER care_app_searchdocument_ad AFTER DELETE ON care_app_searchdocument BEGIN
+        INSERT INTO care_app_searchdocument_fts(care_app_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER care_app_searchdocument_au AFTER UPDATE ON care_app_searchdocument BEGIN
+        INSERT INTO care_app_searchdocument_fts(care_app_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO care_app_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS care_app_searchdocument_au",
+    "DROP TRIGGER IF EXISTS care_app_searchdocument_ad",
+    "DROP TRIGGER IF EXISTS care_app_searchdocument_ai",
+    "DROP TABLE IF EXISTS care_app_searchdocument_fts",
+]
+
+MYSQL_FORWARD = [
+    "ALTER TABLE care_app_searchdocument ADD FULLTEXT INDEX searchdoc_fulltext (title, body)",
+]
+
+MYSQL_REVERSE = [
+    "ALTER TABLE care_app_searchdocument DROP INDEX searchdoc_fulltext",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+def _join(*parts):
+    return '\n'.join(part for part in parts if part)
+
+
+# category -> (model, select_related, document builder); mirrors care_app.search
+DOCUMENT_SOURCES = {
+    'elders': ('ElderProfile', [], lambda elder: (
+        elder.pk, elder.full_name, _join(elder.medical_conditions, elder.address)
+    )),
+    'medications': ('MedicationSchedule', ['medication'], lambda schedule: (
+        schedule.elder_id, schedule.medication.name, schedule.medication.description
+    )),
+    'tasks': ('CareTask', [], lambda task: (task.elder_id, task.title or '', task.description)),
+    'appointments': ('Appointment', [], lambda appointment: (
+        appointment.elder_id, appointment.title, appointment.notes
+    )),
+}
+
+
+def populate_search_documents(apps, schema_editor, chunk_size=2000):
+    """Index the existing rows; the signal handlers only index later saves."""
+    SearchDocument = apps.get_model('care_app', 'SearchDocument')
+    db_alias = schema_editor.connection.alias
+    for category, (model_name, related, build) in DOCUMENT_SOURCES.items():
+        model = apps.get_model('care_app', model_name)
+        batch = []
+        rows = model.objects.using(db_alias).select_related(*related).order_by('pk')
+        for instance in rows.iterator(chunk_size=chunk_size):
+            elder_id, title, body = build(instance)
+            batch.append(SearchDocument(
+                category=category, object_id=instance.pk, elder_id=elder_id, title=title[:255], body=body,
+            ))
+            if len(batch) >= chunk_size:
+                SearchDocument.objects.using(db_alias).bulk_create(batch)
+                batch = []
+        if batch:
+            SearchDocument.objects.using(db_alias).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0008_add_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('elders', 'Elders'), ('medications', 'Medications'), ('tasks', 'Tasks'), ('appointments', 'Appointments')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('elder', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='care_app.elderprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['category', 'elder'], name='searchdoc_category_elder_idx')],
+                'unique_together': {('category', 'object_id')},
+            },
+        ),
+        # Full-text structures are vendor specific; other databases fall back
+        # to icontains over the document table.
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'mysql': MYSQL_FORWARD}),
+            _run({'sqlite': SQLITE_REVERSE, 'mysql': MYSQL_REVERSE}),
+        ),
+        # After the full-text structures, so the SQLite triggers index each row
+        migrations.RunPython(populate_search_documents, migrations.RunPython.noop),
+    ]
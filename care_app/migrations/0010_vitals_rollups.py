@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0009_search_documents'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VitalsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('HOUR', 'Hourly'), ('DAY', 'Daily')], max_length=4)),
+                ('metric', models.CharField(choices=[('blood_pressure_systolic', 'Systolic Blood Pressure'), ('blood_pressure_diastolic', 'Diastolic Blood Pressure'), ('heart_rate', 'Heart Rate'), ('temperature', 'Temperature'), ('weight', 'Weight'), ('oxygen_saturation', 'Oxygen Saturation'), ('blood_sugar', 'Blood Sugar')], max_length=30)),
+                ('bucket_start', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.FloatField(default=0)),
+                ('minimum', models.FloatField()),
+                ('maximum', models.FloatField()),
+                ('elder', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vitals_rollups', to='care_app.elderprofile')),
+            ],
+            options={
+                'unique_together': {('elder', 'granularity', 'metric', 'bucket_start')},
+            },
+        ),
+    ]
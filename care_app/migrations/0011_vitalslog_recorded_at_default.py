@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:36
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0010_vitals_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='vitalslog',
+            name='recorded_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
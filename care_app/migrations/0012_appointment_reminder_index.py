@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0011_vitalslog_recorded_at_default'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['reminder_sent', 'appointment_date'], name='appt_reminder_date_idx'),
+        ),
+    ]
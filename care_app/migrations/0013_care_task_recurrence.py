@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0012_appointment_reminder_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='caretask',
+            name='is_recurring',
+            field=models.BooleanField(default=False, help_text='Repeat this task on its daily, weekly or monthly schedule'),
+        ),
+        migrations.AddField(
+            model_name='caretask',
+            name='occurrence_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='caretask',
+            name='recurrence_parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='care_app.caretask'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='caretask',
+            unique_together={('recurrence_parent', 'occurrence_date')},
+        ),
+        migrations.AddIndex(
+            model_name='caretask',
+            index=models.Index(fields=['is_recurring', 'task_type'], name='task_recurring_idx'),
+        ),
+    ]
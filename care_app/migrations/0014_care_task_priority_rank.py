@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:53
+
+from django.db import migrations, models
+
+
+PRIORITY_RANKS = {'LOW': 1, 'MEDIUM': 2, 'HIGH': 3, 'URGENT': 4}
+
+
+def backfill_priority_rank(apps, schema_editor):
+    CareTask = apps.get_model('care_app', 'CareTask')
+    for priority, rank in PRIORITY_RANKS.items():
+        CareTask.objects.filter(priority=priority).update(priority_rank=rank)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0013_care_task_recurrence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='caretask',
+            name='priority_rank',
+            field=models.PositiveSmallIntegerField(default=2, editable=False),
+        ),
+        migrations.RunPython(backfill_priority_rank, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='caretask',
+            index=models.Index(fields=['status', '-priority_rank', 'due_date'], name='task_status_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='caretask',
+            index=models.Index(fields=['assigned_to', '-priority_rank', 'due_date', 'status', 'is_recurring'], name='task_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,112 @@
+# Generated by Django 4.2.30 on 2026-10-16 21:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def backfill_deliveries(apps, schema_editor):
+    """
+    Deliver existing notifications to the users who could see them.
+
+    A notification that was read under the old global ``is_read`` flag is
+    delivered already read, so nobody's unread count jumps.
+    """
+    Notification = apps.get_model('care_app', 'Notification')
+    NotificationDelivery = apps.get_model('care_app', 'NotificationDelivery')
+    UserProfile = apps.get_model('care_app', 'UserProfile')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+
+    admin_ids = set(UserProfile.objects.filter(
+        user_type='ADMIN', user__is_active=True
+    ).values_list('user_id', flat=True))
+    everyone = list(User.objects.filter(is_active=True).values_list('pk', flat=True))
+    last_pk = 0
+    while True:
+        chunk = list(Notification.objects.filter(pk__gt=last_pk).order_by('pk').values(
+            'pk', 'elder_id', 'elder__guardian_id', 'is_read', 'read_at', 'created_at'
+        )[:BACKFILL_BATCH_SIZE])
+        if not chunk:
+            break
+        deliveries = []
+        for row in chunk:
+            if row['elder_id'] is None:
+                recipients = everyone
+            else:
+                recipients = admin_ids | ({row['elder__guardian_id']} if row['elder__guardian_id'] else set())
+            read_at = (row['read_at'] or row['created_at']) if row['is_read'] else None
+            deliveries.extend(
+                NotificationDelivery(notification_id=row['pk'], recipient_id=user_id, read_at=read_at)
+                for user_id in recipients
+            )
+        NotificationDelivery.objects.bulk_create(deliveries, batch_size=BACKFILL_BATCH_SIZE, ignore_conflicts=True)
+        last_pk = chunk[-1]['pk']
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('care_app', '0014_care_task_priority_rank'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('read_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='NotificationReadMark',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_read_mark', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('read_through', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='notificationdelivery',
+            name='notification',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='care_app.notification'),
+        ),
+        migrations.AddField(
+            model_name='notificationdelivery',
+            name='recipient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_deliveries', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='notificationdelivery',
+            index=models.Index(fields=['recipient', 'read_at', 'notification'], name='notif_delivery_unread_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='notificationdelivery',
+            unique_together={('recipient', 'notification')},
+        ),
+        migrations.RunPython(backfill_deliveries, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='notif_read_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='notif_elder_read_idx',
+        ),
+        migrations.RemoveField(
+            model_name='notification',
+            name='is_read',
+        ),
+        migrations.RemoveField(
+            model_name='notification',
+            name='read_at',
+        ),
+        migrations.RemoveField(
+            model_name='notification',
+            name='read_by',
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-16 21:48
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+# The expire_after_days of each type's retention policy when this migration
+# was written, frozen so later policy changes don't alter what it does
+EXPIRE_AFTER_DAYS = {'MEDICATION': 7, 'APPOINTMENT': 14, 'VITALS': 3}
+
+
+def backfill_expires_at(apps, schema_editor):
+    """Give existing notifications the expiry their type's policy would have."""
+    Notification = apps.get_model('care_app', 'Notification')
+    for notification_type, days in EXPIRE_AFTER_DAYS.items():
+        Notification.objects.filter(
+            notification_type=notification_type, expires_at__isnull=True, created_at__isnull=False
+        ).update(expires_at=F('created_at') + timedelta(days=days))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0015_notification_deliveries'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['expires_at'], name='notif_expires_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['notification_type', 'created_at'], name='notif_type_created_idx'),
+        ),
+        migrations.RunPython(backfill_expires_at, migrations.RunPython.noop),
+    ]
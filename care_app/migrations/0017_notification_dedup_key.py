@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-16 22:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0016_notification_retention'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='dedup_key',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['dedup_key', 'created_at'], name='notif_dedup_idx'),
+        ),
+    ]
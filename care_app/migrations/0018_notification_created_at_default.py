@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-16 22:24
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def backfill_created_at(apps, schema_editor):
+    """
+    Stamp notifications saved without a creation time with the migration
+    time, so the retention cutoffs (which compare ``created_at``) reach them.
+    """
+    Notification = apps.get_model('care_app', 'Notification')
+    Notification.objects.filter(created_at__isnull=True).update(created_at=django.utils.timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0017_notification_dedup_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='created_at',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, null=True),
+        ),
+        migrations.RunPython(backfill_created_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-16 22:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0018_notification_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='caretask',
+            name='overdue_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='caretask',
+            name='overdue_from',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-16 22:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('care_app', '0019_care_task_overdue_from'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['appointment_date', 'id'], name='appt_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incidentreport',
+            index=models.Index(fields=['incident_date', 'id'], name='incident_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicationlog',
+            index=models.Index(fields=['taken_at', 'id'], name='medlog_taken_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vitalslog',
+            index=models.Index(fields=['recorded_at', 'id'], name='vitals_recorded_id_idx'),
+        ),
+    ]
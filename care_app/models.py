@@ -1,6 +1,49 @@
+from datetime import datetime, time, timedelta
+
 from django.db import models
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+
+class ElderProfileQuerySet(models.QuerySet):
+    def with_last_vitals(self):
+        """Annotate each elder with ``last_vitals_at`` in the same query."""
+        latest = VitalsLog.objects.filter(
+            elder=OuterRef('pk')
+        ).order_by('-recorded_at').values('recorded_at')[:1]
+        return self.annotate(last_vitals_at=Subquery(latest))
+
+    def vitals_due(self, days=7):
+        """Elders with no vitals, or whose last reading is ``days`` or more days old."""
+        cutoff = timezone.make_aware(
+            datetime.combine(timezone.localdate() - timedelta(days=days - 1), time.min)
+        )
+        return self.with_last_vitals().filter(
+            Q(last_vitals_at__isnull=True) | Q(last_vitals_at__lt=cutoff)
+        )
+
+    def with_summary_counts(self):
+        """
+        Annotate ``medication_count``, ``open_task_count`` and
+        ``upcoming_appointment_count`` as correlated subqueries, so a page of
+        elders and its per-row counts come back in a single query.
+        """
+        def _count(queryset):
+            counts = queryset.filter(elder=OuterRef('pk')).order_by().values('elder').annotate(
+                total=Count('pk')
+            ).values('total')
+            return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+        return self.annotate(
+            medication_count=_count(MedicationSchedule.objects.all()),
+            open_task_count=_count(CareTask.objects.filter(status__in=CareTask.OPEN_STATUSES, is_recurring=False)),
+            upcoming_appointment_count=_count(Appointment.objects.filter(
+                appointment_date__gte=timezone.now(),
+                status__in=['SCHEDULED', 'CONFIRMED'],
+            )),
+        )
 
 class ElderProfile(models.Model):
     GENDER_CHOICES = [
@@ -24,6 +67,13 @@ class ElderProfile(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     assigned_staff = models.ManyToManyField(User, through='ElderAssignment', related_name='assigned_elders', blank=True)
 
+    objects = ElderProfileQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['full_name', 'id'], name='elder_name_idx'),
+        ]
+
     def __str__(self):
         return self.full_name
     
@@ -112,6 +162,11 @@ class MedicationLog(models.Model):
     was_skipped = models.BooleanField(default=False)
     skip_reason = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['taken_at', 'id'], name='medlog_taken_idx'),
+        ]
+
     def __str__(self):
         return f"{self.schedule.medication.name} taken at {self.taken_at}"
 
@@ -146,6 +201,14 @@ class Appointment(models.Model):
     reminder_sent = models.BooleanField(default=False)
     created_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'appointment_date'], name='appt_status_date_idx'),
+            models.Index(fields=['elder', '-appointment_date'], name='appt_elder_date_idx'),
+            models.Index(fields=['reminder_sent', 'appointment_date'], name='appt_reminder_date_idx'),
+            models.Index(fields=['appointment_date', 'id'], name='appt_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.title} - {self.elder.full_name}"
 
@@ -173,6 +236,11 @@ class CareTask(models.Model):
         ('URGENT', 'Urgent'),
     ]
     
+    OPEN_STATUSES = ['PENDING', 'IN_PROGRESS', 'OVERDUE']
+    
+    # Stored as priority_rank so urgency sorts numerically and from an index
+    PRIORITY_RANKS = {'LOW': 1, 'MEDIUM': 2, 'HIGH': 3, 'URGENT': 4}
+    
     elder = models.ForeignKey(ElderProfile, on_delete=models.CASCADE, related_name='care_tasks')
     title = models.CharField(max_length=200, null=True, blank=True)
     description = models.TextField()
@@ -181,15 +249,39 @@ class CareTask(models.Model):
     assigned_to = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_tasks')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     priority = models.CharField(max_length=20, choices=PRIORITY_CHOICES, default='MEDIUM')
+    priority_rank = models.PositiveSmallIntegerField(default=2, editable=False)
     due_date = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     completed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='completed_tasks')
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(null=True, blank=True)
+    is_recurring = models.BooleanField(default=False, help_text='Repeat this task on its daily, weekly or monthly schedule')
+    recurrence_parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='occurrences')
+    occurrence_date = models.DateField(null=True, blank=True)
+    # Set by the overdue sweeper: the status to reopen to, and when the sweep claimed the task
+    overdue_from = models.CharField(max_length=20, blank=True, editable=False)
+    overdue_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        unique_together = ['recurrence_parent', 'occurrence_date']
+        indexes = [
+            models.Index(fields=['elder', 'status', 'priority', 'due_date'], name='task_elder_status_idx'),
+            models.Index(fields=['status', 'due_date'], name='task_status_due_idx'),
+            models.Index(fields=['is_recurring', 'task_type'], name='task_recurring_idx'),
+            models.Index(fields=['status', '-priority_rank', 'due_date'], name='task_status_rank_idx'),
+            models.Index(
+                fields=['assigned_to', '-priority_rank', 'due_date', 'status', 'is_recurring'],
+                name='task_queue_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.title or 'Untitled Task'} ({self.status})"
 
+    def save(self, *args, **kwargs):
+        self.priority_rank = self.PRIORITY_RANKS.get(self.priority, 2)
+        super().save(*args, **kwargs)
+
 class EmergencyContact(models.Model):
     RELATION_CHOICES = [
         ('SPOUSE', 'Spouse'),
@@ -232,7 +324,7 @@ class EmergencyContact(models.Model):
 
 class VitalsLog(models.Model):
     elder = models.ForeignKey(ElderProfile, on_delete=models.CASCADE, related_name='vitals_logs')
-    recorded_at = models.DateTimeField(auto_now_add=True)
+    recorded_at = models.DateTimeField(default=timezone.now)
     blood_pressure_systolic = models.IntegerField(validators=[MinValueValidator(50), MaxValueValidator(300)], null=True, blank=True)
     blood_pressure_diastolic = models.IntegerField(validators=[MinValueValidator(30), MaxValueValidator(200)], null=True, blank=True)
     heart_rate = models.IntegerField(validators=[MinValueValidator(30), MaxValueValidator(200)], null=True, blank=True)
@@ -243,6 +335,13 @@ class VitalsLog(models.Model):
     notes = models.TextField(blank=True)
     logged_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['elder', '-recorded_at'], name='vitals_elder_recorded_idx'),
+            models.Index(fields=['-recorded_at'], name='vitals_recorded_idx'),
+            models.Index(fields=['recorded_at', 'id'], name='vitals_recorded_id_idx'),
+        ]
+
     def __str__(self):
         return f"Vitals {self.elder.full_name} @ {self.recorded_at}"
     
@@ -252,6 +351,43 @@ class VitalsLog(models.Model):
             return f"{self.blood_pressure_systolic}/{self.blood_pressure_diastolic}"
         return "N/A"
 
+class VitalsRollup(models.Model):
+    """Per-elder min/max/sum/count of one vitals metric over an hour or a day."""
+    GRANULARITY_CHOICES = [
+        ('HOUR', 'Hourly'),
+        ('DAY', 'Daily'),
+    ]
+
+    METRIC_CHOICES = [
+        ('blood_pressure_systolic', 'Systolic Blood Pressure'),
+        ('blood_pressure_diastolic', 'Diastolic Blood Pressure'),
+        ('heart_rate', 'Heart Rate'),
+        ('temperature', 'Temperature'),
+        ('weight', 'Weight'),
+        ('oxygen_saturation', 'Oxygen Saturation'),
+        ('blood_sugar', 'Blood Sugar'),
+    ]
+
+    elder = models.ForeignKey(ElderProfile, on_delete=models.CASCADE, related_name='vitals_rollups')
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES)
+    metric = models.CharField(max_length=30, choices=METRIC_CHOICES)
+    bucket_start = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+    total = models.FloatField(default=0)
+    minimum = models.FloatField()
+    maximum = models.FloatField()
+
+    class Meta:
+        # The unique index doubles as the trend query's range-scan index
+        unique_together = ('elder', 'granularity', 'metric', 'bucket_start')
+
+    def __str__(self):
+        return f"{self.metric} {self.granularity} {self.elder_id} @ {self.bucket_start}"
+
+    @property
+    def average(self):
+        return self.total / self.count if self.count else None
+
 class IncidentReport(models.Model):
     SEVERITY_CHOICES = [
         ('LOW', 'Low'),
@@ -286,6 +422,13 @@ class IncidentReport(models.Model):
     resolved_date = models.DateTimeField(null=True, blank=True)
     resolved_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='resolved_incidents')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_resolved', '-incident_date'], name='incident_resolved_date_idx'),
+            models.Index(fields=['elder', '-incident_date'], name='incident_elder_date_idx'),
+            models.Index(fields=['incident_date', 'id'], name='incident_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.incident_type}: {self.elder.full_name}"
 
@@ -302,16 +445,46 @@ class Notification(models.Model):
     elder = models.ForeignKey(ElderProfile, on_delete=models.CASCADE, null=True, blank=True, related_name='notifications')
     notification_type = models.CharField(max_length=20, choices=NOTIFICATION_TYPE_CHOICES, default='GENERAL')
     message = models.TextField()
-    created_at = models.DateTimeField(null=True, blank=True)
-    is_read = models.BooleanField(default=False)
-    read_at = models.DateTimeField(null=True, blank=True)
-    read_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='read_notifications')
+    created_at = models.DateTimeField(default=timezone.now, null=True, blank=True)
     priority = models.CharField(max_length=20, choices=[('LOW', 'Low'), ('MEDIUM', 'Medium'), ('HIGH', 'High')], default='MEDIUM')
     expires_at = models.DateTimeField(null=True, blank=True)
+    # Groups repeats of the same alert so they can be suppressed; blank for one-off notifications
+    dedup_key = models.CharField(max_length=100, blank=True, default='')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires_at'], name='notif_expires_idx'),
+            models.Index(fields=['notification_type', 'created_at'], name='notif_type_created_idx'),
+            models.Index(fields=['dedup_key', 'created_at'], name='notif_dedup_idx'),
+        ]
 
     def __str__(self):
         return f"{self.notification_type}: {self.message[:20]}"
 
+class NotificationDelivery(models.Model):
+    """One recipient's copy of a notification and whether they have read it."""
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='deliveries')
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notification_deliveries')
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('recipient', 'notification')
+        indexes = [
+            models.Index(fields=['recipient', 'read_at', 'notification'], name='notif_delivery_unread_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient_id}:{self.notification_id}"
+
+class NotificationReadMark(models.Model):
+    """Every delivery up to ``read_through`` (a notification id) counts as read."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_read_mark')
+    read_through = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id}:{self.read_through}"
+
 class UserProfile(models.Model):
     USER_TYPE_CHOICES = [
         ('ADMIN', 'Administrator'),
@@ -332,3 +505,28 @@ class UserProfile(models.Model):
 
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.user_type}"
+
+class SearchDocument(models.Model):
+    """Denormalized, full-text indexed copy of the searchable text of a record."""
+    CATEGORY_CHOICES = [
+        ('elders', 'Elders'),
+        ('medications', 'Medications'),
+        ('tasks', 'Tasks'),
+        ('appointments', 'Appointments'),
+    ]
+
+    category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    elder = models.ForeignKey(ElderProfile, on_delete=models.CASCADE, related_name='search_documents')
+    title = models.CharField(max_length=255, blank=True)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('category', 'object_id')
+        indexes = [
+            models.Index(fields=['category', 'elder'], name='searchdoc_category_elder_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.category}:{self.object_id}"
@@ -0,0 +1,266 @@
+"""
+Notification delivery and summary service.
+
+Each notification is fanned out when it is created to one
+``NotificationDelivery`` per recipient - every administrator, plus the
+elder's guardian, or every active user for general notifications - so read
+state is per recipient. A delivery is read once it has a ``read_at`` or its
+notification id is at or below the recipient's ``NotificationReadMark``,
+which makes "mark all read" a single-row update.
+
+Recipients are fixed when a notification is delivered. Someone who becomes
+an administrator or an elder's guardian afterwards does not see the
+notifications created before then until ``backfill_notification_deliveries``
+is run again, which delivers every notification to whoever its recipients
+are now. A deactivated or demoted user keeps the deliveries they had.
+
+Each ``notification_type`` has a retention policy (``NOTIFICATION_RETENTION``
+in settings). Notifications created without an ``expires_at`` get one from
+their policy's ``expire_after_days``, and every read path here skips expired
+notifications; ``care_app.retention`` purges them from the table.
+
+The navigation bar shows an unread badge and a short preview on every page.
+Both are computed once per user and kept in the cache until one of that
+user's deliveries changes, so a warm page render issues no notification
+queries at all and a new notification only evicts its recipients' summaries.
+"""
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .caching import bump_version, get_cache, get_version, make_key
+from .models import ElderProfile, Notification, NotificationDelivery, NotificationReadMark, UserProfile
+
+SUMMARY_VERSION = 'notifications'
+SUMMARY_PREVIEW_SIZE = 5
+SUMMARY_TIMEOUT = 300
+NOTIFICATION_BATCH_SIZE = 500
+
+DEFAULT_RETENTION_POLICY = {
+    'expire_after_days': None,
+    'purge_read_after_days': 90,
+    'purge_after_days': 365,
+    'archive': False,
+}
+
+
+def retention_policy(notification_type):
+    """The retention policy for ``notification_type``, merged over the default."""
+    policies = getattr(settings, 'NOTIFICATION_RETENTION', {})
+    return {**DEFAULT_RETENTION_POLICY, **policies.get('default', {}), **policies.get(notification_type, {})}
+
+
+def default_expiry(notification):
+    """Set ``expires_at`` from the type's policy if the notification has none."""
+    days = retention_policy(notification.notification_type)['expire_after_days']
+    if notification.expires_at is None and days is not None:
+        notification.expires_at = (notification.created_at or timezone.now()) + timedelta(days=days)
+
+
+def unexpired(now=None, prefix=''):
+    """``Q`` matching notifications (or, with ``prefix='notification__'``, deliveries) not yet expired."""
+    now = now or timezone.now()
+    return Q(**{f'{prefix}expires_at__isnull': True}) | Q(**{f'{prefix}expires_at__gt': now})
+
+
+def read_through(user):
+    """Id of the newest notification ``user`` marked read with "mark all read"."""
+    return NotificationReadMark.objects.filter(user_id=user.pk).values_list('read_through', flat=True).first() or 0
+
+
+def unread_deliveries(user, read_through_id=None):
+    """``user``'s unread deliveries; served by ``notif_delivery_unread_idx``."""
+    if read_through_id is None:
+        read_through_id = read_through(user)
+    return NotificationDelivery.objects.filter(
+        unexpired(prefix='notification__'),
+        recipient_id=user.pk, read_at__isnull=True, notification_id__gt=read_through_id,
+    )
+
+
+def visible_deliveries(user):
+    """All of ``user``'s deliveries whose notification has not expired."""
+    return NotificationDelivery.objects.filter(unexpired(prefix='notification__'), recipient_id=user.pk)
+
+
+def with_read_state(deliveries, read_through_id):
+    """The deliveries' notifications, each with ``is_read`` for its recipient."""
+    notifications = []
+    for delivery in deliveries:
+        notification = delivery.notification
+        notification.is_read = delivery.read_at is not None or delivery.notification_id <= read_through_id
+        notification.read_at = delivery.read_at
+        notifications.append(notification)
+    return notifications
+
+
+def mark_read(user, notification_id):
+    """Mark one of ``user``'s deliveries read; returns whether one changed."""
+    updated = NotificationDelivery.objects.filter(
+        recipient_id=user.pk, notification_id=notification_id, read_at__isnull=True
+    ).update(read_at=timezone.now())
+    invalidate_notification_summary(user.pk)
+    return bool(updated)
+
+
+def mark_all_read(user):
+    """Move ``user``'s read watermark up to their newest delivery."""
+    newest = NotificationDelivery.objects.filter(recipient_id=user.pk).aggregate(
+        newest=Max('notification_id')
+    )['newest']
+    if newest is None:
+        return
+    NotificationReadMark.objects.update_or_create(user_id=user.pk, defaults={'read_through': newest})
+    invalidate_notification_summary(user.pk)
+
+
+def _build_summary(user):
+    unread = unread_deliveries(user)
+    preview = [
+        {
+            'id': row['notification_id'],
+            'message': row['notification__message'],
+            'priority': row['notification__priority'],
+            'created_at': row['notification__created_at'],
+        }
+        for row in unread.order_by('-notification_id').values(
+            'notification_id', 'notification__message', 'notification__priority', 'notification__created_at'
+        )[:SUMMARY_PREVIEW_SIZE]
+    ]
+    return {
+        'unread_count': unread.count(),
+        'preview': preview,
+    }
+
+
+def _summary_key(user_id):
+    return make_key('notifications', 'summary', user_id)
+
+
+def get_notification_summary(user):
+    """Return ``{'unread_count': int, 'preview': [dict, ...]}`` for ``user``."""
+    if not user.is_authenticated:
+        return {'unread_count': 0, 'preview': []}
+
+    cache = get_cache()
+    version = get_version(SUMMARY_VERSION)
+    key = _summary_key(user.pk)
+    summary = cache.get(key, version=version)
+    if summary is None:
+        summary = _build_summary(user)
+        cache.set(key, summary, SUMMARY_TIMEOUT, version=version)
+    return summary
+
+
+def invalidate_notification_summaries():
+    """Drop every cached summary; call after bulk updates that bypass signals."""
+    bump_version(SUMMARY_VERSION)
+
+
+def invalidate_notification_summary(*user_ids):
+    """Drop the cached summaries of ``user_ids`` after their deliveries or read state changed."""
+    get_cache().delete_many([_summary_key(user_id) for user_id in user_ids], version=get_version(SUMMARY_VERSION))
+
+
+def _recipient_ids(notifications):
+    """``{notification pk: [user id, ...]}`` for saved ``notifications``."""
+    admin_ids = list(UserProfile.objects.filter(
+        user_type='ADMIN', user__is_active=True
+    ).values_list('user_id', flat=True))
+    guardian_ids = dict(ElderProfile.objects.filter(
+        pk__in={notification.elder_id for notification in notifications if notification.elder_id}
+    ).values_list('pk', 'guardian_id'))
+    everyone = None
+    recipients = {}
+    for notification in notifications:
+        if notification.elder_id is None:
+            if everyone is None:
+                everyone = list(User.objects.filter(is_active=True).values_list('pk', flat=True))
+            recipients[notification.pk] = everyone
+        else:
+            guardian_id = guardian_ids.get(notification.elder_id)
+            recipients[notification.pk] = set(admin_ids) | ({guardian_id} if guardian_id else set())
+    return recipients
+
+
+def deliver_notifications(notifications, batch_size=NOTIFICATION_BATCH_SIZE):
+    """
+    Fan saved ``notifications`` out to one ``NotificationDelivery`` per recipient.
+
+    Existing deliveries are left alone, so delivering twice is harmless.
+    Returns the number of deliveries written.
+    """
+    notifications = list(notifications)
+    if not notifications:
+        return 0
+    recipients = _recipient_ids(notifications)
+    deliveries = (
+        NotificationDelivery(notification_id=notification.pk, recipient_id=user_id)
+        for notification in notifications
+        for user_id in recipients[notification.pk]
+    )
+    written = 0
+    while True:
+        batch = list(islice(deliveries, batch_size))
+        if not batch:
+            break
+        NotificationDelivery.objects.bulk_create(batch, ignore_conflicts=True)
+        written += len(batch)
+    invalidate_notification_summary(*set().union(*recipients.values()))
+    return written
+
+
+def create_notifications(notifications, batch_size=NOTIFICATION_BATCH_SIZE):
+    """
+    Insert unsaved ``Notification`` objects with ``bulk_create`` and deliver them.
+
+    ``bulk_create`` skips the post_save handlers, so the deliveries are
+    written and summaries invalidated here once for the whole batch.
+    """
+    notifications = list(notifications)
+    if not notifications:
+        return notifications
+    now = timezone.now()
+    for notification in notifications:
+        if notification.created_at is None:
+            notification.created_at = now
+        default_expiry(notification)
+    if connection.features.can_return_rows_from_bulk_insert:
+        Notification.objects.bulk_create(notifications, batch_size=batch_size)
+    elif connection.vendor == 'mysql':
+        for start in range(0, len(notifications), batch_size):
+            _bulk_create_mysql(notifications[start:start + batch_size])
+    else:
+        # No way to learn a multi-row insert's ids; the post_save handler
+        # delivers each notification
+        for notification in notifications:
+            notification.save()
+        return notifications
+    deliver_notifications(notifications, batch_size=batch_size)
+    return notifications
+
+
+def _bulk_create_mysql(notifications):
+    """
+    Insert ``notifications`` with one multi-row ``INSERT`` and give them
+    their primary keys.
+
+    ``LAST_INSERT_ID()`` is the id of the statement's first row and is kept
+    per connection, so concurrent inserts cannot affect it. InnoDB gives the
+    rows of one multi-row ``INSERT`` consecutive ids, ``auto_increment_increment``
+    apart, in every ``innodb_autoinc_lock_mode``, since it knows the row
+    count up front.
+    """
+    with transaction.atomic():
+        Notification.objects.bulk_create(notifications, batch_size=len(notifications))
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT LAST_INSERT_ID(), @@auto_increment_increment')
+            first_id, step = cursor.fetchone()
+    for offset, notification in enumerate(notifications):
+        notification.pk = first_id + offset * step
+        notification._state.adding = False
@@ -0,0 +1,57 @@
+class KeysetPage:
+    """
+    A page fetched with a ``WHERE (key) > (cursor)`` seek instead of OFFSET.
+
+    Exposes the subset of Django's ``Page`` API the templates use, plus
+    ``next_cursor`` for building the "next" link.
+    """
+
+    def __init__(self, object_list, has_next, next_cursor):
+        self.object_list = object_list
+        self._has_next = has_next
+        self.next_cursor = next_cursor
+        self.paginator = None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return False
+
+    def has_other_pages(self):
+        return self._has_next
+
+
+def keyset_page(queryset, seek_filter, per_page):
+    """
+    Return a ``KeysetPage`` of ``queryset`` (already ordered by the seek key).
+
+    ``seek_filter`` is a ``Q`` selecting rows after the cursor, or ``None`` for
+    the first page. One extra row is fetched to learn whether another page
+    follows, so no COUNT query is needed.
+    """
+    if seek_filter is not None:
+        queryset = queryset.filter(seek_filter)
+    rows = list(queryset[:per_page + 1])
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    next_cursor = rows[-1].pk if has_next else None
+    return KeysetPage(rows, has_next, next_cursor)
+
+
+def parse_cursor(value):
+    """The positive integer id in ``?after=``, or ``None`` (first page) if it is not one."""
+    try:
+        cursor = int(value)
+    except (TypeError, ValueError):
+        return None
+    return cursor if cursor > 0 else None
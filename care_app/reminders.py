@@ -0,0 +1,75 @@
+"""
+Appointment reminders.
+
+``send_appointment_reminders`` claims upcoming appointments in batches
+through the ``(reminder_sent, appointment_date)`` index, creates one
+notification per appointment with ``bulk_create`` and marks the batch sent
+with a single ``UPDATE``, all in one transaction. On databases that support
+``SELECT ... FOR UPDATE SKIP LOCKED`` (PostgreSQL, MySQL 8) each worker
+locks the rows it claims, so several workers can run side by side without
+sending a reminder twice. SQLite has no row locks and serializes writers;
+run a single worker there.
+"""
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Appointment, Notification
+from .notifications import create_notifications
+
+REMINDER_LEAD_TIME = timedelta(hours=24)
+REMINDER_BATCH_SIZE = 200
+REMINDER_STATUSES = ['SCHEDULED', 'CONFIRMED']
+
+
+def _reminder_message(title, appointment_date, location):
+    when = timezone.localtime(appointment_date).strftime('%b %d, %Y at %I:%M %p')
+    message = f'Upcoming appointment: {title} on {when}'
+    if location:
+        message += f' at {location}'
+    return message
+
+
+def _claim_batch(now, lead_time, batch_size):
+    due = Appointment.objects.filter(
+        reminder_sent=False,
+        status__in=REMINDER_STATUSES,
+        appointment_date__gt=now,
+        appointment_date__lte=now + lead_time,
+    ).order_by('appointment_date')
+    if connection.features.has_select_for_update_skip_locked:
+        due = due.select_for_update(skip_locked=True)
+    return list(due.values_list('pk', 'elder_id', 'title', 'appointment_date', 'location')[:batch_size])
+
+
+def send_reminder_batch(now=None, lead_time=REMINDER_LEAD_TIME, batch_size=REMINDER_BATCH_SIZE):
+    """Send reminders for one batch of due appointments. Returns how many were sent."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        batch = _claim_batch(now, lead_time, batch_size)
+        if not batch:
+            return 0
+        create_notifications(
+            Notification(
+                elder_id=elder_id,
+                notification_type='APPOINTMENT',
+                message=_reminder_message(title, appointment_date, location),
+                priority='MEDIUM',
+                expires_at=appointment_date,
+            )
+            for _, elder_id, title, appointment_date, location in batch
+        )
+        Appointment.objects.filter(pk__in=[row[0] for row in batch]).update(reminder_sent=True)
+    return len(batch)
+
+
+def send_appointment_reminders(now=None, lead_time=REMINDER_LEAD_TIME, batch_size=REMINDER_BATCH_SIZE):
+    """Drain every due reminder, one batch per transaction. Returns the total sent."""
+    now = now or timezone.now()
+    total = 0
+    while True:
+        sent = send_reminder_batch(now, lead_time, batch_size)
+        total += sent
+        if sent < batch_size:
+            return total
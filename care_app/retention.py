@@ -0,0 +1,172 @@
+"""
+Notification retention: purging expired and stale notifications.
+
+``purge_notifications`` applies each type's policy (see
+``care_app.notifications.retention_policy``) in three passes:
+
+- expired: ``expires_at`` has passed (``notif_expires_idx``);
+- read: older than ``purge_read_after_days`` and read by every recipient,
+  either explicitly or through their read watermark;
+- old: older than ``purge_after_days``, read or not
+  (``notif_type_created_idx``).
+
+Each batch selects at most ``batch_size`` ids, optionally appends those
+rows to an NDJSON archive file (policy ``archive``), then deletes their
+deliveries and the notifications in one short transaction, so no lock is
+held for longer than one batch. The notification rows are deleted with a
+plain ``DELETE``: going through ``QuerySet.delete()`` would load every row
+and fire a post_delete handler per notification, and the summaries are
+invalidated once at the end instead.
+"""
+import json
+import logging
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from .models import Notification, NotificationDelivery
+from .notifications import invalidate_notification_summaries, retention_policy
+
+logger = logging.getLogger(__name__)
+
+PURGE_BATCH_SIZE = 1000
+ARCHIVE_FIELDS = ['id', 'elder_id', 'notification_type', 'message', 'priority', 'created_at', 'expires_at']
+
+
+class PurgeResult:
+    def __init__(self):
+        self.expired = 0
+        self.read = 0
+        self.old = 0
+        self.archived = 0
+        self.batches = 0
+        self.duration = 0.0
+
+    @property
+    def deleted(self):
+        return self.expired + self.read + self.old
+
+    def as_dict(self):
+        return {
+            'expired': self.expired,
+            'read': self.read,
+            'old': self.old,
+            'deleted': self.deleted,
+            'archived': self.archived,
+            'batches': self.batches,
+            'duration': round(self.duration, 3),
+        }
+
+
+def _unread_deliveries():
+    """Deliveries of the outer notification that their recipient has not read."""
+    return NotificationDelivery.objects.filter(
+        Q(recipient__notification_read_mark__isnull=True)
+        | Q(notification_id__gt=F('recipient__notification_read_mark__read_through')),
+        notification_id=OuterRef('pk'),
+        read_at__isnull=True,
+    )
+
+
+def _archive(ids, now):
+    directory = getattr(settings, 'NOTIFICATION_ARCHIVE_DIR', None)
+    if not directory:
+        return 0
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'notifications-{timezone.localdate(now).isoformat()}.ndjson')
+    rows = Notification.objects.filter(pk__in=ids).order_by('pk').values(*ARCHIVE_FIELDS)
+    with open(path, 'a', encoding='utf-8') as archive:
+        for row in rows:
+            archive.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+    return len(ids)
+
+
+def _delete(ids):
+    NotificationDelivery.objects.filter(notification_id__in=ids).delete()
+    table = connection.ops.quote_name(Notification._meta.db_table)
+    pk = connection.ops.quote_name(Notification._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE {pk} IN ({", ".join(["%s"] * len(ids))})', ids
+        )
+
+
+def _purge_batch(candidates, archive, now, batch_size, result):
+    """Delete one batch of ``candidates``; returns the ids it claimed."""
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list('pk', flat=True)[:batch_size])
+        if ids:
+            if archive:
+                result.archived += _archive(ids, now)
+            _delete(ids)
+            result.batches += 1
+    return ids
+
+
+def _purge_all(candidates, archive, now, batch_size, result, pause):
+    deleted = 0
+    while True:
+        ids = _purge_batch(candidates, archive, now, batch_size, result)
+        deleted += len(ids)
+        if len(ids) < batch_size:
+            return deleted
+        if pause:
+            time.sleep(pause)
+
+
+def _purge_read(candidates, archive, now, batch_size, result, pause):
+    # Notifications with unread deliveries stay put, so walk the candidates
+    # by id instead of re-selecting the same survivors every batch
+    candidates = candidates.annotate(has_unread=Exists(_unread_deliveries())).order_by('pk')
+    deleted = 0
+    last_pk = 0
+    while True:
+        rows = list(candidates.filter(pk__gt=last_pk).values_list('pk', 'has_unread')[:batch_size])
+        if not rows:
+            return deleted
+        last_pk = rows[-1][0]
+        ids = [pk for pk, has_unread in rows if not has_unread]
+        if ids:
+            deleted += len(_purge_batch(Notification.objects.filter(pk__in=ids), archive, now, batch_size, result))
+        if len(rows) < batch_size:
+            return deleted
+        if pause:
+            time.sleep(pause)
+
+
+def purge_notifications(now=None, batch_size=PURGE_BATCH_SIZE, pause=0):
+    """
+    Delete (and optionally archive) notifications their retention policy no
+    longer keeps. ``pause`` seconds are slept between batches to leave room
+    for other writers. Returns a ``PurgeResult``.
+    """
+    now = now or timezone.now()
+    result = PurgeResult()
+    started = time.monotonic()
+
+    for notification_type, _ in Notification.NOTIFICATION_TYPE_CHOICES:
+        policy = retention_policy(notification_type)
+        archive = policy['archive']
+        of_type = Notification.objects.filter(notification_type=notification_type)
+
+        result.expired += _purge_all(of_type.filter(expires_at__lte=now), archive, now, batch_size, result, pause)
+        if policy['purge_read_after_days'] is not None:
+            cutoff = now - timedelta(days=policy['purge_read_after_days'])
+            result.read += _purge_read(of_type.filter(created_at__lt=cutoff), archive, now, batch_size, result, pause)
+        if policy['purge_after_days'] is not None:
+            cutoff = now - timedelta(days=policy['purge_after_days'])
+            result.old += _purge_all(of_type.filter(created_at__lt=cutoff), archive, now, batch_size, result, pause)
+
+    if result.deleted:
+        invalidate_notification_summaries()
+    result.duration = time.monotonic() - started
+    logger.info('Notification purge: %s', result.as_dict())
+    return result
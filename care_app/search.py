@@ -0,0 +1,187 @@
+"""
+Full-text search over elders, medication schedules, care tasks and appointments.
+
+Searchable text is copied into ``SearchDocument`` rows, kept in sync by the
+signal handlers in ``signals.py``. Each database gets the best backend it
+supports:
+
+* SQLite  - an FTS5 virtual table ranked with ``bm25``
+* MySQL   - a ``FULLTEXT`` index queried in boolean mode
+* others  - ``icontains`` over the document table
+
+Set ``SEARCH_BACKEND`` to a dotted path to override the choice.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Appointment, CareTask, ElderProfile, MedicationSchedule, SearchDocument
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _join(*parts):
+    return '\n'.join(part for part in parts if part)
+
+
+def _elder_document(elder):
+    return elder.pk, elder.full_name, _join(elder.medical_conditions, elder.address)
+
+
+def _medication_document(schedule):
+    medication = schedule.medication
+    return schedule.elder_id, medication.name, medication.description
+
+
+def _task_document(task):
+    return task.elder_id, task.title or '', task.description
+
+
+def _appointment_document(appointment):
+    return appointment.elder_id, appointment.title, appointment.notes
+
+
+# category -> (model, document builder, select_related for hydration)
+SEARCH_CATEGORIES = {
+    'elders': (ElderProfile, _elder_document, []),
+    'medications': (MedicationSchedule, _medication_document, ['medication', 'elder']),
+    'tasks': (CareTask, _task_document, ['elder']),
+    'appointments': (Appointment, _appointment_document, ['elder']),
+}
+
+MODEL_CATEGORIES = {model: category for category, (model, _, _) in SEARCH_CATEGORIES.items()}
+
+
+def build_document(category, instance):
+    _, builder, _ = SEARCH_CATEGORIES[category]
+    elder_id, title, body = builder(instance)
+    return SearchDocument(
+        category=category,
+        object_id=instance.pk,
+        elder_id=elder_id,
+        title=title[:255],
+        body=body,
+    )
+
+
+def index_instance(instance):
+    """Create or refresh the search document for a saved model instance."""
+    category = MODEL_CATEGORIES[type(instance)]
+    document = build_document(category, instance)
+    SearchDocument.objects.update_or_create(
+        category=category,
+        object_id=instance.pk,
+        defaults={'elder_id': document.elder_id, 'title': document.title, 'body': document.body},
+    )
+
+
+def unindex_instance(instance):
+    category = MODEL_CATEGORIES[type(instance)]
+    SearchDocument.objects.filter(category=category, object_id=instance.pk).delete()
+
+
+def rebuild_index(categories=None, chunk_size=2000):
+    """Rebuild documents from the source tables. Returns the number indexed."""
+    total = 0
+    for category in categories or SEARCH_CATEGORIES:
+        model, _, related = SEARCH_CATEGORIES[category]
+        SearchDocument.objects.filter(category=category).delete()
+        batch = []
+        queryset = model.objects.select_related(*related).order_by('pk')
+        for instance in queryset.iterator(chunk_size=chunk_size):
+            batch.append(build_document(category, instance))
+            if len(batch) >= chunk_size:
+                SearchDocument.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            SearchDocument.objects.bulk_create(batch)
+            total += len(batch)
+    return total
+
+
+def search_terms(query):
+    return _TERM_RE.findall(query.lower())
+
+
+class IContainsSearchBackend:
+    """Portable fallback: substring match over the document table."""
+
+    def search(self, query, category, elder_ids=None, limit=20, offset=0):
+        terms = search_terms(query)
+        if not terms:
+            return []
+        documents = SearchDocument.objects.filter(category=category)
+        if elder_ids is not None:
+            documents = documents.filter(elder_id__in=elder_ids)
+        for term in terms:
+            documents = documents.filter(Q(title__icontains=term) | Q(body__icontains=term))
+        return list(documents.order_by('-updated_at').values_list('object_id', flat=True)[offset:offset + limit])
+
+
+class SQLiteFTSSearchBackend:
+    """FTS5 prefix match ranked by bm25, title weighted above body."""
+
+    def match_expression(self, terms):
+        return ' '.join('"%s"*' % term.replace('"', '""') for term in terms)
+
+    def search(self, query, category, elder_ids=None, limit=20, offset=0):
+        terms = search_terms(query)
+        if not terms:
+            return []
+        sql = [
+            "SELECT d.object_id FROM care_app_searchdocument_fts f",
+            "JOIN care_app_searchdocument d ON d.id = f.rowid",
+            "WHERE care_app_searchdocument_fts MATCH %s AND d.category = %s",
+        ]
+        params = [self.match_expression(terms), category]
+        if elder_ids is not None:
+            elder_ids = list(elder_ids)
+            if not elder_ids:
+                return []
+            sql.append("AND d.elder_id IN (%s)" % ', '.join(['%s'] * len(elder_ids)))
+            params.extend(elder_ids)
+        sql.append("ORDER BY bm25(care_app_searchdocument_fts, 10.0, 1.0) LIMIT %s OFFSET %s")
+        params.extend([limit, offset])
+        with connection.cursor() as cursor:
+            cursor.execute(' '.join(sql), params)
+            return [row[0] for row in cursor.fetchall()]
+
+
+class MySQLFullTextSearchBackend:
+    """InnoDB FULLTEXT boolean-mode match, every term required, prefix allowed."""
+
+    def search(self, query, category, elder_ids=None, limit=20, offset=0):
+        terms = search_terms(query)
+        if not terms:
+            return []
+        against = ' '.join('+%s*' % term for term in terms)
+        score = RawSQL("MATCH (title, body) AGAINST (%s IN BOOLEAN MODE)", (against,))
+        documents = SearchDocument.objects.filter(category=category).annotate(score=score).filter(score__gt=0)
+        if elder_ids is not None:
+            documents = documents.filter(elder_id__in=elder_ids)
+        return list(documents.order_by('-score').values_list('object_id', flat=True)[offset:offset + limit])
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteFTSSearchBackend,
+    'mysql': MySQLFullTextSearchBackend,
+}
+
+
+def get_search_backend():
+    backend_path = getattr(settings, 'SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+    return VENDOR_BACKENDS.get(connection.vendor, IContainsSearchBackend)()
+
+
+def hydrate(category, object_ids):
+    """Load the ranked ``object_ids`` of ``category``, preserving rank order."""
+    model, _, related = SEARCH_CATEGORIES[category]
+    objects = model.objects.select_related(*related).in_bulk(object_ids)
+    return [objects[pk] for pk in object_ids if pk in objects]
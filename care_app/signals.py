@@ -0,0 +1,204 @@
+"""
+Signal handlers that keep cached and derived data in step with the database.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .access import invalidate_access_scope
+from .anomalies import check_new_readings
+from .dashboard import invalidate_dashboards
+from .fragments import invalidate_elder_section
+from .models import (
+    Appointment, CareTask, ElderAssignment, ElderProfile, EmergencyContact,
+    IncidentReport, Medication, MedicationLog, MedicationSchedule,
+    Notification, NotificationDelivery, SearchDocument, UserProfile, VitalsLog
+)
+from .notifications import default_expiry, deliver_notifications, invalidate_notification_summary
+from . import search
+from .vitals_rollups import refresh_rollups_for_reading
+
+
+@receiver(pre_save, sender=ElderProfile)
+def remember_previous_guardian(sender, instance, raw=False, **kwargs):
+    instance._previous_guardian_id = None
+    if instance.pk and not raw:
+        instance._previous_guardian_id = ElderProfile.objects.filter(
+            pk=instance.pk
+        ).values_list('guardian_id', flat=True).first()
+
+
+@receiver(pre_save, sender=Appointment)
+def reset_reminder_on_reschedule(sender, instance, raw=False, **kwargs):
+    # A moved appointment needs a fresh reminder for its new time
+    if instance.pk and not raw and instance.reminder_sent:
+        previous_date = Appointment.objects.filter(
+            pk=instance.pk
+        ).values_list('appointment_date', flat=True).first()
+        if previous_date is not None and previous_date != instance.appointment_date:
+            instance.reminder_sent = False
+
+
+@receiver(post_save, sender=ElderProfile)
+@receiver(post_delete, sender=ElderProfile)
+def elder_guardian_access_changed(sender, instance, **kwargs):
+    invalidate_access_scope(instance.guardian_id, getattr(instance, '_previous_guardian_id', None))
+
+
+@receiver(post_save, sender=ElderAssignment)
+@receiver(post_delete, sender=ElderAssignment)
+def elder_assignment_access_changed(sender, instance, **kwargs):
+    invalidate_access_scope(instance.user_id)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def user_role_access_changed(sender, instance, **kwargs):
+    invalidate_access_scope(instance.user_id)
+
+
+@receiver(pre_delete, sender=Notification)
+def remember_notification_recipients(sender, instance, **kwargs):
+    # The deliveries are deleted before post_delete runs
+    instance._recipient_ids = list(
+        NotificationDelivery.objects.filter(notification_id=instance.pk).values_list('recipient_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def notification_summary_changed(sender, instance, created=False, raw=False, **kwargs):
+    # A new notification's recipients are invalidated as it is delivered
+    if created or raw:
+        return
+    recipient_ids = getattr(instance, '_recipient_ids', None)
+    if recipient_ids is None:
+        recipient_ids = NotificationDelivery.objects.filter(
+            notification_id=instance.pk
+        ).values_list('recipient_id', flat=True)
+    invalidate_notification_summary(*recipient_ids)
+
+
+@receiver(pre_save, sender=Notification)
+def notification_expiry(sender, instance, raw=False, **kwargs):
+    if not raw:
+        default_expiry(instance)
+
+
+@receiver(post_save, sender=Notification)
+def notification_created(sender, instance, created, raw=False, **kwargs):
+    # create_notifications delivers its own batches
+    if created and not raw:
+        deliver_notifications([instance])
+
+
+# Role and assignment changes need no handler here: they change the user's
+# scope, and with it the snapshot key
+@receiver(post_save, sender=ElderProfile)
+@receiver(post_delete, sender=ElderProfile)
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+@receiver(post_save, sender=CareTask)
+@receiver(post_delete, sender=CareTask)
+@receiver(post_save, sender=IncidentReport)
+@receiver(post_delete, sender=IncidentReport)
+@receiver(post_save, sender=MedicationSchedule)
+@receiver(post_delete, sender=MedicationSchedule)
+@receiver(post_save, sender=MedicationLog)
+@receiver(post_delete, sender=MedicationLog)
+@receiver(post_save, sender=VitalsLog)
+@receiver(post_delete, sender=VitalsLog)
+def dashboard_changed(sender, instance, **kwargs):
+    if sender is ElderProfile:
+        elder_id = instance.pk
+    elif sender is MedicationLog:
+        elder_id = MedicationSchedule.objects.filter(
+            pk=instance.schedule_id
+        ).values_list('elder_id', flat=True).first()
+    else:
+        elder_id = instance.elder_id
+    # A log deleted along with its schedule: the schedule's delete covers it
+    if elder_id is not None:
+        invalidate_dashboards(elder_id)
+
+
+@receiver(post_save, sender=ElderProfile)
+@receiver(post_save, sender=MedicationSchedule)
+@receiver(post_save, sender=CareTask)
+@receiver(post_save, sender=Appointment)
+def search_document_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_instance(instance)
+
+
+@receiver(post_delete, sender=MedicationSchedule)
+@receiver(post_delete, sender=CareTask)
+@receiver(post_delete, sender=Appointment)
+def search_document_deleted(sender, instance, **kwargs):
+    search.unindex_instance(instance)
+
+
+@receiver(post_save, sender=Medication)
+def medication_search_documents_changed(sender, instance, raw=False, **kwargs):
+    # Schedules are indexed under their medication's name and description
+    if raw:
+        return
+    SearchDocument.objects.filter(
+        category='medications',
+        object_id__in=MedicationSchedule.objects.filter(medication=instance).values('pk'),
+    ).update(title=instance.name[:255], body=instance.description)
+
+
+# model -> elder_detail section it is rendered in
+ELDER_SECTION_MODELS = {
+    EmergencyContact: 'contacts',
+    MedicationSchedule: 'medications',
+    Appointment: 'appointments',
+    CareTask: 'tasks',
+    VitalsLog: 'vitals',
+    IncidentReport: 'incidents',
+}
+
+
+@receiver(post_save, sender=EmergencyContact)
+@receiver(post_delete, sender=EmergencyContact)
+@receiver(post_save, sender=MedicationSchedule)
+@receiver(post_delete, sender=MedicationSchedule)
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+@receiver(post_save, sender=CareTask)
+@receiver(post_delete, sender=CareTask)
+@receiver(post_save, sender=VitalsLog)
+@receiver(post_delete, sender=VitalsLog)
+@receiver(post_save, sender=IncidentReport)
+@receiver(post_delete, sender=IncidentReport)
+def elder_section_changed(sender, instance, **kwargs):
+    invalidate_elder_section(ELDER_SECTION_MODELS[sender], instance.elder_id)
+
+
+@receiver(post_save, sender=Medication)
+def medication_elder_sections_changed(sender, instance, raw=False, **kwargs):
+    # Schedules render their medication's name and strength
+    if raw:
+        return
+    elder_ids = MedicationSchedule.objects.filter(medication=instance).values_list('elder_id', flat=True).distinct()
+    invalidate_elder_section('medications', *elder_ids)
+
+
+@receiver(post_save, sender=VitalsLog)
+@receiver(post_delete, sender=VitalsLog)
+def vitals_rollups_changed(sender, instance, raw=False, **kwargs):
+    # Deferred to commit so a cascading elder delete never recreates rollups
+    if raw or instance.recorded_at is None:
+        return
+    elder_id, recorded_at = instance.elder_id, instance.recorded_at
+    transaction.on_commit(lambda: refresh_rollups_for_reading(elder_id, recorded_at))
+
+
+@receiver(post_save, sender=VitalsLog)
+def vitals_anomalies_checked(sender, instance, created, raw=False, **kwargs):
+    # bulk_create skips this; the ingestion endpoint scores its own batches
+    if not created or raw or instance.recorded_at is None:
+        return
+    elder_id, recorded_at = instance.elder_id, instance.recorded_at
+    transaction.on_commit(lambda: check_new_readings([elder_id], recorded_at, recorded_at))
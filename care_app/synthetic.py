@@ -0,0 +1,663 @@
+"""
+Seeded synthetic facility for sizing and benchmarking.
+
+``generate_facility`` writes staff, guardians, elders, their assignments,
+medication schedules and emergency contacts, then fans each elder's history -
+vitals, medication logs, appointments, tasks, incidents and notifications -
+out to worker processes. Every elder's history is drawn from its own
+``Random`` seeded by ``(seed, kind, elder index)``, so a seed and ``as_of``
+time always produce the same facility whatever the worker count or chunk
+size.
+
+Workers only build row tuples. The parent writes them with ``executemany``,
+one transaction per chunk, which skips model ``save()`` and signals: search
+documents, vitals rollups, notification deliveries and cached summaries have
+to be rebuilt afterwards (the ``generate_facility`` command does).
+"""
+import multiprocessing
+import random
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+from time import perf_counter
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .mar import DEFAULT_DOSE_TIMES, dose_times
+from .models import (
+    Appointment, CareTask, ElderAssignment, ElderProfile, EmergencyContact,
+    IncidentReport, Medication, MedicationLog, MedicationSchedule, Notification,
+    UserProfile, VitalsLog,
+)
+from .notifications import retention_policy
+
+GENERATE_CHUNK_SIZE = 20000
+
+# What a worker needs to know about one elder to build its history
+ElderContext = namedtuple('ElderContext', 'index elder_id guardian_id staff_ids diabetic schedules')
+
+FEMALE_NAMES = [
+    'Amina', 'Fatema', 'Rahima', 'Nasrin', 'Shirin', 'Mary', 'Margaret', 'Ruth', 'Helen', 'Dorothy',
+    'Joan', 'Betty', 'Rosa', 'Grace', 'Evelyn', 'Irene', 'Salma', 'Hasina', 'Anjali', 'Mei',
+]
+MALE_NAMES = [
+    'Abdul', 'Karim', 'Rahman', 'Jamal', 'Habib', 'John', 'Robert', 'William', 'James', 'George',
+    'Charles', 'Frank', 'Harold', 'Walter', 'Arthur', 'Ernest', 'Mizanur', 'Anwar', 'Rajesh', 'Wei',
+]
+LAST_NAMES = [
+    'Ahmed', 'Hossain', 'Islam', 'Chowdhury', 'Khan', 'Rahman', 'Uddin', 'Smith', 'Johnson', 'Brown',
+    'Miller', 'Davis', 'Wilson', 'Taylor', 'Clark', 'Lewis', 'Walker', 'Das', 'Sen', 'Chen',
+]
+STREETS = ['Lake Road', 'Station Road', 'Park Street', 'Green Lane', 'Mill Road', 'Hill View', 'Church Street']
+
+# (value, weight) tables
+GENDERS = [('F', 58), ('M', 41), ('O', 1)]
+BLOOD_TYPES = [('O+', 37), ('A+', 36), ('B+', 8), ('O-', 7), ('A-', 6), ('AB+', 3), ('B-', 2), ('AB-', 1)]
+# condition -> share of residents who have it
+CONDITIONS = [
+    ('Hypertension', 0.6), ('Arthritis', 0.5), ('Type 2 diabetes', 0.27), ('Osteoporosis', 0.2),
+    ('Dementia', 0.15), ('Chronic kidney disease', 0.15), ('Depression', 0.15),
+    ('Heart failure', 0.12), ('COPD', 0.1), ("Parkinson's disease", 0.03),
+]
+ALLERGIES = [('', 70), ('Penicillin', 10), ('Sulfa drugs', 5), ('Aspirin', 4), ('Latex', 4), ('Shellfish', 4), ('Peanuts', 3)]
+STAFF_ROLES = [('CAREGIVER', 53), ('NURSE', 35), ('DOCTOR', 10), ('ADMIN', 2)]
+FREQUENCIES = [('DAILY', 50), ('TWICE_DAILY', 25), ('AS_NEEDED', 10), ('THRICE_DAILY', 8), ('WEEKLY', 5), ('CUSTOM', 2)]
+CONTACT_RELATIONS = [('CHILD', 55), ('SPOUSE', 15), ('SIBLING', 12), ('FRIEND', 8), ('NEIGHBOR', 5), ('OTHER', 5)]
+APPOINTMENT_TYPES = [('DOCTOR', 35), ('FOLLOW_UP', 20), ('LAB', 18), ('THERAPY', 15), ('SPECIALIST', 10), ('OTHER', 2)]
+APPOINTMENT_TITLES = {
+    'DOCTOR': 'GP visit', 'FOLLOW_UP': 'Follow-up review', 'LAB': 'Blood work',
+    'THERAPY': 'Physiotherapy session', 'SPECIALIST': 'Specialist consultation', 'OTHER': 'Appointment',
+}
+PAST_APPOINTMENT_STATUSES = [('COMPLETED', 85), ('CANCELLED', 10), ('RESCHEDULED', 5)]
+FUTURE_APPOINTMENT_STATUSES = [('SCHEDULED', 70), ('CONFIRMED', 30)]
+TASK_TITLES = [
+    ('Assist with bathing', 15), ('Change bed linen', 10), ('Physiotherapy exercises', 12), ('Blood pressure check', 12),
+    ('Wound dressing', 6), ('Accompany on walk', 15), ('Refill prescriptions', 8), ('Call family', 8),
+    ('Hearing aid battery', 4), ('Podiatry check', 4), ('Hair appointment', 6),
+]
+TASK_PRIORITIES = [('MEDIUM', 45), ('LOW', 30), ('HIGH', 20), ('URGENT', 5)]
+RECURRING_TASKS = [('Morning walk', 'DAILY'), ('Weekly weigh-in', 'WEEKLY'), ('Monthly care plan review', 'MONTHLY')]
+INCIDENT_TYPES = [
+    ('FALL', 35), ('ILLNESS', 20), ('BEHAVIORAL', 15), ('INJURY', 12),
+    ('MEDICATION_ERROR', 8), ('EQUIPMENT', 5), ('OTHER', 5),
+]
+INCIDENT_SEVERITIES = [('LOW', 40), ('MEDIUM', 35), ('HIGH', 20), ('CRITICAL', 5)]
+INCIDENT_LOCATIONS = ['Bedroom', 'Bathroom', 'Dining room', 'Garden', 'Corridor', 'Lounge']
+NOTIFICATION_TYPES = [('MEDICATION', 30), ('VITALS', 20), ('APPOINTMENT', 20), ('TASK', 15), ('GENERAL', 10), ('INCIDENT', 5)]
+NOTIFICATION_PRIORITIES = [('MEDIUM', 60), ('LOW', 25), ('HIGH', 15)]
+CUSTOM_DOSE_TIMES = [time(7, 0), time(13, 0)]
+SKIP_REASONS = ['Refused', 'Asleep', 'Nausea', 'Out on appointment', 'Held by nurse']
+MEDICATIONS = [
+    ('Amlodipine', 'PILL', '5 mg'), ('Lisinopril', 'PILL', '10 mg'), ('Metformin', 'PILL', '500 mg'),
+    ('Atorvastatin', 'PILL', '20 mg'), ('Levothyroxine', 'PILL', '50 mcg'), ('Omeprazole', 'PILL', '20 mg'),
+    ('Aspirin', 'PILL', '81 mg'), ('Furosemide', 'PILL', '40 mg'), ('Donepezil', 'PILL', '10 mg'),
+    ('Sertraline', 'PILL', '50 mg'), ('Paracetamol', 'PILL', '500 mg'), ('Alendronate', 'PILL', '70 mg'),
+    ('Insulin glargine', 'INJECTION', '100 units/ml'), ('Salbutamol', 'INHALER', '100 mcg'),
+    ('Lactulose', 'LIQUID', '10 ml'), ('Diclofenac gel', 'TOPICAL', '1%'), ('Warfarin', 'PILL', '5 mg'),
+    ('Levodopa', 'PILL', '100 mg'), ('Vitamin D', 'PILL', '1000 IU'), ('Tamsulosin', 'PILL', '0.4 mg'),
+]
+
+
+class Weighted:
+    """A ``(value, weight)`` table sampled with ``Random.choices``."""
+
+    def __init__(self, table):
+        self.values = [value for value, _ in table]
+        self.cum_weights = []
+        total = 0
+        for _, weight in table:
+            total += weight
+            self.cum_weights.append(total)
+
+    def pick(self, rng):
+        return rng.choices(self.values, cum_weights=self.cum_weights)[0]
+
+
+WEIGHTED = {name: Weighted(table) for name, table in [
+    ('gender', GENDERS), ('blood_type', BLOOD_TYPES), ('allergy', ALLERGIES), ('staff_role', STAFF_ROLES),
+    ('frequency', FREQUENCIES), ('relation', CONTACT_RELATIONS), ('appointment_type', APPOINTMENT_TYPES),
+    ('past_appointment', PAST_APPOINTMENT_STATUSES), ('future_appointment', FUTURE_APPOINTMENT_STATUSES),
+    ('task_title', TASK_TITLES), ('task_priority', TASK_PRIORITIES), ('incident_type', INCIDENT_TYPES),
+    ('severity', INCIDENT_SEVERITIES), ('notification_type', NOTIFICATION_TYPES),
+    ('notification_priority', NOTIFICATION_PRIORITIES),
+]}
+
+
+class FacilitySpec:
+    """Size and shape of a generated facility; rates are per elder."""
+
+    def __init__(self, elders=200, staff=40, days=180, future_days=60, vitals_per_day=4.0,
+                 medications_per_elder=4.0, appointments_per_month=1.5, tasks_per_week=3.0,
+                 incidents_per_year=4.0, notifications_per_week=2.0, seed=370, as_of=None,
+                 prefix='sim', password='care-demo'):
+        self.elders = elders
+        self.staff = staff
+        self.days = days
+        self.future_days = future_days
+        self.vitals_per_day = vitals_per_day
+        self.medications_per_elder = medications_per_elder
+        self.appointments_per_month = appointments_per_month
+        self.tasks_per_week = tasks_per_week
+        self.incidents_per_year = incidents_per_year
+        self.notifications_per_week = notifications_per_week
+        self.seed = seed
+        self.as_of = as_of or timezone.now().replace(minute=0, second=0, microsecond=0)
+        self.prefix = prefix
+        self.password = password
+
+    @property
+    def first_day(self):
+        return timezone.localtime(self.as_of).date() - timedelta(days=self.days - 1)
+
+
+class GenerationResult:
+    def __init__(self):
+        self.rows = {}
+        self.duration = 0.0
+
+    def add(self, kind, count):
+        self.rows[kind] = self.rows.get(kind, 0) + count
+
+    @property
+    def total_rows(self):
+        return sum(self.rows.values())
+
+    @property
+    def rows_per_second(self):
+        return self.total_rows / self.duration if self.duration else 0.0
+
+
+def _rng(seed, kind, index):
+    return random.Random(f'{seed}:{kind}:{index}')
+
+
+def _events(rng, rate_per_day, days):
+    """Offsets in days of a Poisson process with ``rate_per_day`` over ``days``."""
+    offsets = []
+    if rate_per_day <= 0:
+        return offsets
+    offset = rng.expovariate(rate_per_day)
+    while offset < days:
+        offsets.append(offset)
+        offset += rng.expovariate(rate_per_day)
+    return offsets
+
+
+def _clamp(value, low, high):
+    return low if value < low else high if value > high else value
+
+
+def _calendar(spec):
+    """``(local date, aware local midnight)`` for every history and future day."""
+    days = [spec.first_day + timedelta(days=offset) for offset in range(spec.days + spec.future_days)]
+    return [(day, timezone.make_aware(datetime.combine(day, time.min))) for day in days]
+
+
+def _prepare(model, field_names, rows):
+    """Adapt the date/time columns of ``rows`` for the database driver."""
+    adapters = {
+        'DateTimeField': connection.ops.adapt_datetimefield_value,
+        'DateField': connection.ops.adapt_datefield_value,
+        'TimeField': connection.ops.adapt_timefield_value,
+    }
+    adapt = []
+    for index, name in enumerate(field_names):
+        internal_type = model._meta.get_field(name).get_internal_type()
+        if internal_type in adapters:
+            adapt.append((index, adapters[internal_type]))
+    if not adapt:
+        return rows
+    prepared = []
+    for row in rows:
+        row = list(row)
+        for index, adapter in adapt:
+            row[index] = adapter(row[index])
+        prepared.append(row)
+    return prepared
+
+
+def _insert(model, field_names, rows, prepared=False):
+    """``executemany`` one INSERT for ``rows`` of plain values in ``field_names`` order."""
+    if not rows:
+        return 0
+    if not prepared:
+        rows = _prepare(model, field_names, rows)
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table),
+        ', '.join(quote(model._meta.get_field(name).column) for name in field_names),
+        ', '.join(['%s'] * len(field_names)),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+    return len(rows)
+
+
+def _insert_returning_ids(model, field_names, rows):
+    """Insert ``rows`` and return their new primary keys in row order."""
+    last_pk = model.objects.aggregate(last=Max('pk'))['last'] or 0
+    with transaction.atomic():
+        _insert(model, field_names, rows)
+    return list(model.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True))
+
+
+def _person_name(rng, gender=None):
+    gender = gender or rng.choice('FM')
+    first = rng.choice(FEMALE_NAMES if gender == 'F' else MALE_NAMES)
+    return first, rng.choice(LAST_NAMES)
+
+
+def _phone(rng):
+    return f'+8801{rng.randrange(300000000, 999999999)}'
+
+
+def _create_people(spec, result):
+    """Users and profiles for staff and guardians; returns ``(staff by role, guardian ids)``."""
+    now = spec.as_of
+    password = make_password(spec.password)
+    guardians = max(1, round(spec.elders * 0.8))
+    users, roles = [], []
+    for index in range(spec.staff):
+        rng = _rng(spec.seed, 'staff', index)
+        role = 'ADMIN' if index == 0 else WEIGHTED['staff_role'].pick(rng)
+        first, last = _person_name(rng)
+        username = f'{spec.prefix}_{role.lower()}_{index + 1:05d}'
+        users.append((password, role == 'ADMIN', username, first, last, f'{username}@example.com',
+                      role == 'ADMIN', True, now))
+        roles.append(role)
+    for index in range(guardians):
+        rng = _rng(spec.seed, 'guardian', index)
+        first, last = _person_name(rng)
+        username = f'{spec.prefix}_guardian_{index + 1:05d}'
+        users.append((password, False, username, first, last, f'{username}@example.com', False, True, now))
+        roles.append('GUARDIAN')
+
+    user_ids = _insert_returning_ids(User, [
+        'password', 'is_superuser', 'username', 'first_name', 'last_name', 'email',
+        'is_staff', 'is_active', 'date_joined',
+    ], users)
+    profiles = []
+    for index, (user_id, role) in enumerate(zip(user_ids, roles)):
+        rng = _rng(spec.seed, 'profile', index)
+        profiles.append((user_id, role, _phone(rng), f'{rng.randint(1, 200)} {rng.choice(STREETS)}', '', '', True, now))
+    with transaction.atomic():
+        _insert(UserProfile, [
+            'user', 'user_type', 'phone', 'address', 'emergency_contact', 'emergency_phone', 'is_active', 'created_at',
+        ], profiles)
+    result.add('users', len(user_ids))
+    result.add('user_profiles', len(profiles))
+
+    staff = {}
+    for user_id, role in zip(user_ids[:spec.staff], roles[:spec.staff]):
+        staff.setdefault(role, []).append(user_id)
+    return staff, user_ids[spec.staff:]
+
+
+def _create_elders(spec, staff, guardian_ids, result):
+    """Elders with assignments, schedules and contacts; returns per-elder worker context."""
+    now = spec.as_of
+    today = timezone.localtime(now).date()
+    elders, traits = [], []
+    for index in range(spec.elders):
+        rng = _rng(spec.seed, 'elder', index)
+        gender = WEIGHTED['gender'].pick(rng)
+        first, last = _person_name(rng, gender if gender != 'O' else None)
+        age = int(rng.triangular(65, 102, 80))
+        birthday = today - timedelta(days=age * 365 + rng.randrange(365))
+        conditions = [name for name, share in CONDITIONS if rng.random() < share]
+        guardian_id = guardian_ids[index] if index < len(guardian_ids) else rng.choice(guardian_ids)
+        elders.append((
+            guardian_id, f'{first} {last}', birthday, gender,
+            f'{rng.randint(1, 200)} {rng.choice(STREETS)}', _phone(rng), '',
+            ', '.join(conditions), WEIGHTED['allergy'].pick(rng), WEIGHTED['blood_type'].pick(rng), '',
+            now, now,
+        ))
+        traits.append(('Type 2 diabetes' in conditions, guardian_id))
+
+    elder_ids = _insert_returning_ids(ElderProfile, [
+        'guardian', 'full_name', 'date_of_birth', 'gender', 'address', 'phone', 'email',
+        'medical_conditions', 'allergies', 'blood_type', 'emergency_notes', 'created_at', 'updated_at',
+    ], elders)
+    result.add('elders', len(elder_ids))
+
+    medication_ids = _insert_returning_ids(Medication, [
+        'name', 'description', 'medication_type', 'strength', 'manufacturer', 'is_active',
+    ], [(name, '', kind, strength, 'Generic', True) for name, kind, strength in MEDICATIONS])
+    result.add('medications', len(medication_ids))
+
+    assignments, schedules, contacts, care_staff = [], [], [], []
+    for index, elder_id in enumerate(elder_ids):
+        rng = _rng(spec.seed, 'care', index)
+        assigned = []
+        for role, count in (('DOCTOR', 1), ('NURSE', 1), ('CAREGIVER', rng.randint(1, 2))):
+            pool = staff.get(role) or staff['ADMIN']
+            for user_id in rng.sample(pool, min(count, len(pool))):
+                assignments.append((elder_id, user_id, role, True, now))
+                assigned.append(user_id)
+        care_staff.append(assigned)
+
+        for _ in range(max(0, round(rng.gauss(spec.medications_per_elder, 1.5)))):
+            frequency = WEIGHTED['frequency'].pick(rng)
+            # Most residents were on their medication before the window opened
+            start = spec.first_day - timedelta(days=rng.randrange(1, 365)) if rng.random() < 0.7 \
+                else spec.first_day + timedelta(days=rng.randrange(spec.days))
+            end = start + timedelta(days=rng.randrange(14, 180)) if rng.random() < 0.15 else None
+            shift = timedelta(minutes=rng.choice([0, 0, 30, 60]))
+            slots = CUSTOM_DOSE_TIMES if frequency == 'CUSTOM' else DEFAULT_DOSE_TIMES.get(frequency, [])
+            times = [(datetime.combine(date.min, slot) + shift).time() for slot in slots]
+            times += [None] * (3 - len(times))
+            schedules.append((
+                elder_id, rng.choice(medication_ids), rng.choice(['1 tablet', '2 tablets', '5 ml', '1 dose']),
+                frequency, start, end, times[0], times[1], times[2], '', end is None or end >= today, now,
+            ))
+
+        for position in range(rng.randint(1, 3)):
+            first, last = _person_name(rng)
+            contacts.append((
+                elder_id, f'{first} {last}', WEIGHTED['relation'].pick(rng), _phone(rng), '', '', '',
+                position == 0, '', now, now,
+            ))
+
+    with transaction.atomic():
+        _insert(ElderAssignment, ['elder', 'user', 'role', 'is_active', 'created_at'], assignments)
+        _insert(EmergencyContact, [
+            'elder', 'name', 'relation', 'phone', 'phone_2', 'email', 'address', 'is_primary', 'notes',
+            'created_at', 'updated_at',
+        ], contacts)
+    schedule_ids = _insert_returning_ids(MedicationSchedule, [
+        'elder', 'medication', 'dosage', 'frequency', 'start_date', 'end_date',
+        'time_1', 'time_2', 'time_3', 'instructions', 'is_active', 'created_at',
+    ], schedules)
+    result.add('elder_assignments', len(assignments))
+    result.add('emergency_contacts', len(contacts))
+    result.add('medication_schedules', len(schedule_ids))
+
+    # What the workers need about each elder, schedules reduced to plain values
+    schedules_by_elder = {}
+    for schedule_id, row in zip(schedule_ids, schedules):
+        schedule = MedicationSchedule(frequency=row[3], time_1=row[6], time_2=row[7], time_3=row[8])
+        minutes = [slot.hour * 60 + slot.minute for slot in dose_times(schedule)]
+        schedules_by_elder.setdefault(row[0], []).append((schedule_id, row[3], minutes, row[4], row[5]))
+    return [
+        ElderContext(index, elder_id, guardian_id, care_staff[index], diabetic, schedules_by_elder.get(elder_id, []))
+        for index, (elder_id, (diabetic, guardian_id)) in enumerate(zip(elder_ids, traits))
+    ]
+
+
+def _vitals_rows(spec, calendar, elder, rng):
+    elder_id, staff_ids = elder.elder_id, elder.staff_ids
+    systolic = rng.gauss(132, 14)
+    diastolic = rng.gauss(78, 8)
+    heart_rate = rng.gauss(74, 9)
+    temperature = rng.gauss(97.9, 0.4)
+    weight = rng.gauss(155, 30)
+    oxygen = rng.gauss(95.5, 1.5)
+    sugar = rng.gauss(165 if elder.diabetic else 105, 20)
+    sugar_share = 0.9 if elder.diabetic else 0.15
+    whole, fraction = int(spec.vitals_per_day), spec.vitals_per_day % 1
+
+    rows = []
+    for day, midnight in calendar[:spec.days]:
+        count = whole + (rng.random() < fraction)
+        for slot in range(count):
+            # Spread the day's readings over waking hours, 06:00 - 22:00
+            recorded_at = midnight + timedelta(minutes=360 + 960 * (slot + rng.random()) / count)
+            if recorded_at > spec.as_of:
+                break
+            spike = 35 if rng.random() < 0.005 else 0
+            rows.append((
+                elder_id, recorded_at,
+                _clamp(round(rng.gauss(systolic + spike, 8)), 70, 260),
+                _clamp(round(rng.gauss(diastolic + spike / 3, 6)), 40, 160),
+                _clamp(round(rng.gauss(heart_rate + spike, 6)), 35, 190),
+                round(_clamp(rng.gauss(temperature, 0.3), 95.0, 105.0), 1) if rng.random() < 0.6 else None,
+                round(_clamp(weight + rng.gauss(0, 0.8), 60, 400), 2) if rng.random() < 0.15 else None,
+                _clamp(round(rng.gauss(oxygen, 1.2)), 75, 100),
+                _clamp(round(rng.gauss(sugar, 20)), 40, 500) if rng.random() < sugar_share else None,
+                '', rng.choice(staff_ids),
+            ))
+    return rows
+
+
+def _medication_log_rows(spec, calendar, elder, rng):
+    elder_id, staff_ids = elder.elder_id, elder.staff_ids
+    adherence = rng.betavariate(18, 1.5)
+    rows = []
+    for schedule_id, frequency, minutes, start, end in elder.schedules:
+        if frequency == 'AS_NEEDED':
+            for offset in _events(rng, 0.3, spec.days):
+                taken_at = calendar[int(offset)][1] + timedelta(minutes=480 + 840 * (offset % 1))
+                if taken_at <= spec.as_of:
+                    rows.append((schedule_id, taken_at, rng.choice(staff_ids), '', False, ''))
+            continue
+        for day, midnight in calendar[:spec.days]:
+            if day < start or (end and day > end):
+                continue
+            if frequency == 'WEEKLY' and day.weekday() != start.weekday():
+                continue
+            for minute in minutes:
+                due = midnight + timedelta(minutes=minute)
+                if due > spec.as_of:
+                    break
+                draw = rng.random()
+                if draw < adherence:
+                    taken_at = due + timedelta(minutes=rng.gauss(0, 20))
+                    rows.append((schedule_id, taken_at, rng.choice(staff_ids), '', False, ''))
+                elif draw < adherence + 0.03:
+                    rows.append((schedule_id, due, rng.choice(staff_ids), '', True, rng.choice(SKIP_REASONS)))
+    return rows
+
+
+def _appointment_rows(spec, calendar, elder, rng):
+    elder_id, staff_ids = elder.elder_id, elder.staff_ids
+    rows = []
+    for offset in _events(rng, spec.appointments_per_month / 30, len(calendar)):
+        day, midnight = calendar[int(offset)]
+        # Clinics see people on weekdays, 09:00 - 16:30
+        shift = max(0, 7 - day.weekday()) if day.weekday() >= 5 else 0
+        if int(offset) + shift >= len(calendar):
+            continue
+        day, midnight = calendar[int(offset) + shift]
+        when = midnight + timedelta(minutes=540 + 30 * rng.randrange(16))
+        kind = WEIGHTED['appointment_type'].pick(rng)
+        past = when < spec.as_of
+        status = WEIGHTED['past_appointment' if past else 'future_appointment'].pick(rng)
+        first, last = _person_name(rng)
+        rows.append((
+            elder_id, APPOINTMENT_TITLES[kind], kind, when, rng.choice([15, 30, 30, 45, 60]),
+            f'{rng.choice(STREETS)} Clinic', f'Dr. {first} {last}', _phone(rng), '', status, past,
+            when - timedelta(days=rng.randint(1, 30)),
+        ))
+    return rows
+
+
+def _task_rows(spec, calendar, elder, rng):
+    elder_id, staff_ids = elder.elder_id, elder.staff_ids
+    rows = []
+    for offset in _events(rng, spec.tasks_per_week / 7, len(calendar)):
+        day, midnight = calendar[int(offset)]
+        due = midnight + timedelta(minutes=420 + 900 * (offset % 1))
+        priority = WEIGHTED['task_priority'].pick(rng)
+        assigned_to = rng.choice(staff_ids)
+        completed_at = completed_by = None
+        if due < spec.as_of:
+            draw = rng.random()
+            if draw < 0.85:
+                status, completed_at, completed_by = 'COMPLETED', due + timedelta(minutes=rng.randint(-60, 240)), assigned_to
+            elif draw < 0.9:
+                status = 'CANCELLED'
+            else:
+                status = 'OVERDUE'
+        else:
+            status = 'IN_PROGRESS' if rng.random() < 0.1 else 'PENDING'
+        rows.append((
+            elder_id, WEIGHTED['task_title'].pick(rng), 'Generated care task.', 'ONE_TIME', '', assigned_to,
+            status, priority, CareTask.PRIORITY_RANKS[priority], due, completed_at, completed_by, '',
+            due - timedelta(days=rng.randint(0, 14)), False,
+        ))
+    # About a third of residents also have a recurring routine
+    if rng.random() < 0.3:
+        title, task_type = rng.choice(RECURRING_TASKS)
+        rows.append((
+            elder_id, title, 'Generated recurring routine.', task_type, task_type.lower(), rng.choice(staff_ids),
+            'PENDING', 'MEDIUM', CareTask.PRIORITY_RANKS['MEDIUM'],
+            calendar[0][1] + timedelta(hours=9), None, None, '', calendar[0][1], True,
+        ))
+    return rows
+
+
+def _incident_rows(spec, calendar, elder, rng):
+    elder_id, staff_ids = elder.elder_id, elder.staff_ids
+    rows = []
+    for offset in _events(rng, spec.incidents_per_year / 365, spec.days):
+        happened = calendar[int(offset)][1] + timedelta(minutes=1440 * (offset % 1))
+        if happened > spec.as_of:
+            continue
+        reporter = rng.choice(staff_ids)
+        severity = WEIGHTED['severity'].pick(rng)
+        resolved = happened < spec.as_of - timedelta(days=7) and rng.random() < 0.95
+        rows.append((
+            elder_id, WEIGHTED['incident_type'].pick(rng), happened + timedelta(minutes=rng.randint(5, 120)),
+            happened, 'Generated incident report.', severity, rng.choice(INCIDENT_LOCATIONS), '', 'Resident checked.',
+            severity in ('HIGH', 'CRITICAL'), '', reporter, resolved,
+            happened + timedelta(days=rng.randint(1, 7)) if resolved else None, reporter if resolved else None,
+        ))
+    return rows
+
+
+def _notification_rows(spec, calendar, elder, rng):
+    elder_id = elder.elder_id
+    # The expiry create_notifications would give them, as the rows skip it
+    expire_after = {
+        kind: retention_policy(kind)['expire_after_days'] for kind, _ in Notification.NOTIFICATION_TYPE_CHOICES
+    }
+    rows = []
+    for offset in _events(rng, spec.notifications_per_week / 7, spec.days):
+        created_at = calendar[int(offset)][1] + timedelta(minutes=1440 * (offset % 1))
+        if created_at > spec.as_of:
+            continue
+        kind = WEIGHTED['notification_type'].pick(rng)
+        days = expire_after[kind]
+        rows.append((
+            elder_id, kind, f'{kind.title()} update for resident #{elder.index + 1}.', created_at,
+            WEIGHTED['notification_priority'].pick(rng), '',
+            created_at + timedelta(days=days) if days is not None else None,
+        ))
+    return rows
+
+
+# kind -> (model, fields, row builder, rough rows per elder for chunking)
+HISTORY = {
+    'vitals': (VitalsLog, [
+        'elder', 'recorded_at', 'blood_pressure_systolic', 'blood_pressure_diastolic', 'heart_rate',
+        'temperature', 'weight', 'oxygen_saturation', 'blood_sugar', 'notes', 'logged_by',
+    ], _vitals_rows, lambda spec: spec.vitals_per_day * spec.days),
+    'medication_logs': (MedicationLog, [
+        'schedule', 'taken_at', 'taken_by', 'notes', 'was_skipped', 'skip_reason',
+    ], _medication_log_rows, lambda spec: spec.medications_per_elder * 1.5 * spec.days),
+    'appointments': (Appointment, [
+        'elder', 'title', 'appointment_type', 'appointment_date', 'duration', 'location', 'doctor_name',
+        'phone', 'notes', 'status', 'reminder_sent', 'created_at',
+    ], _appointment_rows, lambda spec: spec.appointments_per_month * (spec.days + spec.future_days) / 30),
+    'care_tasks': (CareTask, [
+        'elder', 'title', 'description', 'task_type', 'frequency', 'assigned_to', 'status', 'priority',
+        'priority_rank', 'due_date', 'completed_at', 'completed_by', 'notes', 'created_at', 'is_recurring',
+    ], _task_rows, lambda spec: spec.tasks_per_week * (spec.days + spec.future_days) / 7),
+    'incidents': (IncidentReport, [
+        'elder', 'incident_type', 'report_date', 'incident_date', 'description', 'severity', 'location',
+        'witnesses', 'actions_taken', 'follow_up_required', 'follow_up_notes', 'reported_by', 'is_resolved',
+        'resolved_date', 'resolved_by',
+    ], _incident_rows, lambda spec: spec.incidents_per_year * spec.days / 365),
+    'notifications': (Notification, [
+        'elder', 'notification_type', 'message', 'created_at', 'priority', 'dedup_key', 'expires_at',
+    ], _notification_rows, lambda spec: spec.notifications_per_week * spec.days / 7),
+}
+
+
+def _build_rows(task):
+    """Worker entry point: every row of one kind for a slice of elders, ready to insert."""
+    kind, spec, calendar, elders = task
+    model, fields, builder, _ = HISTORY[kind]
+    rows = []
+    for elder in elders:
+        rows.extend(builder(spec, calendar, elder, _rng(spec.seed, kind, elder.index)))
+    # Adapting values here keeps that work off the single writing process
+    return _prepare(model, fields, rows)
+
+
+def _init_worker():
+    # Spawned (rather than forked) workers start without Django set up
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+# SQLite pragmas for the load: no fsync per commit, and a 256 MB page cache
+# so index pages stay in memory
+SQLITE_BULK_PRAGMAS = {'synchronous': 0, 'cache_size': -262144}
+
+
+def _sqlite_pragmas(values):
+    """Set SQLite pragmas on this connection; returns their previous values."""
+    previous = {}
+    with connection.cursor() as cursor:
+        for name, value in values.items():
+            cursor.execute(f'PRAGMA {name}')
+            previous[name] = cursor.fetchone()[0]
+            cursor.execute(f'PRAGMA {name} = {int(value)}')
+    return previous
+
+
+def generate_facility(spec, workers=None, chunk_size=GENERATE_CHUNK_SIZE, kinds=None, progress=None):
+    """
+    Write the facility described by ``spec``; returns a ``GenerationResult``.
+
+    ``workers`` processes build the history rows (``0`` builds them in this
+    process). ``progress(kind, rows)`` is called after every chunk written.
+    """
+    workers = multiprocessing.cpu_count() if workers is None else workers
+    result = GenerationResult()
+    started = perf_counter()
+
+    # Durability is not worth paying for on a throwaway bulk load
+    previous_pragmas = None
+    if connection.vendor == 'sqlite' and not connection.in_atomic_block:
+        previous_pragmas = _sqlite_pragmas(SQLITE_BULK_PRAGMAS)
+
+    pool = multiprocessing.Pool(workers, initializer=_init_worker) if workers > 1 else None
+    try:
+        staff, guardian_ids = _create_people(spec, result)
+        elders = _create_elders(spec, staff, guardian_ids, result)
+        calendar = _calendar(spec)
+
+        for kind in kinds or HISTORY:
+            model, fields, _, rows_per_elder = HISTORY[kind]
+            per_task = max(1, int(chunk_size // max(rows_per_elder(spec), 1)))
+            tasks = [(kind, spec, calendar, elders[offset:offset + per_task])
+                     for offset in range(0, len(elders), per_task)]
+            # Hand out a few tasks per worker at a time so rows never pile up
+            # in memory faster than they are written
+            window = max(workers, 1) * 2
+            for first in range(0, len(tasks), window):
+                batches = pool.imap(_build_rows, tasks[first:first + window]) if pool \
+                    else map(_build_rows, tasks[first:first + window])
+                for rows in batches:
+                    with transaction.atomic():
+                        _insert(model, fields, rows, prepared=True)
+                    result.add(kind, len(rows))
+                    if progress:
+                        progress(kind, result.rows[kind])
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+        if previous_pragmas is not None:
+            _sqlite_pragmas(previous_pragmas)
+
+    result.duration = perf_counter() - started
+    return result
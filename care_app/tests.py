@@ -0,0 +1,947 @@
+import json
+import tempfile
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.http import StreamingHttpResponse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .access import get_access_scope
+from .anomalies import DEDUP_WINDOW, backtest, load_readings, rolling_baseline
+from .caching import get_cache, get_version
+from .care_tasks import generate_recurring_tasks, occurrence_dates, sweep_overdue_tasks
+from .dashboard import _snapshot_key, get_dashboard_snapshot
+from .fragments import elder_section_versions
+from .ingestion import ingest_vitals
+from .management.base import LoopCommand
+from .mar import DoseSlot, dose_slots, todays_dose_slots
+from .middleware import SESSION_REFRESHED_KEY
+from .models import (
+    Appointment, CareTask, ElderAssignment, ElderProfile, Medication, MedicationLog, MedicationSchedule,
+    Notification, NotificationDelivery, SearchDocument, UserProfile, VitalsLog, VitalsRollup,
+)
+from .notifications import SUMMARY_VERSION, _summary_key, create_notifications, get_notification_summary
+from .reminders import send_appointment_reminders
+from .retention import purge_notifications
+from .search import IContainsSearchBackend, SQLiteFTSSearchBackend, get_search_backend, rebuild_index
+from .synthetic import FacilitySpec, generate_facility
+from .vitals_rollups import VITALS_METRICS, day_bounds, refresh_rollups, vitals_trend
+
+
+class FacilityTestCase(TestCase):
+    """An administrator signed in, and a helper to add fully populated elders."""
+
+    def setUp(self):
+        get_cache().clear()
+        self.admin = User.objects.create_user('admin', password='secret')
+        UserProfile.objects.create(user=self.admin, user_type='ADMIN')
+        self.guardian = User.objects.create_user('guardian', password='secret')
+        UserProfile.objects.create(user=self.guardian, user_type='GUARDIAN')
+        self.medication = Medication.objects.create(name='Metformin')
+        self.client.force_login(self.admin)
+
+    def add_user(self, username, user_type, assigned_to=()):
+        user = User.objects.create_user(username, password='secret')
+        UserProfile.objects.create(user=user, user_type=user_type)
+        for elder in assigned_to:
+            ElderAssignment.objects.create(elder=elder, user=user, role=user_type)
+        return user
+
+    def add_elders(self, count):
+        now = timezone.now()
+        elders = []
+        for index in range(count):
+            elder = ElderProfile.objects.create(
+                guardian=self.guardian, full_name=f'Resident {ElderProfile.objects.count() + 1}',
+                date_of_birth=date(1940, 1, 1), gender='F',
+            )
+            # Every other elder is due for vitals
+            VitalsLog.objects.create(
+                elder=elder, recorded_at=now - timedelta(days=10 if index % 2 else 1), heart_rate=72,
+            )
+            MedicationSchedule.objects.create(
+                elder=elder, medication=self.medication, dosage='500mg', start_date=date.today(),
+            )
+            CareTask.objects.create(elder=elder, title='Walk', description='Short walk', due_date=now + timedelta(hours=2))
+            Appointment.objects.create(elder=elder, title='Checkup', appointment_date=now + timedelta(days=3))
+            elders.append(elder)
+        return elders
+
+    def count_cold_queries(self, url):
+        # The first request after signing in also saves the session
+        self.client.get(url)
+        get_cache().clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+
+class ConstantQueryCountTests(FacilityTestCase):
+    """The list views must not issue queries per elder."""
+
+    def assertConstantQueries(self, url):
+        self.add_elders(3)
+        expected = self.count_cold_queries(url)
+        self.add_elders(12)
+        self.assertEqual(self.count_cold_queries(url), expected)
+
+    def test_vitals_due_is_one_query(self):
+        self.add_elders(6)
+        with self.assertNumQueries(1):
+            due = list(ElderProfile.objects.vitals_due(days=7))
+        self.assertEqual(len(due), 3)
+
+    def test_dashboard(self):
+        self.assertConstantQueries(reverse('dashboard'))
+
+    def test_elder_list(self):
+        self.assertConstantQueries(reverse('elder_list'))
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(FacilityTestCase):
+    """Every budgeted view stays within ``QUERY_BUDGETS`` on a cold cache."""
+
+    def test_views_within_budget(self):
+        self.add_elders(5)
+        elder = ElderProfile.objects.first()
+        for view_name in settings.QUERY_BUDGETS:
+            with self.subTest(view=view_name):
+                if view_name in ('elder_detail', 'emergency_contacts', 'vitals_trend'):
+                    url = reverse(view_name, args=[elder.pk])
+                else:
+                    url = reverse(view_name)
+                self.count_cold_queries(url)
+
+
+class VitalsIngestTests(FacilityTestCase):
+    def setUp(self):
+        super().setUp()
+        self.elder, self.other_elder = self.add_elders(2)
+
+    def ingest(self, readings):
+        response = self.client.post(reverse('vitals_ingest'), json.dumps(readings), content_type='application/json')
+        return response.status_code, response.json()
+
+    def row_errors(self, body):
+        return {error['row']: error['errors'] for error in body['errors']}
+
+    def test_partially_invalid_batch(self):
+        status, body = self.ingest([
+            {'elder': self.elder.pk, 'heart_rate': 80, 'temperature': '98.6'},
+            {'elder': self.elder.pk, 'heart_rate': 500},
+            {'elder': True, 'heart_rate': 80},
+            {'elder': 1.5, 'heart_rate': 80},
+            {'elder': self.elder.pk, 'temperature': 'NaN'},
+            {'elder': self.elder.pk},
+        ])
+        self.assertEqual(status, 201)
+        self.assertEqual((body['received'], body['created'], body['failed']), (6, 1, 5))
+        errors = self.row_errors(body)
+        self.assertEqual(set(errors), {2, 3, 4, 5, 6})
+        self.assertIn('heart_rate', errors[2])
+        self.assertIn('elder', errors[3])
+        self.assertIn('elder', errors[4])
+        self.assertIn('temperature', errors[5])
+        self.assertEqual(VitalsLog.objects.filter(elder=self.elder, heart_rate=80).count(), 1)
+
+    def test_impossible_date_is_a_row_error(self):
+        status, body = self.ingest([
+            {'elder': self.elder.pk, 'heart_rate': 80, 'recorded_at': '2024-13-01T00:00:00'},
+            {'elder': self.elder.pk, 'heart_rate': 81, 'recorded_at': '2024-02-01T08:00:00'},
+        ])
+        self.assertEqual(status, 201)
+        self.assertEqual(self.row_errors(body), {1: {'recorded_at': 'Enter a valid ISO 8601 date/time.'}})
+
+    def test_future_reading_is_rejected(self):
+        future = (timezone.now() + timedelta(hours=1)).isoformat()
+        status, body = self.ingest([{'elder': self.elder.pk, 'heart_rate': 80, 'recorded_at': future}])
+        self.assertEqual(status, 400)
+        self.assertEqual(self.row_errors(body), {1: {'recorded_at': 'Reading is in the future.'}})
+
+    def test_out_of_scope_elder(self):
+        self.client.force_login(self.add_user('nurse', 'NURSE', assigned_to=[self.elder]))
+        status, body = self.ingest([
+            {'elder': self.elder.pk, 'heart_rate': 80},
+            {'elder': self.other_elder.pk, 'heart_rate': 80},
+            {'elder': 999999, 'heart_rate': 80},
+        ])
+        self.assertEqual(status, 201)
+        self.assertEqual(self.row_errors(body), {
+            2: {'elder': "You don't have access to this elder."},
+            3: {'elder': 'Elder not found.'},
+        })
+        self.assertFalse(VitalsLog.objects.filter(elder=self.other_elder, logged_by__username='nurse').exists())
+
+    def test_unreadable_body_after_first_chunk(self):
+        def rows():
+            yield {'elder': self.elder.pk, 'heart_rate': 80}
+            yield {'elder': self.elder.pk, 'heart_rate': 82}
+            raise UnicodeDecodeError('utf-8', b'\xff', 0, 1, 'invalid start byte')
+
+        VitalsRollup.objects.all().delete()
+        result = ingest_vitals(rows(), self.admin, chunk_size=1)
+        self.assertEqual((result.received, result.created, result.failed), (3, 2, 1))
+        self.assertEqual(result.errors[0]['row'], 3)
+        # The post-ingest refresh still ran for the committed readings
+        self.assertTrue(VitalsRollup.objects.filter(elder=self.elder).exists())
+
+    def test_unreadable_body_before_any_write(self):
+        def rows():
+            raise UnicodeDecodeError('utf-8', b'\xff', 0, 1, 'invalid start byte')
+            yield
+
+        with self.assertRaises(ValueError):
+            ingest_vitals(rows(), self.admin)
+
+
+class ExportTests(FacilityTestCase):
+    def test_export_streams_every_row_across_chunks(self):
+        elder, = self.add_elders(1)
+        moment = timezone.now() - timedelta(days=2)
+        # Ties on recorded_at straddle the chunk boundaries
+        VitalsLog.objects.bulk_create([
+            VitalsLog(elder=elder, recorded_at=moment + timedelta(minutes=index // 4), heart_rate=60 + index)
+            for index in range(10)
+        ])
+        expected = list(VitalsLog.objects.order_by('recorded_at', 'pk').values_list('pk', flat=True))
+
+        with mock.patch('care_app.exports.EXPORT_CHUNK_SIZE', 3):
+            response = self.client.get(reverse('export', args=['vitals', 'ndjson']))
+            self.assertIsInstance(response, StreamingHttpResponse)
+            with self.assertNumQueries(len(expected) // 3 + 1):
+                lines = b''.join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual([json.loads(line)['id'] for line in lines], expected)
+
+    def test_impossible_date_is_rejected(self):
+        response = self.client.get(reverse('export', args=['vitals', 'csv']), {'since': '2024-02-30'})
+        self.assertEqual(response.status_code, 400)
+
+
+class DashboardCacheTests(FacilityTestCase):
+    def setUp(self):
+        super().setUp()
+        self.elder, self.other_elder = self.add_elders(2)
+        self.other_guardian = self.add_user('other-guardian', 'GUARDIAN')
+        self.other_elder.guardian = self.other_guardian
+        self.other_elder.save()
+        self.nurse = self.add_user('nurse', 'NURSE')
+
+    def snapshot_key(self, user):
+        # A fresh user object, so the access scope is not memoized
+        return _snapshot_key(get_access_scope(User.objects.get(pk=user.pk)))
+
+    def test_write_evicts_only_snapshots_showing_the_elder(self):
+        users = [self.admin, self.guardian, self.other_guardian]
+        for user in users:
+            get_dashboard_snapshot(User.objects.get(pk=user.pk))
+        before = {user: self.snapshot_key(user) for user in users}
+
+        VitalsLog.objects.create(elder=self.elder, heart_rate=70)
+
+        self.assertNotEqual(self.snapshot_key(self.admin), before[self.admin])
+        self.assertNotEqual(self.snapshot_key(self.guardian), before[self.guardian])
+        self.assertEqual(self.snapshot_key(self.other_guardian), before[self.other_guardian])
+        self.assertIsNotNone(get_cache().get(before[self.other_guardian]))
+
+    def test_staff_share_the_facility_snapshot(self):
+        self.assertEqual(self.snapshot_key(self.nurse), self.snapshot_key(self.admin))
+        self.assertNotEqual(self.snapshot_key(self.guardian), self.snapshot_key(self.admin))
+
+    def test_vitals_due_caches_ids_and_counts(self):
+        snapshot = get_dashboard_snapshot(User.objects.get(pk=self.admin.pk))
+        self.assertEqual(snapshot['vitals_due'], [{'id': self.other_elder.pk, 'full_name': self.other_elder.full_name}])
+        self.assertEqual(snapshot['vitals_due_count'], 1)
+
+
+class NotificationTests(FacilityTestCase):
+    def setUp(self):
+        super().setUp()
+        self.elder, self.other_elder = self.add_elders(2)
+        self.other_guardian = self.add_user('other-guardian', 'GUARDIAN')
+        self.other_elder.guardian = self.other_guardian
+        self.other_elder.save()
+
+    def summary_cached(self, user):
+        return get_cache().get(_summary_key(user.pk), version=get_version(SUMMARY_VERSION)) is not None
+
+    def test_new_notification_evicts_only_its_recipients(self):
+        users = [self.admin, self.guardian, self.other_guardian]
+        for user in users:
+            get_notification_summary(user)
+        Notification.objects.create(elder=self.elder, notification_type='VITALS', message='Low SpO2')
+
+        self.assertEqual([self.summary_cached(user) for user in users], [False, False, True])
+        self.assertEqual(get_notification_summary(self.guardian)['unread_count'], 1)
+        self.assertEqual(get_notification_summary(self.other_guardian)['unread_count'], 0)
+
+    def test_create_notifications_without_returned_ids(self):
+        features = type(connection.features)
+        with mock.patch.object(features, 'can_return_rows_from_bulk_insert', new_callable=mock.PropertyMock) as returns:
+            returns.return_value = False
+            notifications = create_notifications(
+                Notification(elder=self.elder, notification_type='TASK', message='Same text') for _ in range(3)
+            )
+        self.assertTrue(all(notification.pk for notification in notifications))
+        # The admin and the elder's guardian, for each notification
+        self.assertEqual(NotificationDelivery.objects.filter(notification__in=notifications).count(), 6)
+
+    def test_recipients_are_fixed_until_redelivered(self):
+        Notification.objects.create(elder=self.elder, notification_type='VITALS', message='Low SpO2')
+        new_admin = self.add_user('new-admin', 'ADMIN')
+        self.admin.is_active = False
+        self.admin.save()
+        self.assertEqual(get_notification_summary(new_admin)['unread_count'], 0)
+
+        call_command('backfill_notification_deliveries', stdout=StringIO())
+
+        self.assertEqual(get_notification_summary(new_admin)['unread_count'], 1)
+        # The deactivated admin keeps the delivery they had
+        self.assertTrue(NotificationDelivery.objects.filter(recipient=self.admin).exists())
+
+    def test_deleted_notification_evicts_its_recipients(self):
+        notification = Notification.objects.create(elder=self.elder, notification_type='VITALS', message='Low SpO2')
+        self.assertEqual(get_notification_summary(self.guardian)['unread_count'], 1)
+        notification.delete()
+        self.assertEqual(get_notification_summary(self.guardian)['unread_count'], 0)
+
+
+class AccessTests(FacilityTestCase):
+    def setUp(self):
+        super().setUp()
+        self.elder, self.other_elder = self.add_elders(2)
+        self.other_guardian = self.add_user('other-guardian', 'GUARDIAN')
+        self.other_elder.guardian = self.other_guardian
+        self.other_elder.save()
+        self.nurse = self.add_user('nurse', 'NURSE', assigned_to=[self.elder])
+
+    def scope(self, user):
+        # A fresh user object, so the access scope is not memoized
+        return get_access_scope(User.objects.get(pk=user.pk))
+
+    def test_guardian_gets_404_for_someone_elses_elder(self):
+        self.client.force_login(self.other_guardian)
+        for name in ['elder_detail', 'elder_edit', 'vitals_trend']:
+            with self.subTest(view=name):
+                self.assertEqual(self.client.get(reverse(name, args=[self.elder.pk])).status_code, 404)
+                self.assertEqual(self.client.get(reverse(name, args=[self.other_elder.pk])).status_code, 200)
+
+    def test_unknown_elder_is_404(self):
+        self.assertEqual(self.client.get(reverse('vitals_trend', args=[999999])).status_code, 404)
+
+    def test_deactivated_assignment_revokes_access_at_once(self):
+        self.client.force_login(self.nurse)
+        url = reverse('vitals_trend', args=[self.elder.pk])
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        assignment = ElderAssignment.objects.get(user=self.nurse, elder=self.elder)
+        assignment.is_active = False
+        assignment.save()
+
+        self.assertFalse(self.scope(self.nurse).can_access(self.elder.pk))
+        self.assertRedirects(self.client.get(url), reverse('elder_list'), fetch_redirect_response=False)
+
+    def test_can_edit_versus_can_access(self):
+        nurse, guardian, admin = self.scope(self.nurse), self.scope(self.guardian), self.scope(self.admin)
+        self.assertEqual((nurse.can_access(self.elder.pk), nurse.can_edit(self.elder.pk)), (True, False))
+        self.assertEqual((nurse.can_access(self.other_elder.pk), nurse.can_edit(self.other_elder.pk)), (False, False))
+        self.assertEqual((guardian.can_access(self.elder.pk), guardian.can_edit(self.elder.pk)), (True, True))
+        self.assertEqual((guardian.can_access(self.other_elder.pk), guardian.can_edit(self.other_elder.pk)), (False, False))
+        self.assertEqual((admin.can_access(self.other_elder.pk), admin.can_edit(self.other_elder.pk)), (True, True))
+
+        # Staff may see an assigned elder's trend but not edit the profile
+        self.client.force_login(self.nurse)
+        self.assertEqual(self.client.get(reverse('vitals_trend', args=[self.elder.pk])).status_code, 200)
+        response = self.client.get(reverse('elder_edit', args=[self.elder.pk]))
+        self.assertRedirects(response, reverse('elder_detail', args=[self.elder.pk]), fetch_redirect_response=False)
+        self.client.force_login(self.guardian)
+        self.assertEqual(self.client.get(reverse('elder_edit', args=[self.elder.pk])).status_code, 200)
+
+
+class NotificationSummaryTests(FacilityTestCase):
+    def setUp(self):
+        super().setUp()
+        self.elder, = self.add_elders(1)
+        self.notifications = [
+            Notification.objects.create(elder=self.elder, notification_type='TASK', message=f'Task {index}')
+            for index in range(3)
+        ]
+
+    def test_warm_summary_runs_no_queries(self):
+        summary = get_notification_summary(self.admin)
+        self.assertEqual(summary['unread_count'], 3)
+        self.assertEqual([item['id'] for item in summary['preview']], [n.pk for n in reversed(self.notifications)])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_notification_summary(self.admin), summary)
+
+    def test_badge_follows_read_state(self):
+        response = self.client.get(reverse('notification_list'))
+        self.assertEqual(response.context['notification_summary']['unread_count'], 3)
+
+        self.client.get(reverse('notification_mark_read', args=[self.notifications[0].pk]))
+        self.assertEqual(get_notification_summary(self.admin)['unread_count'], 2)
+        # Read state is per recipient
+        self.assertEqual(get_notification_summary(self.guardian)['unread_count'], 3)
+
+        self.client.post(reverse('notification_mark_all_read'))
+        self.assertEqual(get_notification_summary(self.admin)['unread_count'], 0)
+        self.assertEqual(get_notification_summary(self.guardian)['unread_count'], 3)
+
+
+class SearchTests(FacilityTestCase):
+    def setUp(self):
+        super().setUp()
+        self.elder, self.other_elder = self.add_elders(2)
+        self.elder.full_name = 'Margaret Holloway'
+        self.elder.medical_conditions = 'Type 2 diabetes'
+        self.elder.save()
+        self.other_guardian = self.add_user('other-guardian', 'GUARDIAN')
+        self.other_elder.guardian = self.other_guardian
+        self.other_elder.save()
+
+    def search(self, query, category='all'):
+        response = self.client.get(reverse('search'), {'query': query, 'category': category})
+        self.assertEqual(response.status_code, 200)
+        return response.context['results']
+
+    def test_prefix_search_across_categories(self):
+        self.assertIsInstance(get_search_backend(), SQLiteFTSSearchBackend)
+        self.assertEqual(self.search('holl')['elders'], [self.elder])
+        self.assertEqual(self.search('diab', 'elders')['elders'], [self.elder])
+        self.assertEqual(len(self.search('metformin')['medications']), 2)
+        self.assertEqual(len(self.search('short walk')['tasks']), 2)
+
+    def test_index_follows_saves_and_deletes(self):
+        self.elder.full_name = 'Margaret Ashdown'
+        self.elder.save()
+        self.assertNotIn('elders', self.search('holloway'))
+        self.assertEqual(self.search('ashdown')['elders'], [self.elder])
+
+        self.medication.name = 'Glucophage'
+        self.medication.save()
+        self.assertEqual(len(self.search('glucophage')['medications']), 2)
+
+        CareTask.objects.filter(elder=self.elder).get().delete()
+        self.assertEqual([task.elder for task in self.search('walk')['tasks']], [self.other_elder])
+
+    def test_guardian_only_finds_their_elders(self):
+        self.client.force_login(self.other_guardian)
+        self.assertNotIn('elders', self.search('holloway'))
+        self.assertEqual([task.elder for task in self.search('walk')['tasks']], [self.other_elder])
+
+    def test_backends_agree_and_rebuild(self):
+        queries = {'elders': 'holloway', 'medications': 'metformin', 'tasks': 'walk', 'appointments': 'checkup'}
+        for category, query in queries.items():
+            with self.subTest(category=category):
+                found = SQLiteFTSSearchBackend().search(query, category)
+                self.assertTrue(found)
+                self.assertEqual(sorted(found), sorted(IContainsSearchBackend().search(query, category)))
+        self.assertEqual(rebuild_index(), 8)
+        self.assertEqual(self.search('holloway')['elders'], [self.elder])
+
+
+class VitalsRollupTests(FacilityTestCase):
+    def setUp(self):
+        super().setUp()
+        self.elder, = self.add_elders(1)
+        self.morning = timezone.localtime(timezone.now() - timedelta(days=3)).replace(
+            hour=9, minute=0, second=0, microsecond=0
+        )
+
+    def log(self, minutes, **values):
+        with self.captureOnCommitCallbacks(execute=True):
+            return VitalsLog.objects.create(
+                elder=self.elder, recorded_at=self.morning + timedelta(minutes=minutes), **values
+            )
+
+    def daily(self, metric):
+        start, _ = day_bounds(self.morning)
+        return VitalsRollup.objects.get(elder=self.elder, granularity='DAY', metric=metric, bucket_start=start)
+
+    def test_saves_and_deletes_refresh_buckets(self):
+        self.log(0, heart_rate=60)
+        reading = self.log(30, heart_rate=90)
+        self.log(90, heart_rate=75, temperature='98.6')
+        rollup = self.daily('heart_rate')
+        self.assertEqual((rollup.count, rollup.minimum, rollup.maximum, rollup.average), (3, 60, 90, 75))
+        self.assertEqual(
+            VitalsRollup.objects.filter(elder=self.elder, granularity='HOUR', metric='heart_rate').count(), 2
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reading.delete()
+        rollup = self.daily('heart_rate')
+        self.assertEqual((rollup.count, rollup.maximum), (2, 75))
+
+    def test_refresh_after_bulk_insert(self):
+        VitalsLog.objects.bulk_create([
+            VitalsLog(elder=self.elder, recorded_at=self.morning + timedelta(hours=hour), oxygen_saturation=95 + hour)
+            for hour in range(4)
+        ])
+        start, end = day_bounds(self.morning)
+        refresh_rollups([self.elder.pk], start, end)
+        series = vitals_trend(self.elder.pk, ['oxygen_saturation'], 'HOUR', since=start, until=end)
+        self.assertEqual([bucket['avg'] for bucket in series['oxygen_saturation']], [95, 96, 97, 98])
+
+    def test_trend_endpoint(self):
+        self.log(0, heart_rate=70)
+        url = reverse('vitals_trend', args=[self.elder.pk])
+        body = self.client.get(url, {'granularity': 'day', 'metric': 'heart_rate', 'days': 7}).json()
+        self.assertEqual([bucket['avg'] for bucket in body['series']['heart_rate']], [70])
+        self.assertEqual(self.client.get(url, {'granularity': 'week'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'metric': 'mood'}).status_code, 400)
+
+
+class MarTests(FacilityTestCase):
+    def setUp(self):
+        super().setUp()
+        self.elder, self.other = self.add_elders(2)
+        MedicationSchedule.objects.update(is_active=False)
+        self.today = timezone.localdate()
+        self.noon = timezone.make_aware(datetime.combine(self.today, time(12, 0)))
+
+    def schedule(self, elder=None, **fields):
+        fields.setdefault('start_date', self.today)
+        return MedicationSchedule.objects.create(
+            elder=elder or self.elder, medication=self.medication, dosage='500mg', **fields
+        )
+
+    def log(self, schedule, hour, minute=0, **fields):
+        log = MedicationLog.objects.create(schedule=schedule, **fields)
+        taken_at = timezone.make_aware(datetime.combine(self.today, time(hour, minute)))
+        MedicationLog.objects.filter(pk=log.pk).update(taken_at=taken_at)
+        return log
+
+    def statuses(self, user=None, **kwargs):
+        return [
+            (slot.schedule.pk, timezone.localtime(slot.due_at).hour, slot.status)
+            for slot in todays_dose_slots(user or self.admin, now=self.noon, **kwargs)
+        ]
+
+    def test_slot_statuses(self):
+        twice = self.schedule(frequency='TWICE_DAILY')
+        daily = self.schedule(elder=self.other)
+        skipped = self.schedule(frequency='CUSTOM', time_1=time(10, 0))
+        custom = self.schedule(frequency='CUSTOM', time_1=time(13, 0))
+        self.log(twice, 8, 40)
+        self.log(skipped, 9, 30, was_skipped=True)
+        self.assertEqual(self.statuses(), [
+            (twice.pk, 8, DoseSlot.GIVEN),
+            (daily.pk, 8, DoseSlot.MISSED),
+            (skipped.pk, 10, DoseSlot.SKIPPED),
+            (custom.pk, 13, DoseSlot.DUE),
+            (twice.pk, 20, DoseSlot.UPCOMING),
+        ])
+
+    def test_each_log_counts_once(self):
+        schedule = self.schedule(frequency='CUSTOM', time_1=time(9, 0), time_2=time(10, 0))
+        self.log(schedule, 9, 30)
+        self.assertEqual(self.statuses(), [(schedule.pk, 9, DoseSlot.GIVEN), (schedule.pk, 10, DoseSlot.DUE)])
+
+    def test_set_times_override_defaults(self):
+        self.schedule(frequency='THRICE_DAILY', time_1=time(6, 0))
+        self.assertEqual([hour for _, hour, _ in self.statuses()], [6, 14, 20])
+
+    def test_weekly_and_as_needed(self):
+        weekly = self.schedule(frequency='WEEKLY', start_date=self.today - timedelta(days=3))
+        self.schedule(frequency='AS_NEEDED')
+        start = timezone.make_aware(datetime.combine(self.today - timedelta(days=3), time.min))
+        slots = dose_slots(self.admin, start, start + timedelta(days=14), now=self.noon)
+        self.assertEqual([slot.schedule for slot in slots], [weekly, weekly])
+        self.assertEqual({timezone.localtime(slot.due_at).weekday() for slot in slots}, {start.weekday()})
+        self.assertEqual(slots[1].due_at - slots[0].due_at, timedelta(days=7))
+
+    def test_scope_and_constant_queries(self):
+        outsider = self.add_elders(1)[0]
+        outsider.guardian = self.add_user('other-guardian', 'GUARDIAN')
+        outsider.save()
+        MedicationSchedule.objects.update(is_active=False)
+        mine = self.schedule()
+        theirs = self.schedule(elder=outsider)
+        for schedule in (mine, theirs):
+            self.log(schedule, 8)
+        get_access_scope(self.guardian)
+        with self.assertNumQueries(2):
+            self.assertEqual(self.statuses(self.guardian), [(mine.pk, 8, DoseSlot.GIVEN)])
+        self.assertEqual(self.statuses(elder_id=outsider.pk), [(theirs.pk, 8, DoseSlot.GIVEN)])
+
+
+class ReminderTests(FacilityTestCase):
+    def setUp(self):
+        super().setUp()
+        self.elder, = self.add_elders(1)
+        self.now = timezone.now()
+
+    def appointment(self, hours, **fields):
+        return Appointment.objects.create(
+            elder=self.elder, title='Dentist', appointment_date=self.now + timedelta(hours=hours), **fields
+        )
+
+    def test_reminds_due_appointments_once(self):
+        due = [self.appointment(hours) for hours in (1, 5, 23)]
+        self.appointment(-1)
+        self.appointment(2, status='CANCELLED')
+        self.assertEqual(send_appointment_reminders(now=self.now, batch_size=2), 3)
+        self.assertEqual(send_appointment_reminders(now=self.now), 0)
+
+        reminded = Appointment.objects.filter(reminder_sent=True).order_by('appointment_date')
+        self.assertEqual(list(reminded), due)
+        notifications = Notification.objects.filter(notification_type='APPOINTMENT').order_by('expires_at')
+        self.assertEqual([n.expires_at for n in notifications], [a.appointment_date for a in due])
+        self.assertTrue(all(n.message.startswith('Upcoming appointment: Dentist') for n in notifications))
+
+    def test_command(self):
+        self.appointment(30)
+        out = StringIO()
+        call_command('send_appointment_reminders', '--lead-time', '96', stdout=out)
+        self.assertIn('Sent 2 appointment reminder(s).', out.getvalue())
+        self.assertFalse(Appointment.objects.filter(reminder_sent=False).exists())
+
+
+class LoopCommandTests(TestCase):
+    def test_loop_finishes_the_pass_then_stops(self):
+        passes = []
+
+        class Command(LoopCommand):
+            def run_once(self, **options):
+                passes.append(options['interval'])
+                if len(passes) == 3:
+                    self._stop(None, None)
+
+        with mock.patch('care_app.management.base.signal.signal') as install:
+            call_command(Command(), loop=True, interval=0)
+        self.assertEqual(passes, [0, 0, 0])
+        self.assertEqual(install.call_count, 2)
+
+    def test_single_pass_without_loop(self):
+        passes = []
+
+        class Command(LoopCommand):
+            default_interval = 5
+
+            def run_once(self, **options):
+                passes.append(options['interval'])
+
+        call_command(Command())
+        self.assertEqual(passes, [5])
+
+
+class OverdueSweepTests(FacilityTestCase):
+    def setUp(self):
+        super().setUp()
+        self.elder, = self.add_elders(1)
+        self.now = timezone.now()
+
+    def task(self, hours, **fields):
+        return CareTask.objects.create(
+            elder=self.elder, title='Dressing change', due_date=self.now + timedelta(hours=hours), **fields
+        )
+
+    def test_sweep_flags_and_notifies_once(self):
+        urgent = self.task(-2, priority='URGENT')
+        started = self.task(-1, priority='LOW', status='IN_PROGRESS')
+        template = self.task(-3, priority='HIGH', is_recurring=True)
+        result = sweep_overdue_tasks(now=self.now)
+        self.assertEqual((result.updated, result.notified), (2, 1))
+        self.assertEqual(
+            set(CareTask.objects.filter(status='OVERDUE').values_list('pk', 'overdue_from')),
+            {(urgent.pk, 'PENDING'), (started.pk, 'IN_PROGRESS')},
+        )
+        template.refresh_from_db()
+        self.assertEqual(template.status, 'PENDING')
+
+        result = sweep_overdue_tasks(now=self.now)
+        self.assertEqual((result.updated, result.notified), (0, 0))
+        self.assertEqual(Notification.objects.filter(notification_type='TASK').count(), 1)
+
+    def test_reopens_only_swept_tasks(self):
+        urgent = self.task(-2, priority='URGENT')
+        started = self.task(-1, status='IN_PROGRESS')
+        flagged = self.task(5, status='OVERDUE')
+        sweep_overdue_tasks(now=self.now)
+        CareTask.objects.filter(pk__in=[urgent.pk, started.pk]).update(due_date=self.now + timedelta(days=1))
+
+        result = sweep_overdue_tasks(now=self.now)
+        self.assertEqual(result.reopened, 2)
+        statuses = dict(CareTask.objects.filter(
+            pk__in=[urgent.pk, started.pk, flagged.pk]
+        ).values_list('pk', 'status'))
+        self.assertEqual(statuses, {urgent.pk: 'PENDING', started.pk: 'IN_PROGRESS', flagged.pk: 'OVERDUE'})
+
+    def test_command(self):
+        self.task(-1, priority='HIGH')
+        out = StringIO()
+        call_command('sweep_overdue_tasks', stdout=out)
+        self.assertIn('marked 1 overdue, sent 1 notification(s), reopened 0', out.getvalue())
+
+
+class RecurringTaskTests(FacilityTestCase):
+    def setUp(self):
+        super().setUp()
+        self.elder, = self.add_elders(1)
+        self.today = date(2026, 1, 1)
+
+    def template(self, task_type, due_date=None, **fields):
+        if due_date is not None:
+            due_date = timezone.make_aware(datetime.combine(due_date, time(7, 30)))
+        return CareTask.objects.create(
+            elder=self.elder, title=f'{task_type} round', description='Check in', task_type=task_type,
+            is_recurring=True, due_date=due_date, **fields
+        )
+
+    def test_generates_each_occurrence_once(self):
+        daily = self.template('DAILY', priority='URGENT')
+        weekly = self.template('WEEKLY', date(2025, 12, 1))
+        self.template('WEEKLY')
+        self.template('DAILY', status='CANCELLED')
+        self.assertEqual(generate_recurring_tasks(today=self.today), 8)
+        self.assertEqual(generate_recurring_tasks(today=self.today), 0)
+
+        occurrences = CareTask.objects.filter(recurrence_parent=daily)
+        self.assertEqual(
+            sorted(occurrences.values_list('occurrence_date', flat=True)),
+            [self.today + timedelta(days=day) for day in range(7)],
+        )
+        self.assertEqual(set(occurrences.values_list('priority_rank', 'is_recurring')), {(4, False)})
+        weekly_occurrence = CareTask.objects.get(recurrence_parent=weekly)
+        self.assertEqual(weekly_occurrence.occurrence_date, date(2026, 1, 5))
+        self.assertEqual(timezone.localtime(weekly_occurrence.due_date).time(), time(7, 30))
+        self.assertEqual(
+            SearchDocument.objects.filter(category='tasks', object_id__in=occurrences.values('pk')).count(), 7
+        )
+
+    def test_monthly_clamps_to_short_months(self):
+        monthly = CareTask(task_type='MONTHLY', due_date=timezone.make_aware(datetime(2025, 1, 31, 9)))
+        self.assertEqual(list(occurrence_dates(monthly, date(2025, 2, 1), date(2025, 4, 1))), [
+            date(2025, 2, 28), date(2025, 3, 31),
+        ])
+
+
+class PriorityRankTests(FacilityTestCase):
+    def setUp(self):
+        super().setUp()
+        self.elder, = self.add_elders(1)
+        self.nurse = self.add_user('nurse', 'NURSE', assigned_to=[self.elder])
+        self.now = timezone.now()
+
+    def task(self, title, priority, hours, **fields):
+        fields.setdefault('assigned_to', self.nurse)
+        return CareTask.objects.create(
+            elder=self.elder, title=title, priority=priority, due_date=self.now + timedelta(hours=hours), **fields
+        )
+
+    def test_queue_orders_by_urgency_then_due_date(self):
+        self.task('low', 'LOW', 1)
+        self.task('high later', 'HIGH', 5)
+        self.task('urgent', 'URGENT', 9)
+        self.task('high soon', 'HIGH', 2, status='OVERDUE')
+        self.task('medium', 'MEDIUM', 3)
+        self.task('done', 'URGENT', 1, status='COMPLETED')
+        self.task('template', 'URGENT', 1, is_recurring=True)
+        self.task('elsewhere', 'URGENT', 1, assigned_to=self.admin)
+
+        self.client.force_login(self.nurse)
+        url = reverse('care_task_queue')
+        titles = [task['title'] for task in self.client.get(url).json()['tasks']]
+        self.assertEqual(titles, ['urgent', 'high soon', 'high later', 'medium', 'low'])
+        self.assertEqual(len(self.client.get(url, {'limit': 2}).json()['tasks']), 2)
+        self.assertEqual(self.client.get(url, {'limit': 'ten'}).status_code, 400)
+
+    def test_rank_follows_priority_and_orders_the_dashboard(self):
+        task = self.task('bumped', 'LOW', 1)
+        self.assertEqual(task.priority_rank, 1)
+        task.priority = 'URGENT'
+        task.save()
+        self.assertEqual(CareTask.objects.get(pk=task.pk).priority_rank, 4)
+        pending = get_dashboard_snapshot(self.admin)['pending_tasks']
+        self.assertEqual(pending[0], task)
+
+
+class ElderSectionCacheTests(FacilityTestCase):
+    def setUp(self):
+        super().setUp()
+        self.elder, self.other = self.add_elders(2)
+        self.url = reverse('elder_detail', args=[self.elder.pk])
+        self.client.get(self.url)
+
+    def section_tables(self):
+        """The section tables the page reads while rendering."""
+        tables = ['care_app_caretask', 'care_app_appointment', 'care_app_medicationschedule', 'care_app_vitalslog']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        read = {table for table in tables for query in queries if f'FROM "{table}"' in query['sql']}
+        return response, read
+
+    def test_unchanged_sections_render_from_cache(self):
+        _, read = self.section_tables()
+        self.assertEqual(read, set())
+
+    def test_a_change_recomputes_only_its_section(self):
+        other_versions = elder_section_versions(self.other.pk)
+        CareTask.objects.create(elder=self.elder, title='Podiatry visit', description='Trim nails')
+        response, read = self.section_tables()
+        self.assertEqual(read, {'care_app_caretask'})
+        self.assertContains(response, 'Podiatry visit')
+        self.assertEqual(elder_section_versions(self.other.pk), other_versions)
+
+    def test_medication_rename_refreshes_schedules(self):
+        self.medication.name = 'Glucophage'
+        self.medication.save()
+        response, read = self.section_tables()
+        self.assertEqual(read, {'care_app_medicationschedule'})
+        self.assertContains(response, 'Glucophage')
+
+
+@override_settings(SESSION_REFRESH_INTERVAL=300)
+class SlidingSessionTests(FacilityTestCase):
+    def get(self, at):
+        with mock.patch('care_app.middleware.time.time', return_value=at):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+        return sum('django_session' in query['sql'] and 'SELECT' not in query['sql'] for query in queries)
+
+    def test_session_saved_once_per_interval(self):
+        self.assertEqual(self.get(1000), 1)
+        self.assertEqual(self.client.session[SESSION_REFRESHED_KEY], 1000)
+        self.assertEqual([self.get(1000 + offset) for offset in (1, 60, 299)], [0, 0, 0])
+        self.assertEqual(self.get(1300), 1)
+        self.assertEqual(self.client.session[SESSION_REFRESHED_KEY], 1300)
+
+    def test_anonymous_visitors_get_no_session(self):
+        self.client.logout()
+        response = self.client.get(reverse('login'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+
+class RetentionTests(FacilityTestCase):
+    def setUp(self):
+        super().setUp()
+        self.elder, = self.add_elders(1)
+        self.now = timezone.now()
+
+    def notify(self, notification_type, days_ago, read=False, message=None):
+        notification, = create_notifications([Notification(
+            elder=self.elder, notification_type=notification_type, message=message or notification_type.title(),
+            created_at=self.now - timedelta(days=days_ago),
+        )])
+        if read:
+            notification.deliveries.update(read_at=self.now)
+        return notification
+
+    def remaining(self):
+        return set(Notification.objects.values_list('message', flat=True))
+
+    def test_expiry_follows_the_type_policy(self):
+        medication = self.notify('MEDICATION', 0)
+        self.assertEqual(medication.expires_at, medication.created_at + timedelta(days=7))
+        self.assertIsNone(self.notify('GENERAL', 0).expires_at)
+        self.notify('VITALS', 4)
+        self.assertEqual(
+            [item['message'] for item in get_notification_summary(self.admin)['preview']],
+            ['General', 'Medication'],
+        )
+
+    def test_purge_applies_each_pass(self):
+        self.notify('VITALS', 4, message='expired')
+        self.notify('GENERAL', 100, read=True, message='read by everyone')
+        unread = self.notify('GENERAL', 100, message='still unread')
+        self.notify('GENERAL', 400, message='past retention')
+        self.notify('GENERAL', 10, read=True, message='recent')
+        with tempfile.TemporaryDirectory() as directory, self.settings(NOTIFICATION_ARCHIVE_DIR=directory):
+            self.notify('INCIDENT', 400, read=True, message='old incident')
+            self.notify('INCIDENT', 400, message='unread incident')
+            result = purge_notifications(now=self.now, batch_size=1)
+            with open(f'{directory}/notifications-{timezone.localdate(self.now).isoformat()}.ndjson') as archive:
+                archived = [json.loads(line)['message'] for line in archive]
+
+        self.assertEqual((result.expired, result.read, result.old), (1, 2, 1))
+        self.assertEqual(archived, ['old incident'])
+        self.assertEqual(self.remaining(), {'still unread', 'recent', 'unread incident'})
+        self.assertTrue(unread.deliveries.exists())
+        self.assertFalse(NotificationDelivery.objects.exclude(notification__in=Notification.objects.all()).exists())
+
+    def test_command(self):
+        self.notify('VITALS', 4)
+        out = StringIO()
+        call_command('purge_notifications', stdout=out)
+        self.assertIn('Deleted 1 notification(s): 1 expired', out.getvalue())
+
+
+class AnomalyTests(FacilityTestCase):
+    def setUp(self):
+        super().setUp()
+        self.elder, self.other = self.add_elders(2)
+        self.start = timezone.now() - timedelta(hours=20)
+
+    def readings(self, elder, values, metric='heart_rate'):
+        VitalsLog.objects.bulk_create([
+            VitalsLog(elder=elder, recorded_at=self.start + timedelta(hours=hour), **{metric: value})
+            for hour, value in enumerate(values)
+        ])
+
+    def test_clinical_and_baseline_scoring(self):
+        self.readings(self.elder, [70, 71, 69, 70, 72, 70, 100])
+        self.readings(self.other, [70, 71, 100])
+        self.readings(self.other, [96, 97, 85], metric='oxygen_saturation')
+        result = backtest(since=self.start).as_dict()
+        # Too little history on the other elder for their jump to count
+        self.assertEqual(result['by_metric'], {'heart_rate:BASELINE': 1, 'oxygen_saturation:CLINICAL': 1})
+        self.assertEqual(result['readings'], 13)
+
+    def test_rolling_baseline_matches_a_direct_computation(self):
+        self.readings(self.elder, [70, 75, None, 64, 80, 71, 90, 66])
+        self.readings(self.other, [60, 61, 59, None, 62])
+        arrays = load_readings(VitalsLog.objects.all())
+        mean, std, count = rolling_baseline(arrays, window=4)
+        column = VITALS_METRICS.index('heart_rate')
+        for row in range(len(arrays)):
+            same_elder = arrays.elder_ids[:row] == arrays.elder_ids[row]
+            previous = arrays.values[:row][same_elder][-4:, column]
+            previous = previous[~np.isnan(previous)]
+            self.assertEqual(count[row, column], len(previous))
+            if len(previous):
+                self.assertAlmostEqual(mean[row, column], previous.mean())
+                self.assertAlmostEqual(std[row, column], previous.std(), delta=1e-6)
+
+    def test_alerts_are_deduplicated(self):
+        low = {'oxygen_saturation': 85}
+        with self.captureOnCommitCallbacks(execute=True):
+            VitalsLog.objects.create(elder=self.elder, recorded_at=timezone.now(), **low)
+        with self.captureOnCommitCallbacks(execute=True):
+            VitalsLog.objects.create(elder=self.elder, recorded_at=timezone.now(), **low)
+        alerts = Notification.objects.filter(notification_type='VITALS')
+        self.assertEqual(list(alerts.values_list('priority', 'dedup_key')), [
+            ('HIGH', f'vitals:{self.elder.pk}:oxygen_saturation:LOW'),
+        ])
+        self.assertIn('Abnormal SpO2 for', alerts.get().message)
+
+        alerts.update(created_at=timezone.now() - DEDUP_WINDOW - timedelta(minutes=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            VitalsLog.objects.create(elder=self.elder, recorded_at=timezone.now(), **low)
+        self.assertEqual(alerts.count(), 2)
+
+
+class SyntheticFacilityTests(TestCase):
+    def test_notifications_expire_by_policy(self):
+        spec = FacilitySpec(elders=4, staff=6, days=30, future_days=7, notifications_per_week=7)
+        generate_facility(spec, workers=0, kinds=['notifications'])
+        notifications = Notification.objects.all()
+        self.assertTrue(notifications.filter(expires_at__isnull=False).exists())
+        self.assertTrue(notifications.filter(expires_at__isnull=True).exists())
+        for notification in notifications:
+            days = settings.NOTIFICATION_RETENTION.get(notification.notification_type, {}).get('expire_after_days')
+            expected = notification.created_at + timedelta(days=days) if days else None
+            self.assertEqual(notification.expires_at, expected)
@@ -32,6 +32,7 @@ urlpatterns = [
     # Care task management
     path('tasks/', views.care_task_list, name='care_task_list'),
     path('tasks/add/', views.care_task_add, name='care_task_add'),
+    path('tasks/queue/', views.care_task_queue, name='care_task_queue'),
     path('tasks/<int:task_id>/edit/', views.care_task_edit, name='care_task_edit'),
     path('tasks/<int:task_id>/complete/', views.care_task_complete, name='care_task_complete'),
     path('tasks/<int:task_id>/delete/', views.care_task_delete, name='care_task_delete'),
@@ -46,12 +47,14 @@ urlpatterns = [
     # Vitals tracking
     path('vitals/', views.vitals_list, name='vitals_list'),
     path('vitals/add/', views.vitals_add, name='vitals_add'),
+    path('vitals/ingest/', views.vitals_ingest, name='vitals_ingest'),
     path('vitals/<int:vital_id>/', views.vitals_detail, name='vitals_detail'),
     path('vitals/<int:vital_id>/edit/', views.vitals_edit, name='vitals_edit'),
     path('vitals/<int:vital_id>/delete/', views.vitals_delete, name='vitals_delete'),
     path('elders/<int:elder_id>/vitals/', views.vitals_list, name='elder_vitals'),
     path('elders/<int:elder_id>/vitals/add/', views.vitals_add, name='elder_vitals_add'),
     path('elders/<int:elder_id>/vitals/quick/', views.quick_vitals, name='quick_vitals'),
+    path('elders/<int:elder_id>/vitals/trend/', views.vitals_trend, name='vitals_trend'),
     
     # Incident reporting
     path('incidents/', views.incident_list, name='incident_list'),
@@ -66,6 +69,12 @@ urlpatterns = [
     path('notifications/<int:notification_id>/delete/', views.notification_delete, name='notification_delete'),
     path('notifications/mark-all-read/', views.notification_mark_all_read, name='notification_mark_all_read'),
     
+    # Exports
+    path('exports/<slug:kind>.<slug:fmt>', views.export, name='export'),
+    
+    # Metrics
+    path('metrics/', views.metrics, name='metrics'),
+    
     # User management
     path('profile/', views.user_profile, name='user_profile'),
     path('register/', views.register, name='register'),
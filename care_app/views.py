@@ -2,10 +2,18 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, authenticate, logout
 from django.contrib import messages
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse,
+    StreamingHttpResponse,
+)
+from django.views.decorators.http import require_POST
+from django.core.paginator import Paginator
 from django.db.models import Q, Count
 from django.utils import timezone
-from datetime import datetime, timedelta
+from django.utils.crypto import constant_time_compare
+from django.utils.dateparse import parse_date
+from datetime import datetime, time, timedelta
 import json
 
 from .models import (
@@ -19,94 +27,39 @@ from .forms import (
     NotificationForm, UserProfileForm, UserRegistrationForm, QuickVitalsForm,
     SearchForm
 )
+from .access import accessible_elders, filter_by_access, get_access_scope
+from .caching import get_cache_alias
+from .care_tasks import WORK_QUEUE_SIZE, work_queue
+from .dashboard import get_dashboard_snapshot
+from .decorators import caregiver_required, elder_access_required
+from .exports import EXPORT_FORMATS, EXPORTS, STREAMERS, export_rows
+from .fragments import ELDER_SECTION_TIMEOUT, elder_section_versions
+from .ingestion import PARSERS as INGEST_PARSERS, ingest_vitals
+from .metrics import render_metrics
+from .pagination import keyset_page, parse_cursor
+from .search import SEARCH_CATEGORIES, get_search_backend, hydrate
+from .vitals_rollups import GRANULARITY_KINDS, VITALS_METRICS, vitals_trend as vitals_trend_series
+from .notifications import (
+    get_notification_summary, mark_all_read, mark_read, read_through, visible_deliveries, with_read_state,
+)
+
+ELDERS_PER_PAGE = 24
+NOTIFICATIONS_PER_PAGE = 25
+VITALS_PER_PAGE = 50
+SEARCH_RESULTS_PER_CATEGORY = 10
+SEARCH_RESULTS_PER_PAGE = 25
 
 
 def get_accessible_elders(user):
-    try:
-        profile = user.profile
-        if profile and profile.user_type in ['ADMIN', 'DOCTOR', 'NURSE', 'CAREGIVER']:
-            return ElderProfile.objects.all()
-    except UserProfile.DoesNotExist:
-        pass
-    return ElderProfile.objects.filter(Q(guardian=user) | Q(assigned_staff=user)).distinct()
+    return accessible_elders(user)
 
 
 @login_required
 def dashboard(request):
-    # Get user profile
-    try:
-        user_profile = request.user.profile
-    except UserProfile.DoesNotExist:
-        user_profile = None
-    
-    # Get data based on user type
-    if user_profile and user_profile.user_type == 'ADMIN':
-        elders = ElderProfile.objects.all()
-        total_elders = elders.count()
-        upcoming_appointments = Appointment.objects.filter(
-            appointment_date__gte=timezone.now(),
-            status__in=['SCHEDULED', 'CONFIRMED']
-        ).order_by('appointment_date')[:5]
-        pending_tasks = CareTask.objects.filter(status='PENDING').order_by('priority', 'due_date')[:10]
-        recent_incidents = IncidentReport.objects.filter(is_resolved=False).order_by('-incident_date')[:5]
-    else:
-        # For caregivers/doctors/nurses/guardians, show assigned or guardian elders
-        elders = get_accessible_elders(request.user)
-        total_elders = elders.count()
-        upcoming_appointments = Appointment.objects.filter(
-            elder__in=elders,
-            appointment_date__gte=timezone.now(),
-            status__in=['SCHEDULED', 'CONFIRMED']
-        ).order_by('appointment_date')[:5]
-        pending_tasks = CareTask.objects.filter(
-            elder__in=elders,
-            status='PENDING'
-        ).order_by('priority', 'due_date')[:10]
-        recent_incidents = IncidentReport.objects.filter(
-            elder__in=elders,
-            is_resolved=False
-        ).order_by('-incident_date')[:5]
-    
-    # Get notifications - only for admins and guardians
-    if user_profile and user_profile.user_type == 'ADMIN':
-        # Admin sees all notifications
-        notifications = Notification.objects.filter(is_read=False).order_by('-created_at')[:10]
-    else:
-        # Only guardians see notifications for their elders
-        guardian_elders = ElderProfile.objects.filter(guardian=request.user)
-        notifications = Notification.objects.filter(
-            Q(elder__in=guardian_elders) | Q(elder__isnull=True),
-            is_read=False
-        ).order_by('-created_at')[:10]
-    
-    # Get today's medication schedules
-    today = timezone.now().date()
-    today_medications = MedicationSchedule.objects.filter(
-        elder__in=elders,
-        is_active=True,
-        start_date__lte=today
-    ).filter(
-        Q(end_date__isnull=True) | Q(end_date__gte=today)
-    )
-    
-    # Get vitals due today
-    vitals_due = []
-    for elder in elders:
-        last_vitals = VitalsLog.objects.filter(elder=elder).order_by('-recorded_at').first()
-        if not last_vitals or (today - last_vitals.recorded_at.date()).days >= 7:
-            vitals_due.append(elder)
-    
-    context = {
-        'elders': elders,
-        'total_elders': total_elders,
-        'upcoming_appointments': upcoming_appointments,
-        'pending_tasks': pending_tasks,
-        'recent_incidents': recent_incidents,
-        'notifications': notifications,
-        'today_medications': today_medications,
-        'vitals_due': vitals_due,
-        'user_profile': user_profile,
-    }
+    # One cached snapshot per scope; a warm hit runs no queries of its own
+    context = dict(get_dashboard_snapshot(request.user))
+    # Read state is per user, so it stays out of the shared snapshot
+    context['notifications'] = get_notification_summary(request.user)['preview']
     return render(request, 'dashboard.html', context)
 
 @login_required
@@ -115,14 +68,7 @@ def elder_list(request):
     query = request.GET.get('query', '')
     category = request.GET.get('category', 'all')
     
-    try:
-        user_profile = request.user.profile
-        if user_profile and user_profile.user_type == 'ADMIN':
-            elders = ElderProfile.objects.all()
-        else:
-            elders = get_accessible_elders(request.user)
-    except UserProfile.DoesNotExist:
-        elders = get_accessible_elders(request.user)
+    elders = get_accessible_elders(request.user)
     
     if query:
         if category == 'elders' or category == 'all':
@@ -131,33 +77,44 @@ def elder_list(request):
                 Q(medical_conditions__icontains=query) |
                 Q(address__icontains=query)
             )
+    elders = elders.select_related('guardian').with_last_vitals().with_summary_counts().order_by('full_name', 'pk')
+    
+    # ?after=<elder id> switches to keyset pagination, which avoids COUNT and
+    # OFFSET scans on very large tenants
+    after = parse_cursor(request.GET.get('after'))
+    if after:
+        cursor = ElderProfile.objects.filter(pk=after).values('full_name', 'pk').first()
+        seek = None
+        if cursor:
+            seek = Q(full_name__gt=cursor['full_name']) | Q(full_name=cursor['full_name'], pk__gt=cursor['pk'])
+        page = keyset_page(elders, seek, ELDERS_PER_PAGE)
+    else:
+        page = Paginator(elders, ELDERS_PER_PAGE).get_page(request.GET.get('page'))
     
     context = {
-        'elders': elders,
+        'elders': page,
         'search_form': search_form,
         'query': query,
+        'category': category,
     }
     return render(request, 'elder_list.html', context)
 
 @login_required
 def elder_detail(request, elder_id):
-    elder = get_object_or_404(ElderProfile, pk=elder_id)
+    scope = get_access_scope(request.user)
+    if not scope.can_list(elder_id):
+        raise Http404("Elder not found.")
+    elder = get_object_or_404(ElderProfile.objects.select_related('guardian'), pk=elder_id)
     
     # Check if user has access to this elder
-    try:
-        user_profile = request.user.profile
-        if user_profile and user_profile.user_type != 'ADMIN' and elder.guardian != request.user:
-            messages.error(request, "You don't have permission to view this elder's details.")
-            return redirect('elder_list')
-    except UserProfile.DoesNotExist:
-        if elder.guardian != request.user:
-            messages.error(request, "You don't have permission to view this elder's details.")
-            return redirect('elder_list')
+    if not scope.can_edit(elder.pk):
+        messages.error(request, "You don't have permission to view this elder's details.")
+        return redirect('elder_list')
     
-    # Get related data
-    medications = MedicationSchedule.objects.filter(elder=elder, is_active=True)
+    # Related data stays lazy: a section served from the fragment cache never runs its query
+    medications = MedicationSchedule.objects.filter(elder=elder, is_active=True).select_related('medication')
     appointments = Appointment.objects.filter(elder=elder).order_by('-appointment_date')[:10]
-    care_tasks = CareTask.objects.filter(elder=elder).order_by('-created_at')[:10]
+    care_tasks = CareTask.objects.filter(elder=elder).select_related('assigned_to').order_by('-created_at')[:10]
     emergency_contacts = EmergencyContact.objects.filter(elder=elder)
     recent_vitals = VitalsLog.objects.filter(elder=elder).order_by('-recorded_at')[:5]
     recent_incidents = IncidentReport.objects.filter(elder=elder).order_by('-incident_date')[:5]
@@ -170,6 +127,9 @@ def elder_detail(request, elder_id):
         'emergency_contacts': emergency_contacts,
         'recent_vitals': recent_vitals,
         'recent_incidents': recent_incidents,
+        'section_versions': elder_section_versions(elder.pk),
+        'section_timeout': ELDER_SECTION_TIMEOUT,
+        'section_cache': get_cache_alias(),
     }
     return render(request, 'elder_detail.html', context)
 
@@ -194,18 +154,15 @@ def elder_add(request):
 
 @login_required
 def elder_edit(request, elder_id):
+    scope = get_access_scope(request.user)
+    if not scope.can_list(elder_id):
+        raise Http404("Elder not found.")
     elder = get_object_or_404(ElderProfile, pk=elder_id)
     
     # Check permissions
-    try:
-        user_profile = request.user.profile
-        if user_profile and user_profile.user_type != 'ADMIN' and elder.guardian != request.user:
-            messages.error(request, "You don't have permission to edit this elder's profile.")
-            return redirect('elder_detail', elder_id=elder.pk)
-    except UserProfile.DoesNotExist:
-        if elder.guardian != request.user:
-            messages.error(request, "You don't have permission to edit this elder's profile.")
-            return redirect('elder_detail', elder_id=elder.pk)
+    if not scope.can_edit(elder.pk):
+        messages.error(request, "You don't have permission to edit this elder's profile.")
+        return redirect('elder_detail', elder_id=elder.pk)
     
     if request.method == 'POST':
         form = ElderForm(request.POST, instance=elder, user=request.user)
@@ -227,16 +184,10 @@ def medication_list(request, elder_id=None):
         elders = [elder]
     else:
         elder = None
-        try:
-            user_profile = request.user.profile
-            if user_profile and user_profile.user_type == 'ADMIN':
-                medications = Medication.objects.all()
-                elders = ElderProfile.objects.all()
-            else:
-                elders = get_accessible_elders(request.user)
-                medications = Medication.objects.filter(medicationschedule__elder__in=elders).distinct()
-        except UserProfile.DoesNotExist:
-            elders = get_accessible_elders(request.user)
+        elders = get_accessible_elders(request.user)
+        if get_access_scope(request.user).is_admin:
+            medications = Medication.objects.all()
+        else:
             medications = Medication.objects.filter(medicationschedule__elder__in=elders).distinct()
     
     context = {'elder': elder, 'medications': medications, 'elders': elders}
@@ -360,16 +311,7 @@ def appointment_list(request, elder_id=None):
         appointments = Appointment.objects.filter(elder=elder).order_by('-appointment_date')
     else:
         elder = None
-        try:
-            user_profile = request.user.profile
-            if user_profile and user_profile.user_type == 'ADMIN':
-                appointments = Appointment.objects.all().order_by('-appointment_date')
-            else:
-                elders = get_accessible_elders(request.user)
-                appointments = Appointment.objects.filter(elder__in=elders).order_by('-appointment_date')
-        except UserProfile.DoesNotExist:
-            elders = get_accessible_elders(request.user)
-            appointments = Appointment.objects.filter(elder__in=elders).order_by('-appointment_date')
+        appointments = filter_by_access(Appointment.objects.all(), request.user).order_by('-appointment_date')
     
     context = {'appointments': appointments, 'elder': elder}
     return render(request, 'appointment_list.html', context)
@@ -432,20 +374,32 @@ def care_task_list(request, elder_id=None):
         tasks = CareTask.objects.filter(elder=elder).order_by('-created_at')
     else:
         elder = None
-        try:
-            user_profile = request.user.profile
-            if user_profile and user_profile.user_type == 'ADMIN':
-                tasks = CareTask.objects.all().order_by('-created_at')
-            else:
-                elders = get_accessible_elders(request.user)
-                tasks = CareTask.objects.filter(elder__in=elders).order_by('-created_at')
-        except UserProfile.DoesNotExist:
-            elders = get_accessible_elders(request.user)
-            tasks = CareTask.objects.filter(elder__in=elders).order_by('-created_at')
+        tasks = filter_by_access(CareTask.objects.all(), request.user).order_by('-created_at')
     
-    context = {'tasks': tasks, 'elder': elder}
+    context = {'tasks': tasks.select_related('elder', 'assigned_to'), 'elder': elder}
     return render(request, 'care_task_list.html', context)
 
+@login_required
+def care_task_queue(request):
+    """JSON work queue: the caller's next open tasks by urgency, then due time."""
+    try:
+        limit = min(max(int(request.GET.get('limit', WORK_QUEUE_SIZE)), 1), 100)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer.'}, status=400)
+    
+    tasks = work_queue(request.user, limit=limit)
+    return JsonResponse({'tasks': [
+        {
+            'id': task.pk,
+            'title': task.title,
+            'elder': {'id': task.elder_id, 'name': task.elder.full_name},
+            'priority': task.priority,
+            'status': task.status,
+            'due_date': task.due_date,
+        }
+        for task in tasks
+    ]})
+
 @login_required
 def care_task_add(request):
     if request.method == 'POST':
@@ -497,15 +451,9 @@ def care_task_complete(request, task_id):
     task = get_object_or_404(CareTask, pk=task_id)
     
     # Check permissions
-    try:
-        user_profile = request.user.profile
-        if user_profile and user_profile.user_type != 'ADMIN' and task.elder.guardian != request.user:
-            messages.error(request, "You don't have permission to complete this task.")
-            return redirect('care_task_list')
-    except UserProfile.DoesNotExist:
-        if task.elder.guardian != request.user:
-            messages.error(request, "You don't have permission to complete this task.")
-            return redirect('care_task_list')
+    if not get_access_scope(request.user).can_edit(task.elder_id):
+        messages.error(request, "You don't have permission to complete this task.")
+        return redirect('care_task_list')
     
     if request.method == 'POST':
         task.status = 'COMPLETED'
@@ -652,17 +600,8 @@ def vitals_list(request, elder_id=None):
         elders = [elder]
     else:
         elder = None
-        try:
-            user_profile = request.user.profile
-            if user_profile and user_profile.user_type == 'ADMIN':
-                vitals = VitalsLog.objects.all().order_by('-recorded_at')
-                elders = ElderProfile.objects.all()
-            else:
-                elders = get_accessible_elders(request.user)
-                vitals = VitalsLog.objects.filter(elder__in=elders).order_by('-recorded_at')
-        except UserProfile.DoesNotExist:
-            elders = get_accessible_elders(request.user)
-            vitals = VitalsLog.objects.filter(elder__in=elders).order_by('-recorded_at')
+        elders = get_accessible_elders(request.user)
+        vitals = filter_by_access(VitalsLog.objects.all(), request.user).order_by('-recorded_at')
     
     # Apply search filter if query is provided
     if query:
@@ -678,7 +617,10 @@ def vitals_list(request, elder_id=None):
             Q(oxygen_saturation__icontains=query)
         )
     
-    context = {'elder': elder, 'vitals': vitals, 'elders': elders, 'search_form': search_form, 'query': query}
+    vitals = vitals.select_related('elder', 'logged_by')
+    # The template renders a page; handing it the queryset rendered every reading
+    page = Paginator(vitals, VITALS_PER_PAGE).get_page(request.GET.get('page'))
+    context = {'elder': elder, 'vitals': page, 'elders': elders, 'search_form': search_form, 'query': query}
     return render(request, 'vitals_list.html', context)
 
 @login_required
@@ -742,19 +684,54 @@ def vitals_detail(request, vital_id):
     vital = get_object_or_404(VitalsLog, pk=vital_id)
     
     # Check permissions
-    try:
-        user_profile = request.user.profile
-        if user_profile and user_profile.user_type != 'ADMIN' and vital.elder.guardian != request.user:
-            messages.error(request, "You don't have permission to view this vital signs record.")
-            return redirect('vitals_list')
-    except UserProfile.DoesNotExist:
-        if vital.elder.guardian != request.user:
-            messages.error(request, "You don't have permission to view this vital signs record.")
-            return redirect('vitals_list')
+    if not get_access_scope(request.user).can_edit(vital.elder_id):
+        messages.error(request, "You don't have permission to view this vital signs record.")
+        return redirect('vitals_list')
     
     context = {'vital': vital}
     return render(request, 'vitals_detail.html', context)
 
+@login_required
+@caregiver_required
+@require_POST
+def vitals_ingest(request):
+    """Batch endpoint for device gateways: JSON array, NDJSON or CSV body."""
+    content_type = request.content_type or 'application/json'
+    parser = INGEST_PARSERS.get(content_type)
+    if parser is None:
+        return JsonResponse({'error': f'Unsupported content type {content_type!r}.'}, status=415)
+    try:
+        result = ingest_vitals(parser(request), request.user)
+    except (ValueError, UnicodeDecodeError) as exc:
+        return JsonResponse({'error': f'Could not parse body: {exc}'}, status=400)
+    
+    status = 201 if result.created else 400
+    return JsonResponse(result.as_dict(), status=status)
+
+@login_required
+@elder_access_required
+def vitals_trend(request, elder_id):
+    elder = get_object_or_404(ElderProfile, pk=elder_id)
+    granularity = request.GET.get('granularity', 'DAY').upper()
+    if granularity not in GRANULARITY_KINDS:
+        return JsonResponse({'error': f'Unknown granularity {granularity!r}.'}, status=400)
+    metrics = request.GET.getlist('metric') or None
+    if metrics and not set(metrics) <= set(VITALS_METRICS):
+        return JsonResponse({'error': 'Unknown metric.'}, status=400)
+    try:
+        days = min(int(request.GET.get('days', 365)), 3660)
+    except ValueError:
+        return JsonResponse({'error': 'days must be an integer.'}, status=400)
+    
+    since = timezone.now() - timedelta(days=days)
+    series = vitals_trend_series(elder.pk, metrics, granularity, since=since)
+    return JsonResponse({
+        'elder': elder.pk,
+        'granularity': granularity,
+        'since': since,
+        'series': series,
+    })
+
 @login_required
 def quick_vitals(request, elder_id):
     elder = get_object_or_404(ElderProfile, pk=elder_id)
@@ -787,18 +764,9 @@ def incident_list(request, elder_id=None):
         incidents = IncidentReport.objects.filter(elder=elder).order_by('-incident_date')
     else:
         elder = None
-        try:
-            user_profile = request.user.profile
-            if user_profile and user_profile.user_type == 'ADMIN':
-                incidents = IncidentReport.objects.all().order_by('-incident_date')
-            else:
-                elders = get_accessible_elders(request.user)
-                incidents = IncidentReport.objects.filter(elder__in=elders).order_by('-incident_date')
-        except UserProfile.DoesNotExist:
-            elders = get_accessible_elders(request.user)
-            incidents = IncidentReport.objects.filter(elder__in=elders).order_by('-incident_date')
+        incidents = filter_by_access(IncidentReport.objects.all(), request.user).order_by('-incident_date')
     
-    context = {'incidents': incidents, 'elder': elder}
+    context = {'incidents': incidents.select_related('elder'), 'elder': elder}
     return render(request, 'incident_list.html', context)
 
 @login_required
@@ -858,27 +826,61 @@ def incident_delete(request, incident_id):
     context = {'incident': incident, 'title': 'Delete Incident Report'}
     return render(request, 'incident_confirm_delete.html', context)
 
+@login_required
+def export(request, kind, fmt):
+    """Stream an access-scoped export: ?elder=<id>&since=YYYY-MM-DD&until=YYYY-MM-DD"""
+    if kind not in EXPORTS or fmt not in EXPORT_FORMATS:
+        raise Http404
+    
+    bounds = {}
+    for param in ['since', 'until']:
+        value = request.GET.get(param)
+        if value:
+            try:
+                day = parse_date(value)
+            except ValueError:
+                day = None
+            if day is None:
+                return HttpResponseBadRequest(f'{param} must be a date (YYYY-MM-DD).')
+            bounds[param] = timezone.make_aware(datetime.combine(day, time.min))
+    elder_id = request.GET.get('elder')
+    if elder_id and not elder_id.isdigit():
+        return HttpResponseBadRequest('elder must be an id.')
+    
+    columns, rows = export_rows(kind, request.user, elder_id=elder_id or None, **bounds)
+    response = StreamingHttpResponse(STREAMERS[fmt](columns, rows), content_type=EXPORT_FORMATS[fmt])
+    filename = f'{kind}-{timezone.localdate():%Y%m%d}.{fmt}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def metrics(request):
+    """Per-view request metrics in the Prometheus text format."""
+    token = settings.METRICS_TOKEN
+    has_token = bool(token) and constant_time_compare(
+        request.headers.get('Authorization', ''), f'Bearer {token}'
+    )
+    is_admin = request.user.is_authenticated and get_access_scope(request.user).user_type == 'ADMIN'
+    if not (has_token or is_admin):
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @login_required
 def notification_list(request):
-    try:
-        user_profile = request.user.profile
-        if user_profile and user_profile.user_type == 'ADMIN':
-            # Admin sees all notifications
-            notifications = Notification.objects.all().order_by('-created_at')
-        else:
-            # Only guardians see notifications for their elders
-            guardian_elders = ElderProfile.objects.filter(guardian=request.user)
-            notifications = Notification.objects.filter(
-                Q(elder__in=guardian_elders) | Q(elder__isnull=True)
-            ).order_by('-created_at')
-    except UserProfile.DoesNotExist:
-        # No profile means only guardian notifications
-        guardian_elders = ElderProfile.objects.filter(guardian=request.user)
-        notifications = Notification.objects.filter(
-            Q(elder__in=guardian_elders) | Q(elder__isnull=True)
-        ).order_by('-created_at')
-    
-    context = {'notifications': notifications}
+    # The user's own unexpired deliveries, newest first, with their read state;
+    # ?after=<delivery id> seeks past the previous page without OFFSET
+    deliveries = visible_deliveries(request.user).select_related(
+        'notification__elder'
+    ).order_by('-notification_id')
+    seek = None
+    after = parse_cursor(request.GET.get('after'))
+    if after:
+        cursor = deliveries.filter(pk=after).values_list('notification_id', flat=True).first()
+        if cursor:
+            seek = Q(notification_id__lt=cursor)
+    page = keyset_page(deliveries, seek, NOTIFICATIONS_PER_PAGE)
+    page.object_list = with_read_state(page.object_list, read_through(request.user))
+    
+    context = {'notifications': page}
     return render(request, 'notification_list.html', context)
 
 
@@ -887,21 +889,10 @@ def notification_list(request):
 def notification_delete(request, notification_id):
     notification = get_object_or_404(Notification, pk=notification_id)
     
-    # Check permissions
-    try:
-        user_profile = request.user.profile
-        if user_profile and user_profile.user_type == 'ADMIN':
-            # Admin can delete any notification
-            pass
-        elif notification.elder and notification.elder.guardian != request.user:
-            # Non-admin, non-guardian cannot delete
-            messages.error(request, "You don't have permission to delete this notification.")
-            return redirect('notification_list')
-    except UserProfile.DoesNotExist:
-        # No profile - only guardian can delete
-        if notification.elder and notification.elder.guardian != request.user:
-            messages.error(request, "You don't have permission to delete this notification.")
-            return redirect('notification_list')
+    # Check permissions - admins, or the guardian for elder notifications
+    if notification.elder_id and not get_access_scope(request.user).can_edit(notification.elder_id):
+        messages.error(request, "You don't have permission to delete this notification.")
+        return redirect('notification_list')
     
     if request.method == 'POST':
         notification.delete()
@@ -914,31 +905,7 @@ def notification_delete(request, notification_id):
 @login_required
 def notification_mark_all_read(request):
     if request.method == 'POST':
-        try:
-            user_profile = request.user.profile
-            if user_profile and user_profile.user_type == 'ADMIN':
-                # Admin can mark all notifications as read
-                notifications = Notification.objects.filter(is_read=False)
-            else:
-                # Only guardians can mark their notifications as read
-                guardian_elders = ElderProfile.objects.filter(guardian=request.user)
-                notifications = Notification.objects.filter(
-                    Q(elder__in=guardian_elders) | Q(elder__isnull=True),
-                    is_read=False
-                )
-        except UserProfile.DoesNotExist:
-            # No profile means only guardian notifications
-            guardian_elders = ElderProfile.objects.filter(guardian=request.user)
-            notifications = Notification.objects.filter(
-                Q(elder__in=guardian_elders) | Q(elder__isnull=True),
-                is_read=False
-            )
-        
-        notifications.update(
-            is_read=True,
-            read_at=timezone.now(),
-            read_by=request.user
-        )
+        mark_all_read(request.user)
         messages.success(request, 'All notifications marked as read!')
     
     return redirect('notification_list')
@@ -947,26 +914,12 @@ def notification_mark_all_read(request):
 def notification_mark_read(request, notification_id):
     notification = get_object_or_404(Notification, pk=notification_id)
     
-    # Check permissions
-    try:
-        user_profile = request.user.profile
-        if user_profile and user_profile.user_type == 'ADMIN':
-            # Admin can mark any notification as read
-            pass
-        elif notification.elder and notification.elder.guardian != request.user:
-            # Non-admin, non-guardian cannot mark as read
-            messages.error(request, "You don't have permission to mark this notification as read.")
-            return redirect('notification_list')
-    except UserProfile.DoesNotExist:
-        # No profile - only guardian can mark as read
-        if notification.elder and notification.elder.guardian != request.user:
-            messages.error(request, "You don't have permission to mark this notification as read.")
-            return redirect('notification_list')
+    # Check permissions - admins, or the guardian for elder notifications
+    if notification.elder_id and not get_access_scope(request.user).can_edit(notification.elder_id):
+        messages.error(request, "You don't have permission to mark this notification as read.")
+        return redirect('notification_list')
     
-    notification.is_read = True
-    notification.read_at = timezone.now()
-    notification.read_by = request.user
-    notification.save()
+    mark_read(request.user, notification.pk)
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return JsonResponse({'status': 'success'})
@@ -1022,52 +975,40 @@ def search(request):
     query = request.GET.get('query', '')
     category = request.GET.get('category', 'all')
     results = {}
+    has_more = {}
+    page = 1
     
     if query:
-        try:
-            user_profile = request.user.profile
-            if user_profile and user_profile.user_type == 'ADMIN':
-                elders = ElderProfile.objects.all()
-            else:
-                elders = get_accessible_elders(request.user)
-        except UserProfile.DoesNotExist:
-            elders = get_accessible_elders(request.user)
-        
-        if category == 'elders' or category == 'all':
-            results['elders'] = elders.filter(
-                Q(full_name__icontains=query) |
-                Q(medical_conditions__icontains=query) |
-                Q(address__icontains=query)
-            )
-        
-        if category == 'medications' or category == 'all':
-            results['medications'] = MedicationSchedule.objects.filter(
-                elder__in=elders
-            ).filter(
-                Q(medication__name__icontains=query) |
-                Q(medication__description__icontains=query)
-            )
-        
-        if category == 'tasks' or category == 'all':
-            results['tasks'] = CareTask.objects.filter(
-                elder__in=elders
-            ).filter(
-                Q(title__icontains=query) |
-                Q(description__icontains=query)
-            )
+        if category in SEARCH_CATEGORIES:
+            categories = [category]
+            limit = SEARCH_RESULTS_PER_PAGE
+            try:
+                page = max(int(request.GET.get('page', 1)), 1)
+            except ValueError:
+                page = 1
+        else:
+            category = 'all'
+            categories = list(SEARCH_CATEGORIES)
+            limit = SEARCH_RESULTS_PER_CATEGORY
         
-        if category == 'appointments' or category == 'all':
-            results['appointments'] = Appointment.objects.filter(
-                elder__in=elders
-            ).filter(
-                Q(title__icontains=query) |
-                Q(notes__icontains=query)
-            )
+        elder_ids = get_access_scope(request.user).accessible_elder_ids
+        backend = get_search_backend()
+        for name in categories:
+            # Fetch one extra id to learn whether another page follows
+            object_ids = backend.search(query, name, elder_ids, limit=limit + 1, offset=(page - 1) * limit)
+            has_more[name] = len(object_ids) > limit
+            objects = hydrate(name, object_ids[:limit])
+            if objects:
+                results[name] = objects
     
     context = {
         'search_form': search_form,
         'query': query,
+        'category': category,
         'results': results,
+        'has_more': has_more,
+        'page': page,
+        'has_next': has_more.get(category, False),
     }
     return render(request, 'search_results.html', context)
 
@@ -0,0 +1,121 @@
+"""
+Hourly and daily vitals rollups.
+
+``VitalsRollup`` keeps min/max/sum/count per elder, metric and bucket so that
+trend views read one small row per bucket instead of every raw reading.
+Buckets are recomputed from ``VitalsLog`` with a grouped aggregate whenever
+readings in them change; the signal handlers cover single-row saves and bulk
+writers call ``refresh_rollups`` for the span they touched.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .models import VitalsLog, VitalsRollup
+
+VITALS_METRICS = [metric for metric, _ in VitalsRollup.METRIC_CHOICES]
+
+GRANULARITY_KINDS = {
+    'HOUR': 'hour',
+    'DAY': 'day',
+}
+
+
+def day_bounds(start, end=None):
+    """Widen ``[start, end]`` to whole local days, so both granularities align."""
+    end = end or start
+    first = timezone.localtime(start).date()
+    last = timezone.localtime(end).date() + timedelta(days=1)
+    return (
+        timezone.make_aware(datetime.combine(first, time.min)),
+        timezone.make_aware(datetime.combine(last, time.min)),
+    )
+
+
+def _aggregate(readings, granularity):
+    aggregates = {}
+    for metric in VITALS_METRICS:
+        aggregates[f'{metric}__count'] = Count(metric)
+        aggregates[f'{metric}__sum'] = Sum(metric)
+        aggregates[f'{metric}__min'] = Min(metric)
+        aggregates[f'{metric}__max'] = Max(metric)
+    rows = readings.annotate(
+        bucket=Trunc('recorded_at', GRANULARITY_KINDS[granularity])
+    ).values('elder_id', 'bucket').annotate(**aggregates).order_by()
+
+    for row in rows:
+        for metric in VITALS_METRICS:
+            count = row[f'{metric}__count']
+            if not count:
+                continue
+            yield VitalsRollup(
+                elder_id=row['elder_id'],
+                granularity=granularity,
+                metric=metric,
+                bucket_start=row['bucket'],
+                count=count,
+                total=float(row[f'{metric}__sum']),
+                minimum=float(row[f'{metric}__min']),
+                maximum=float(row[f'{metric}__max']),
+            )
+
+
+def refresh_rollups(elder_ids, start, end, batch_size=1000):
+    """
+    Recompute every hourly and daily bucket of ``elder_ids`` in ``[start, end)``.
+
+    ``start`` and ``end`` should sit on local day boundaries (see
+    ``day_bounds``). Returns the number of rollup rows written.
+    """
+    elder_ids = list(elder_ids)
+    readings = VitalsLog.objects.filter(
+        elder_id__in=elder_ids, recorded_at__gte=start, recorded_at__lt=end
+    )
+    written = 0
+    with transaction.atomic():
+        VitalsRollup.objects.filter(
+            elder_id__in=elder_ids, bucket_start__gte=start, bucket_start__lt=end
+        ).delete()
+        for granularity in GRANULARITY_KINDS:
+            rollups = list(_aggregate(readings, granularity))
+            VitalsRollup.objects.bulk_create(rollups, batch_size=batch_size)
+            written += len(rollups)
+    return written
+
+
+def refresh_rollups_for_reading(elder_id, recorded_at):
+    """Recompute the day (and its hours) that one reading falls in."""
+    start, end = day_bounds(recorded_at)
+    return refresh_rollups([elder_id], start, end)
+
+
+def vitals_trend(elder_id, metrics=None, granularity='DAY', since=None, until=None):
+    """
+    Return ``{metric: [bucket dicts]}`` for one elder, oldest bucket first.
+
+    Served entirely from the ``(elder, granularity, metric, bucket_start)``
+    unique index.
+    """
+    rollups = VitalsRollup.objects.filter(
+        elder_id=elder_id, granularity=granularity, metric__in=metrics or VITALS_METRICS
+    )
+    if since is not None:
+        rollups = rollups.filter(bucket_start__gte=since)
+    if until is not None:
+        rollups = rollups.filter(bucket_start__lt=until)
+
+    series = {}
+    for row in rollups.order_by('metric', 'bucket_start').values(
+        'metric', 'bucket_start', 'count', 'total', 'minimum', 'maximum'
+    ):
+        series.setdefault(row['metric'], []).append({
+            'start': row['bucket_start'],
+            'count': row['count'],
+            'min': row['minimum'],
+            'max': row['maximum'],
+            'avg': round(row['total'] / row['count'], 2),
+        })
+    return series